@@ -0,0 +1,143 @@
+import streamlit as st
+import pandas as pd
+import scripts.data_cache as dc
+
+@st.cache_resource(max_entries=128, show_spinner=False)
+def _load_table(filepath, digest):
+    """
+    Parses a CSV once per server process and content digest.
+    The frame is shared read-only by all sessions.
+    """
+    return dc.read_csv_with_encoding(filepath)
+
+def load_table(filepath):
+    """
+    Returns the cached DataFrame for a CSV file.
+    A new digest (the pipeline published new outputs) triggers a reload.
+    """
+    return _load_table(filepath, dc.file_digest(filepath))
+
+def get_national_data():
+    """Loads the master tables from the data/ directory for National Overview."""
+    m_district_geo = load_table('data/m_district_geo.csv')
+    m_turnout_master = load_table('data/m_turnout_master.csv')
+    m_votes_master = load_table('data/m_votes_master.csv')
+    m_referendum_master = load_table('data/m_referendum_master.csv')
+    return m_district_geo, m_turnout_master, m_votes_master, m_referendum_master
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _cube(version):
+    """Indexed aggregate cube for one data version of the cube files."""
+    import scripts.build_cube as bc
+    return bc.load_cube('data')
+
+def get_cube():
+    """Returns the shared aggregate cube (see scripts/build_cube.py)."""
+    return _cube(dc.data_version(['data/m_turnout_cube.csv', 'data/m_party_cube.csv']))
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _search_index(version):
+    import scripts.search_index as si
+    return si.load_index('data')
+
+def get_search_index():
+    """Returns the shared search index (see scripts/search_index.py)."""
+    import scripts.search_index as si
+    return _search_index(dc.data_version(list(si.source_digests('data'))))
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _candidate_store(digest):
+    import scripts.candidates as cand
+    return cand.CandidateStore('data/candidates')
+
+def get_candidate_store():
+    """Returns the shared candidate store (see scripts/candidates.py), or None if not built."""
+    path = 'data/candidates/results_votes.npy'
+    try:
+        return _candidate_store(dc.file_digest(path))
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _turnout_rankings(version):
+    import scripts.turnout_analytics as ta
+    return ta.load_rankings('data')
+
+def get_turnout_rankings():
+    """
+    Returns the shared turnout rankings per (year, ballot_code) at every
+    level (see scripts/turnout_analytics.py).
+    """
+    return _turnout_rankings(dc.data_version(['data/m_turnout_cube.csv',
+                                              'data/ECT Constituencies/2569/const_dataset.csv']))
+
+def warm_caches():
+    """
+    Loads the master tables, the aggregate cube, the turnout rankings and
+    every published q*_ output into the shared caches. Meant to run in a
+    background thread at server start.
+    """
+    try:
+        get_national_data()
+        get_cube()
+        get_search_index()
+        get_turnout_rankings()
+        for path in dc.published_files():
+            load_table(path)
+    except Exception as e:
+        print(f"Cache warm-up failed: {e}")
+
+# Seconds between live-update checks in each browser session
+LIVE_POLL_SECONDS = 10
+
+@st.cache_resource(show_spinner=False)
+def get_live_feed():
+    """
+    Process-wide LiveFeed (scripts/live_updates.py). One watcher thread
+    detects new data versions and computes the delta once; sessions only
+    read it.
+    """
+    import scripts.live_updates as live
+    return live.LiveFeed().start()
+
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def show_live_updates():
+    """
+    Sidebar panel that reruns on its own every LIVE_POLL_SECONDS. When a new
+    data version lands it shows only the changed districts and national KPIs;
+    the page itself is rerun only when the viewer asks for it.
+    """
+    import scripts.live_updates as live
+    try:
+        feed = get_live_feed()
+    except Exception as e:
+        st.caption(f"Live updates unavailable: {e}")
+        return
+
+    seen = st.session_state.setdefault('data_version', feed.version)
+    if feed.version == seen:
+        st.caption(f"Data version {seen}")
+        return
+
+    deltas = feed.deltas_since(seen)
+    if deltas is None:
+        st.info("New results are available.")
+    else:
+        districts, national = live.summarize_delta(deltas)
+        st.info(f"New results: {len(districts)} districts updated.")
+        if st.session_state.get('toasted_version') != feed.version:
+            st.toast(f"{len(districts)} districts updated")
+            st.session_state['toasted_version'] = feed.version
+        for row in national:
+            if row['turnout_rate'] is not None:
+                st.metric(f"Turnout {row['ballot_code']} {row['year']}", f"{row['turnout_rate']:.2%}")
+        if districts:
+            with st.expander("Changed districts"):
+                changed = pd.DataFrame(districts)
+                cols = [c for c in ['district_label', 'ballot_code', 'turnout_rate', 'leader_party']
+                        if c in changed.columns]
+                st.dataframe(changed[cols], hide_index=True)
+
+    if st.button("Load new results"):
+        st.session_state['data_version'] = feed.version
+        st.rerun()
@@ -0,0 +1,148 @@
+import streamlit as st
+
+from dashboard_pages.common import get_search_index, load_table
+
+def show_concentration_screening():
+    st.title("Concentration Screening (Q6)")
+    st.markdown("""
+    Identification of districts with unusually concentrated vote patterns or low competition.
+    - **Criteria 6.1 (Dominant Winner)**: Winner share > All others combined.
+    - **Criteria 6.2 (Concentrated)**: Top 2 candidates share >= {70%, 75%, 80%}.
+    - **Criteria 6.3 (Cross-Year)**: Vote pattern consistency check (2566 vs 2569).
+    - **Criteria 6.4 (Low ENC)**: Effective Number of Candidates indicates low competition.
+    """)
+    
+    # Load Main Data
+    try:
+        df_combined = load_table('q6_combined_flags.csv')
+        df_enc_stats = load_table('q6_enc_stats.csv')
+    except:
+        st.error("Missing Q6 output files. Please run `scripts/analyze_concentration.py`.")
+        return
+
+    # Sidebar Filters
+    years = sorted(df_combined['year'].unique())
+    selected_year = st.sidebar.selectbox("Select Year", years)
+    
+    regions = sorted(df_combined['province'].unique()) # Using province as proxy if region col missing
+    # Actually checking if region column exists in combined flags. 
+    # Script does not explicitly add region to 2566 data (only province). 
+    # We can filter by Province.
+    search_prov = st.sidebar.text_input("Search Province", "")
+    
+    # Filter Data
+    df_filtered = df_combined[df_combined['year'] == selected_year]
+    if search_prov:
+        provinces = get_search_index().ids(search_prov, 'province')
+        df_filtered = df_filtered[df_filtered['province'].isin(provinces)]
+    
+    # Summary Metrics
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Flagged Districts", len(df_filtered))
+    c2.metric("Dominant Winner", len(df_filtered[df_filtered['flags'].str.contains('Dominant')]))
+    c3.metric("High Concentration", len(df_filtered[df_filtered['flags'].str.contains('Concentrated')]))
+    c4.metric("Low ENC", len(df_filtered[df_filtered['flags'].str.contains('Low ENC')]))
+    
+    # Forensics flags (Q11) of the constituency ballot, next to the Q6 flags
+    forensics = None
+    try:
+        forensics = load_table('q11_forensics_district.csv')
+    except Exception:
+        pass
+    list_cols = ['province', 'district_number', 'winner_party', 'share_rk1', 'enc', 'flags']
+    if forensics is not None:
+        cons_flags = forensics[(forensics['year'] == selected_year) & (forensics['ballot_code'] == 'CONS')]
+        cons_flags = cons_flags[['key', 'flags']].rename(columns={'flags': 'forensics_flags'})
+        df_filtered = df_filtered.merge(cons_flags, on='key', how='left')
+        list_cols.append('forensics_flags')
+
+    st.subheader("Flagged Districts List")
+    st.dataframe(df_filtered[list_cols])
+    
+    # Detailed Views
+    with st.expander("ENC Statistics"):
+        st.write("Effective Number of Candidates (ENC) Distribution")
+        st.dataframe(df_enc_stats)
+        
+    with st.expander("Criteria 6.1: Dominant Winners"):
+        try:
+            df_61 = load_table('q6_criteria_6_1.csv')
+            st.dataframe(df_61)
+        except: st.info("No data.")
+
+    with st.expander("Criteria 6.2: High Concentration Lists"):
+        try:
+            df_62 = load_table('q6_criteria_6_2_lists.csv')
+            st.dataframe(df_62)
+        except: st.info("No data.")
+
+    with st.expander("Criteria 6.3: Cross-Year Pattern Anomalies"):
+        try:
+            df_63 = load_table('q6_criteria_6_3.csv')
+            st.dataframe(df_63)
+        except: st.info("No data.")
+        
+    with st.expander("Expected-Result Residuals (Q15, model-based alternative to 6.3)"):
+        st.markdown("""
+        Each party's 2569 district share is regressed on 2566 shares, turnout of both
+        elections and region (one batched least-squares fit for all parties). Flags mark
+        externally studentized residuals beyond ±3, or beyond ±2 at high-leverage districts.
+        """)
+        try:
+            df_q15 = load_table('q15_expected_flags.csv')
+            if search_prov:
+                df_q15 = df_q15[df_q15['province'].isin(get_search_index().ids(search_prov, 'province'))]
+            st.dataframe(df_q15[['ballot_code', 'province', 'district_number', 'party', 'observed', 'expected',
+                                 'student_residual', 'leverage', 'flag']], hide_index=True)
+        except Exception: st.info("No data. Please run `scripts/analyze_expected.py`.")
+
+    with st.expander("Criteria 6.4: Low ENC Lists"):
+        try:
+            df_64 = load_table('q6_enc_low_lists.csv')
+            st.dataframe(df_64)
+        except: st.info("No data.")
+
+    show_forensics(selected_year, search_prov)
+
+def show_forensics(selected_year, search_prov):
+    st.header("Vote-Count Forensics (Q11)")
+    st.markdown("""
+    Statistical screens over every candidate and party count and every turnout row.
+    A flag marks a district or province for a closer look; it is not evidence of fraud.
+    - **Benford 2BL**: second digits of vote counts (>= 10) against Benford's law.
+    - **Last digit**: last digits of vote counts (>= 100) against a uniform distribution.
+    - **Turnout-winner fingerprint**: high turnout together with a high winner share
+      (districts: both robust z > 2; provinces: within-province correlation, permutation test).
+    - **Invalid outlier**: invalid-ballot rate with a robust z > 3.
+
+    Digit and permutation p-values come from Monte Carlo null distributions and are
+    adjusted for multiple testing (Benjamini-Hochberg, q < 0.05).
+    """)
+    try:
+        df_district = load_table('q11_forensics_district.csv')
+        df_province = load_table('q11_forensics_province.csv')
+        df_summary = load_table('q11_forensics_summary.csv')
+    except Exception:
+        st.info("Missing Q11 output files. Please run `scripts/analyze_forensics.py`.")
+        return
+
+    ballot = st.radio("Ballot", ['CONS', 'PARTY'], horizontal=True, key='forensics_ballot')
+    df_district = df_district[(df_district['year'] == selected_year) & (df_district['ballot_code'] == ballot)]
+    df_province = df_province[(df_province['year'] == selected_year) & (df_province['ballot_code'] == ballot)]
+    if search_prov:
+        provinces = get_search_index().ids(search_prov, 'province')
+        df_district = df_district[df_district['province'].isin(provinces)]
+        df_province = df_province[df_province['province'].isin(provinces)]
+
+    summary = df_summary[(df_summary['year'] == selected_year) & (df_summary['ballot_code'] == ballot)]
+    st.dataframe(summary, hide_index=True)
+
+    flagged = df_district[df_district['flags'].fillna('') != '']
+    st.subheader(f"Flagged Districts ({len(flagged)})")
+    st.dataframe(flagged[['province', 'district_number', 'turnout_rate', 'winner_share', 'invalid_rate',
+                          'benford2_q', 'lastdigit_q', 'flags']], hide_index=True)
+
+    with st.expander("Province-Level Results"):
+        st.dataframe(df_province[['province', 'n_districts', 'turnout_rate', 'invalid_rate', 'invalid_z',
+                                  'benford2_mean', 'benford2_q', 'lastdigit_q', 'fingerprint_corr',
+                                  'fingerprint_q', 'flags']], hide_index=True)
@@ -0,0 +1,57 @@
+import streamlit as st
+
+from dashboard_pages.common import load_table
+
+def show_gap_analysis():
+    st.title("Gap Analysis: People's Party (2569)")
+    st.markdown("""
+    Analysis of vote gaps for lost districts and win margins for won districts.
+    - **Gap (Lost)**: Votes Winner - Votes People's Party
+    - **Margin (Won)**: Votes People's Party - Votes Runner-up
+    """)
+    
+    tab1, tab2 = st.tabs(["Gap (Lost Districts)", "Margin (Won Districts)"])
+    
+    with tab1:
+        st.subheader("Votes Gap in Lost Districts")
+        try:
+            df_gap = load_table('q7_p000_gap_list.csv')
+            
+            # Summary Chart
+            summary = df_gap['bucket'].value_counts().reindex(['0-500', '501-2500', '2501-5000', '5001-10000', '10000+']).fillna(0)
+            st.bar_chart(summary)
+            
+            # Filter
+            buckets = ['All'] + list(summary.index)
+            sel_bucket = st.selectbox("Filter by Gap Bucket", buckets, key='gap_filter')
+            
+            if sel_bucket != 'All':
+                df_show = df_gap[df_gap['bucket'] == sel_bucket]
+            else:
+                df_show = df_gap
+                
+            st.dataframe(df_show[['province', 'district_label', 'winner_party', 'target_party', 'votes_target', 'gap', 'bucket']])
+        except:
+            st.info("No data (Target party won all or files missing)")
+
+    with tab2:
+        st.subheader("Win Margin in Won Districts")
+        try:
+            df_margin = load_table('q7_p000_margin_list.csv')
+            
+            # Summary Chart
+            summary = df_margin['bucket'].value_counts().reindex(['0-500', '501-2500', '2501-5000', '5001-10000', '10000+']).fillna(0)
+            st.bar_chart(summary)
+            
+            # Filter
+            buckets = ['All'] + list(summary.index)
+            sel_bucket = st.selectbox("Filter by Margin Bucket", buckets, key='margin_filter')
+            
+            if sel_bucket != 'All':
+                df_show = df_margin[df_margin['bucket'] == sel_bucket]
+            else:
+                df_show = df_margin
+                
+            st.dataframe(df_show[['province', 'district_label', 'winner_party', 'runner_up_party', 'votes_target', 'votes_rank2', 'margin', 'bucket']])
+        except:
+             st.info("No data (Target party lost all or files missing)")
@@ -0,0 +1,120 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import scripts.preprocess_svg as psvg
+
+import scripts.build_cube as bc
+
+from dashboard_pages.common import get_candidate_store, get_cube, get_search_index
+
+def show_national_overview():
+    st.title("Thailand Election 2569 - National Overview")
+    
+    cube = get_cube()
+    
+    # --- National KPIs ---
+    st.header("National KPIs")
+    
+    # Use CONS ballot for national turnout figures
+    kpis = bc.get_kpis(cube, 'national', 2569, 'CONS')
+    
+    total_eligible_voters = kpis['eligible_voters']
+    total_voters_used = kpis['voters_used']
+    turnout_rate = kpis['turnout_rate'] * 100 if pd.notna(kpis['turnout_rate']) else 0
+    total_valid_votes = kpis['valid_votes']
+    total_invalid_votes = kpis['invalid_votes']
+    total_no_vote = kpis['no_vote']
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Eligible Voters", f"{total_eligible_voters:,.0f}")
+    col2.metric("Total Turnout", f"{total_voters_used:,.0f}", f"{turnout_rate:.2f}%")
+    col3.metric("Valid Votes", f"{total_valid_votes:,.0f}")
+    
+    col4, col5, col6 = st.columns(3)
+    col4.metric("Invalid Votes", f"{total_invalid_votes:,.0f}")
+    col5.metric("No-Votes", f"{total_no_vote:,.0f}")
+    
+    # --- Load Shapefile ---
+    shapefile_path = "data/ECT Constituencies/2569/ShapeFile/2569_Election_Constituencies.shp"
+    try:
+        # geopandas pulls in GDAL/pyproj/shapely; only pay for it on this page
+        import geopandas as gpd
+        gdf_constituencies = gpd.read_file(shapefile_path)
+        st.write("### Constituency Shapefile Data Sample")
+        # Drop geometry for display to avoid Arrow serialization errors
+        st.dataframe(gdf_constituencies.drop(columns='geometry').head())
+    except Exception as e:
+        st.error(f"Could not load shapefile: {e}")
+    
+    # --- Top 10 Parties by Party-List Votes ---
+    st.header("Top 10 Parties by Party-List Votes")
+    
+    # Party-list votes per party, pre-ranked in the cube
+    top_parties = bc.get_parties(cube, 'national', 2569, 'PARTY', k=10)[['party_name', 'votes']]
+    
+    fig_bar = px.bar(
+        top_parties,
+        x='party_name',
+        y='votes',
+        title='Top 10 Parties by Party-List Votes (National)',
+        labels={'party_name': 'Party', 'votes': 'Total Votes'},
+        text='votes'
+    )
+    fig_bar.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
+    fig_bar.update_layout(xaxis_title="Party", yaxis_title="Total Votes", uniformtext_minsize=8, uniformtext_mode='hide')
+    st.plotly_chart(fig_bar, use_container_width=True)
+    
+    # --- Regional Summary Table ---
+    st.header("Regional Summary")
+    
+    # Region rows of the cube (CONS), sorted by turnout
+    regional_turnout = bc.get_level(cube, 'region', 2569, 'CONS')[['region', 'eligible_voters', 'voters_used', 'turnout_rate']].rename(columns={
+        'eligible_voters': 'total_eligible_voters',
+        'voters_used': 'total_voters_used'
+    })
+    regional_turnout['turnout_rate'] = (regional_turnout['turnout_rate'] * 100).round(2)
+    
+    st.dataframe(regional_turnout.style.format({
+        'total_eligible_voters': "{:,.0f}",
+        'total_voters_used': "{:,.0f}",
+        'turnout_rate': "{:.2f}%"
+    }))
+
+    # --- Search ---
+    st.header("Search")
+    query = st.text_input("Province, district, party or candidate name", "")
+    if query:
+        hits = get_search_index().search(query, limit=50)
+        if hits:
+            results = pd.DataFrame(hits)
+            cols = [c for c in ['kind', 'label', 'province', 'district_label', 'party_name', 'id'] if c in results.columns]
+            st.dataframe(results[cols].astype(str).replace({'nan': '', 'None': ''}), hide_index=True)
+
+            # Candidate drill-down: the whole constituency race of the best candidate hit
+            candidate = next((h for h in hits if h['kind'] == 'candidate'), None)
+            store = get_candidate_store()
+            if candidate is not None and store is not None:
+                race = store.by_district(candidate['district_id'])
+                if not race.empty:
+                    st.write(f"**{candidate['district_label'] or candidate['district_id']}: constituency results**")
+                    st.dataframe(race[['rank', 'candidate_name', 'party_name', 'votes', 'vote_percent']], hide_index=True)
+        else:
+            st.info("No matches.")
+
+    # --- Province Drill-down Map ---
+    st.header("Province Drill-down")
+    svg_index = psvg.load_svg_index(2569)
+    if not svg_index:
+        st.info("Province maps not built. Please run `scripts/preprocess_svg.py`.")
+    else:
+        province = st.selectbox("Select Province", sorted(svg_index.keys()))
+        prov_turnout = bc.get_children(cube, 'district', 2569, 'CONS', province)
+        rates = dict(zip(prov_turnout['district_number'].astype(int), prov_turnout['turnout_rate']))
+        titles = {no: f"{province} เขต {no}: {rate:.2%}" for no, rate in rates.items() if pd.notna(rate)}
+        svg = psvg.load_province_svg(province)
+        if svg is None:
+            st.info(f"No constituency map is available for {province}.")
+        else:
+            svg = psvg.recolor_svg(svg, psvg.color_scale(rates), titles)
+            st.caption("CONS turnout rate by constituency (darker = higher)")
+            st.markdown(f'<div style="max-width:480px">{svg}</div>', unsafe_allow_html=True)
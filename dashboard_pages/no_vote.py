@@ -0,0 +1,78 @@
+import streamlit as st
+
+from dashboard_pages.common import get_search_index, load_table
+
+def show_no_vote_analysis():
+    st.title("No Vote Analysis (Q8)")
+    st.markdown("Comparison of 'No Vote' rates between 2566 and 2569 for Constituency (CON) and Party List (PL).")
+    
+    tab1, tab2 = st.tabs(["National & Regional", "District Changes"])
+    
+    with tab1:
+        st.subheader("National Comparison")
+        try:
+            df_nat = load_table('q8_no_vote_national_comparison.csv')
+            # Pivot for better view
+            # year, ballot_code, rate
+            # We want columns: 2566, 2569, Delta
+            df_nat_pivot = df_nat.pivot(index='ballot_code', columns='year', values='rate')
+            df_nat_pivot['Delta'] = df_nat_pivot[2569] - df_nat_pivot[2566]
+            st.dataframe(df_nat_pivot.style.format("{:.2%}"))
+        except:
+            st.info("National data missing.")
+            
+        st.subheader("Regional Comparison")
+        try:
+            df_reg = load_table('q8_no_vote_region_comparison.csv') # columns: region, no_vote, voters_used, rate, year, ballot_code
+             # Filter by ballot
+            b_code = st.radio("Select Ballot Type", ["CON", "PL"], horizontal=True, key='reg_ballot')
+            
+            df_r = df_reg[df_reg['ballot_code'] == b_code]
+            if not df_r.empty:
+                # Pivot: index=region, col=year, val=rate
+                pv = df_r.pivot(index='region', columns='year', values='rate')
+                if 2566 in pv.columns and 2569 in pv.columns:
+                     pv['Delta'] = pv[2569] - pv[2566]
+                st.dataframe(pv.style.format("{:.2%}"))
+            else:
+                st.info("No regional data for selected ballot type.")
+        except:
+            st.info("Regional data missing.")
+
+    with tab2:
+        st.subheader("District-level Changes (2569 - 2566)")
+        try:
+            df_dist = load_table('q8_no_vote_district_changes.csv')
+            
+            b_code_d = st.radio("Select Ballot Type", ["CON", "PL"], horizontal=True, key='dist_ballot')
+            df_d = df_dist[df_dist['ballot_code'] == b_code_d].copy()
+            
+            # Search
+            search = st.text_input("Search Province/District", "")
+            if search:
+                hits = get_search_index().search(search, kinds=('province', 'district'), limit=None)
+                provinces = {h['id'] for h in hits if h['kind'] == 'province'}
+                # q8 keys districts as '<province>_<district_number>'
+                keys = {f"{h['province']}_{h['district_number']}" for h in hits if h['kind'] == 'district'}
+                df_d = df_d[df_d['province'].isin(provinces) | df_d['key'].isin(keys)]
+            
+            c1, c2 = st.columns(2)
+            
+            with c1:
+                st.write("Top 10 Increase")
+                top_inc = df_d.sort_values('delta_rate', ascending=False).head(10)
+                st.dataframe(top_inc[['district_label', 'rate_2566', 'rate_2569', 'delta_rate']].style.format({'rate_2566': '{:.2%}', 'rate_2569': '{:.2%}', 'delta_rate': '{:.2%}'}))
+                
+            with c2:
+                st.write("Top 10 Decrease")
+                top_dec = df_d.sort_values('delta_rate', ascending=True).head(10)
+                st.dataframe(top_dec[['district_label', 'rate_2566', 'rate_2569', 'delta_rate']].style.format({'rate_2566': '{:.2%}', 'rate_2569': '{:.2%}', 'delta_rate': '{:.2%}'}))
+                
+            with st.expander("Full Data"):
+                st.dataframe(df_d)
+                
+        except:
+            st.info("District data missing.")
+
+            with st.expander("Full Data"):
+                st.dataframe(df_d)
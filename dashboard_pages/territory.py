@@ -0,0 +1,86 @@
+import streamlit as st
+
+from dashboard_pages.common import load_table
+
+def show_territory_comparison():
+    st.title("Territory Comparison (2566 vs 2569)")
+    st.markdown("""
+    Analysis of seats Held, Lost, and Gained between 2566 and 2569 elections.
+    - **Held**: Party won in both 2566 and 2569.
+    - **Lost**: Party won in 2566 but lost in 2569.
+    - **Gained**: Party won in 2569 but did not win in 2566.
+    """)
+    
+    comparisons = {
+        "MFP (2566) vs People's (2569)": "q2_",
+        "Pheu Thai": "q3_p034_",
+        "Bhumjaithai": "q4_p063_",
+        "Democrat": "q5_p001_"
+    }
+    
+    selection = st.sidebar.selectbox("Select Comparison", list(comparisons.keys()))
+    prefix = comparisons[selection]
+    
+    # Load summary
+    try:
+        summary = load_table(f'{prefix}summary_counts.csv')
+        held = summary['held'].iloc[0]
+        lost = summary['lost'].iloc[0]
+        gained = summary['gained'].iloc[0]
+        total_2569 = held + gained
+        
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Held Seats", held)
+        c2.metric("Lost Seats", lost)
+        c3.metric("Gained/New Seats", gained)
+        c4.metric("Total Won (2569)", total_2569)
+    except:
+        st.error("Summary data not found. Please run analysis script.")
+        return
+
+    # Tabs for details
+    tab1, tab2, tab3, tab4 = st.tabs(["Held", "Lost", "Gained", "Province Delta"])
+    
+    with tab1:
+        st.subheader("Held Districts")
+        try:
+            df = load_table(f'{prefix}held.csv')
+            st.dataframe(df)
+        except:
+            st.info("No data or file missing.")
+
+    with tab2:
+        st.subheader("Lost Districts")
+        try:
+            df = load_table(f'{prefix}lost.csv')
+            st.dataframe(df)
+        except:
+            st.info("No data or file missing.")
+
+    with tab3:
+        st.subheader("Gained Districts")
+        try:
+            if prefix == 'q2_':
+                df = load_table('q2_new_districts.csv')
+            else:
+                df = load_table(f'{prefix}gained.csv')
+            st.dataframe(df)
+        except:
+            st.info("No data or file missing.")
+
+    with tab4:
+        st.subheader("Province Seat Changes")
+        try:
+            # Filename logic
+            if prefix == 'q2_':
+                # I changed script to use prefix, but let's check if I kept q2_ compatibility or fully prefixed
+                # script says: f'{prefix}province_seat_changes.csv'
+                # so q2_province_seat_changes.csv is consistent.
+                filename = f'{prefix}province_seat_changes.csv'
+            else:
+                filename = f'{prefix}province_seat_changes.csv'
+                
+            df = load_table(filename)
+            st.dataframe(df)
+        except:
+             st.info("No data or file missing. Try running analysis script.")
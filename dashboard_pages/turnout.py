@@ -0,0 +1,69 @@
+import streamlit as st
+import scripts.build_cube as bc
+
+from dashboard_pages.common import get_cube, get_turnout_rankings
+
+# Q1 ballot labels -> ballot_code in the master tables / cube
+BALLOT_CODES = {'CON': 'CONS', 'PL': 'PARTY', 'RFD': 'RFD'}
+# Ranking level -> (label, columns shown)
+RANK_LEVELS = {
+    'district': ("Districts", ['region', 'province', 'district_label', 'turnout_rate']),
+    'amphoe': ("Amphoes", ['region', 'province', 'amphoe', 'turnout_rate']),
+    'province': ("Provinces", ['region', 'province', 'turnout_rate']),
+    'region': ("Regions", ['region', 'turnout_rate']),
+}
+
+def show_turnout_analysis():
+    st.title("Turnout Analysis (Q1)")
+    st.markdown("""
+    Analysis of turnout rates for year 2569 across different ballot types:
+    - **CON**: Constituency
+    - **PL**: Party-List
+    - **RFD**: Referendum
+    """)
+    
+    # Rates and rank orders are precomputed in the aggregate cube
+    with st.spinner("Loading and processing data..."):
+        cube = get_cube()
+    
+    # Sidebar control
+    ballot_type = st.sidebar.radio("Select Ballot Type", ["CON", "PL", "RFD"])
+    ballot_code = BALLOT_CODES[ballot_type]
+    
+    if bc.get_kpis(cube, 'national', 2569, ballot_code) is not None:
+        st.subheader(f"Turnout Analysis: {ballot_type}")
+        
+        # --- Top & Bottom k at any level ---
+        # Rankings are built once per data version; each render only selects k rows
+        ranking = get_turnout_rankings().get((2569, ballot_code))
+        level = st.sidebar.selectbox("Ranking Level", [l for l in RANK_LEVELS if ranking and l in ranking.levels],
+                                     format_func=lambda l: RANK_LEVELS[l][0])
+        k = st.sidebar.number_input("Top/Bottom k", min_value=1, max_value=100, value=10, step=1)
+        label, cols = RANK_LEVELS[level]
+        st.markdown(f"### {label}: Top & Bottom {k}")
+        if level == 'amphoe':
+            st.caption("Votes are counted per district; amphoes split across districts take each district's "
+                       "counts in equal parts over the amphoes it covers (const_dataset.csv).")
+        top_k, bottom_k = ranking.top_bottom(level, int(k))
+
+        c1, c2 = st.columns(2)
+        with c1:
+            st.write(f"**Top {k} {label} by Turnout**")
+            st.dataframe(top_k[cols].style.format({'turnout_rate': '{:.4f}'}))
+
+        with c2:
+            st.write(f"**Bottom {k} {label} by Turnout**")
+            st.dataframe(bottom_k[cols].style.format({'turnout_rate': '{:.4f}'}))
+
+        # --- Region Ranking ---
+        st.markdown("### Regional Ranking")
+        reg_stats = bc.get_level(cube, 'region', 2569, ballot_code)
+        st.dataframe(reg_stats[['region', 'eligible_voters', 'voters_used', 'turnout_rate']].style.format({
+            'eligible_voters': '{:,.0f}',
+            'voters_used': '{:,.0f}',
+            'turnout_rate': '{:.4f}'
+        }))
+        
+    
+    else:
+        st.error(f"No data found for {ballot_type}")
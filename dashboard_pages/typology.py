@@ -0,0 +1,93 @@
+import streamlit as st
+
+from dashboard_pages.common import load_table
+
+def show_typology_analysis():
+    st.title("District Typology (Q9)")
+    st.markdown("Classification of districts based on vote share patterns.")
+    
+    tab1, tab2, tab3, tab4 = st.tabs(["Typology 9.1 (P000/P034)", "Typology 9.2 (P000/P034/P001)",
+                                      "Typology 9.3 (Rank 2+3 > Rank 1)", "Profile Clusters"])
+    
+    with tab1:
+        st.subheader("Typology 9.1 (P000 + P034)")
+        st.markdown("""
+        - **A**: P000 Winner & Dominant (> Rank 2+3)
+        - **B**: P034 Winner & Dominant (> Rank 2+3)
+        - **C**: Combined Non-Winner (P000+P034) > Winner
+        - **D**: Others
+        """)
+        try:
+            df91 = load_table('q9_typology_91.csv')
+            counts = df91['cat_91'].value_counts()
+            
+            c1, c2 = st.columns([1, 2])
+            with c1:
+                st.write("Counts:")
+                st.dataframe(counts)
+            with c2:
+                # Simple pie chart
+                # Prepare for st.bar_chart or use map? Streamlit native charts are limited for Pie.
+                # Use Bar chart for simplicity and robustness.
+                st.bar_chart(counts)
+                
+            st.dataframe(df91)
+        except:
+             st.info("Data for 9.1 missing.")
+
+    with tab2:
+        st.subheader("Typology 9.2 (P000 + P034 + P001)")
+        st.markdown("""
+        - **A**: P000 Winner & Dominant
+        - **B**: P034 Winner & Dominant
+        - **C**: P001 Winner & Dominant
+        - **D**: Combined Non-Winner (All 3) > Winner
+        - **E**: Others
+        """)
+        try:
+            df92 = load_table('q9_typology_92.csv')
+            counts = df92['cat_92'].value_counts()
+            
+            c1, c2 = st.columns([1, 2])
+            with c1:
+                st.write("Counts:")
+                st.dataframe(counts)
+            with c2:
+                st.bar_chart(counts)
+                
+            st.dataframe(df92)
+        except:
+             st.info("Data for 9.2 missing.")
+
+    with tab3:
+        st.subheader("Typology 9.3: Rank 2 + Rank 3 > Rank 1")
+        st.markdown("Districts where the combined vote of the 2nd and 3rd place candidates exceeds the winner's vote.")
+        try:
+            df93 = load_table('q9_rank23_gt_rank1.csv')
+            st.metric("Districts Matching Criteria", len(df93))
+            st.dataframe(df93)
+        except:
+             st.info("Data for 9.3 missing.")
+
+    with tab4:
+        st.subheader("Districts Clustered by Electoral Profile")
+        st.markdown("Mini-batch k-means over vote shares of the main parties, turnout and no-vote rates.")
+        try:
+            df_clusters = load_table('q9_clusters.csv')
+            df_centroids = load_table('q9_cluster_centroids.csv')
+        except Exception:
+            st.info("Cluster data missing. Please run `scripts/analyze_clusters.py`.")
+            return
+
+        c1, c2 = st.columns(2)
+        year = c1.selectbox("Year", sorted(df_clusters['year'].unique(), reverse=True), key='cluster_year')
+        ballot = c2.selectbox("Ballot", sorted(df_clusters['ballot_code'].unique()), key='cluster_ballot')
+        centroids = df_centroids[(df_centroids['year'] == year) & (df_centroids['ballot_code'] == ballot)]
+        profile = centroids.pivot_table(index=['cluster', 'size'], columns='feature', values='value', sort=False)
+        st.write("Cluster centroids (shares and rates):")
+        st.dataframe(profile.style.format('{:.1%}'))
+
+        members = df_clusters[(df_clusters['year'] == year) & (df_clusters['ballot_code'] == ballot)]
+        cluster = st.selectbox("Cluster", sorted(members['cluster'].unique()), key='cluster_id')
+        st.dataframe(members[members['cluster'] == cluster].sort_values('distance')
+                     [['province', 'district_number', 'distance']], hide_index=True)
@@ -0,0 +1,212 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.analyze_forensics import load_counts, load_turnout
+    from scripts.analyze_split_ticket import BallotMatrices
+except ImportError:
+    from analyze_forensics import load_counts, load_turnout
+    from analyze_split_ticket import BallotMatrices
+
+STATE_FILE = os.path.join('data', 'cluster_state.npz')
+N_CLUSTERS = 6
+BATCH_SIZE = 64
+FIT_ITERATIONS = 300
+# Extra random rows mixed into an incremental refit so the centroids keep
+# seeing the whole distribution, not only the changed districts
+REFIT_CONTEXT = 32
+REFIT_ITERATIONS = 20
+# Cap on the points a centroid remembers, so refits keep a usable step size
+MAX_COUNT = 2000
+# Parties below this national share of a ballot are folded into 'อื่นๆ'
+MIN_PARTY_SHARE = 0.02
+
+def build_profiles(counts, turnout):
+    """
+    District profiles per (year, ballot_code): vote shares of the main
+    parties plus the rest, turnout rate and no-vote rate. All features are
+    fractions already, so they are used as they are; this keeps the
+    feature space fixed between snapshots, which a warm start relies on.
+    Returns {(year, ballot_code): (districts DataFrame, X [n, f], feature names)}
+    """
+    profiles = {}
+    for year in sorted(counts['year'].unique()):
+        m = BallotMatrices(counts, turnout, year)
+        t = turnout[turnout['year'] == year]
+        for ballot_code, shares, votes in (('CONS', m.cons, m.cons_votes), ('PARTY', m.party, m.party_votes)):
+            national = np.nansum(votes, axis=0) / np.nansum(votes)
+            main = np.flatnonzero(national >= MIN_PARTY_SHARE)
+            filled = np.nan_to_num(shares)
+            other = np.delete(filled, main, axis=1).sum(axis=1)
+            grp = t[t['ballot_code'] == ballot_code].set_index('key').reindex(m.districts['key'])
+            used = grp['voters_used'].where(grp['voters_used'] > 0)
+            rates = np.column_stack([(used / grp['eligible_voters']).to_numpy(), (grp['no_vote'] / used).to_numpy()])
+            X = np.column_stack([filled[:, main], other, np.nan_to_num(rates)])
+            names = [str(p) for p in m.parties[main]] + ['อื่นๆ', 'turnout_rate', 'no_vote_rate']
+            profiles[(year, ballot_code)] = (m.districts, X, names)
+    return profiles
+
+class MiniBatchKMeans:
+    """
+    Mini-batch k-means (Sculley 2010): each batch moves its nearest centroids
+    towards the batch points with a per-centroid step of 1 / points seen.
+    Centroids and counts can be restored, so a refit warm-starts from the
+    previous snapshot and only has to absorb the changed districts.
+    """
+
+    def __init__(self, n_clusters=N_CLUSTERS, batch_size=BATCH_SIZE, seed=0):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self.counts = None
+
+    def _init_centroids(self, X):
+        """k-means++ seeding."""
+        centroids = [X[self.rng.integers(len(X))]]
+        for _ in range(1, self.n_clusters):
+            d2 = ((X[:, None, :] - np.array(centroids)[None]) ** 2).sum(axis=2).min(axis=1)
+            centroids.append(X[self.rng.choice(len(X), p=d2 / d2.sum())] if d2.sum() > 0 else X[self.rng.integers(len(X))])
+        self.centroids = np.array(centroids, dtype=float)
+        self.counts = np.zeros(self.n_clusters)
+
+    def distances(self, X):
+        """Squared distances [n, k] of every row to every centroid."""
+        return (X ** 2).sum(axis=1)[:, None] + (self.centroids ** 2).sum(axis=1)[None] - 2 * X @ self.centroids.T
+
+    def predict(self, X):
+        return self.distances(X).argmin(axis=1)
+
+    def partial_fit(self, batch):
+        """
+        One mini-batch step. Applying the per-point 1 / count steps of a
+        cluster in sequence equals moving it to the running mean, so the
+        whole batch is folded in at once.
+        """
+        assign = self.predict(batch)
+        n = np.bincount(assign, minlength=self.n_clusters).astype(float)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, assign, batch)
+        hit = n > 0
+        self.counts[hit] += n[hit]
+        self.centroids[hit] += (sums[hit] - n[hit, None] * self.centroids[hit]) / self.counts[hit, None]
+        return self
+
+    def fit(self, X, iterations=FIT_ITERATIONS):
+        self._init_centroids(X)
+        for _ in range(iterations):
+            self.partial_fit(X[self.rng.choice(len(X), min(self.batch_size, len(X)), replace=False)])
+        self._relabel_by_size(X)
+        return self
+
+    def refit(self, X, changed, iterations=REFIT_ITERATIONS):
+        """
+        Warm-started update after some rows changed: batches are the changed
+        rows plus REFIT_CONTEXT random others.
+        """
+        changed = np.flatnonzero(changed)
+        if len(changed) == 0:
+            return self
+        self.counts = np.minimum(self.counts, MAX_COUNT)
+        for _ in range(iterations):
+            context = self.rng.choice(len(X), min(REFIT_CONTEXT, len(X)), replace=False)
+            self.partial_fit(X[np.union1d(changed, context)])
+        return self
+
+    def _relabel_by_size(self, X):
+        """Cluster 0 is the largest after a cold fit, so labels are stable across runs."""
+        sizes = np.bincount(self.predict(X), minlength=self.n_clusters)
+        order = np.argsort(-sizes, kind='stable')
+        self.centroids, self.counts = self.centroids[order], self.counts[order]
+
+    def inertia(self, X):
+        return float(self.distances(X).min(axis=1).clip(min=0).sum())
+
+def load_state(path=STATE_FILE):
+    """Previous profiles and models per '<year>_<ballot>' prefix, or {} if none."""
+    if not os.path.exists(path):
+        return {}
+    data = np.load(path, allow_pickle=False)
+    state = {}
+    for name in data.files:
+        prefix, field = name.rsplit('.', 1)
+        state.setdefault(prefix, {})[field] = data[name]
+    return state
+
+def save_state(state, path=STATE_FILE):
+    arrays = {f"{prefix}.{field}": value for prefix, fields in state.items() for field, value in fields.items()}
+    np.savez_compressed(path, **arrays)
+
+def cluster_profiles(profiles, state, n_clusters=N_CLUSTERS, seed=0, cold=False):
+    """
+    Fits or warm-refits one model per (year, ballot_code). A model is
+    refit from its stored centroids when the feature set and district list
+    match the stored state; only rows whose profile changed drive the update.
+    Returns (labels DataFrame, centroids DataFrame, new state, timings).
+    """
+    labels, centroids, new_state, timings = [], [], {}, []
+    for (year, ballot_code), (districts, X, names) in profiles.items():
+        prefix = f"{year}_{ballot_code}"
+        prev = state.get(prefix)
+        model = MiniBatchKMeans(n_clusters, seed=seed + year)
+        start = time.perf_counter()
+        warm = (not cold and prev is not None and list(prev['features']) == names
+                and list(prev['keys']) == list(districts['key']) and len(prev['centroids']) == n_clusters)
+        if warm:
+            model.centroids, model.counts = prev['centroids'].astype(float), prev['counts'].astype(float)
+            changed = ~np.isclose(prev['X'], X).all(axis=1)
+            model.refit(X, changed)
+            mode = f"refit ({int(changed.sum())} changed)"
+        else:
+            model.fit(X)
+            mode = "fit"
+        elapsed = time.perf_counter() - start
+        timings.append({'year': year, 'ballot_code': ballot_code, 'mode': mode, 'seconds': elapsed,
+                        'inertia': model.inertia(X)})
+
+        d2 = model.distances(X).clip(min=0)
+        assign = d2.argmin(axis=1)
+        df = districts.copy()
+        df.insert(0, 'year', year)
+        df.insert(1, 'ballot_code', ballot_code)
+        df['cluster'] = assign
+        df['distance'] = np.sqrt(d2[np.arange(len(X)), assign])
+        labels.append(df)
+
+        sizes = np.bincount(assign, minlength=n_clusters)
+        c = pd.DataFrame(model.centroids, columns=names)
+        c.insert(0, 'size', sizes)
+        c.insert(0, 'cluster', np.arange(n_clusters))
+        c = c.melt(id_vars=['cluster', 'size'], var_name='feature', value_name='value')
+        c.insert(0, 'year', year)
+        c.insert(1, 'ballot_code', ballot_code)
+        centroids.append(c)
+
+        new_state[prefix] = {'X': X, 'keys': districts['key'].to_numpy(dtype=str),
+                             'features': np.array(names, dtype=str),
+                             'centroids': model.centroids, 'counts': model.counts}
+    return (pd.concat(labels, ignore_index=True), pd.concat(centroids, ignore_index=True),
+            new_state, pd.DataFrame(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster districts by electoral profile (stored with the Q9 outputs).")
+    parser.add_argument('--k', type=int, default=N_CLUSTERS)
+    parser.add_argument('--cold', action='store_true', help="Ignore the stored state and fit from scratch")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("Loading vote counts and turnout...")
+    profiles = build_profiles(load_counts(), load_turnout())
+    labels, centroids, state, timings = cluster_profiles(profiles, load_state(), args.k, args.seed, args.cold)
+    save_state(state)
+
+    labels.to_csv('q9_clusters.csv', index=False, encoding='utf-8-sig')
+    centroids.to_csv('q9_cluster_centroids.csv', index=False, encoding='utf-8-sig')
+    print(timings.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.analyze_forensics import load_counts, load_turnout
+    from scripts.data_cache import read_csv_with_encoding
+    from scripts.analyze_split_ticket import BallotMatrices
+except ImportError:
+    from analyze_forensics import load_counts, load_turnout
+    from data_cache import read_csv_with_encoding
+    from analyze_split_ticket import BallotMatrices
+
+# Parties below this national share (of the 2569 ballot, or 2566 for
+# regressors) are folded into 'อื่นๆ'
+MIN_PARTY_SHARE = 0.01
+# |externally studentized residual| above this is flagged
+RESIDUAL_T = 3.0
+# Leverage above LEVERAGE_FACTOR * k / n counts as high
+LEVERAGE_FACTOR = 2.0
+HIGH_LEVERAGE_T = 2.0
+
+def share_frame(m, ballot_code, prefix=''):
+    """District x party share DataFrame (main parties + อื่นๆ) indexed by key."""
+    shares = m.cons if ballot_code == 'CONS' else m.party
+    votes = m.cons_votes if ballot_code == 'CONS' else m.party_votes
+    national = np.nansum(votes, axis=0) / np.nansum(votes)
+    main = np.flatnonzero(national >= MIN_PARTY_SHARE)
+    filled = np.nan_to_num(shares)
+    df = pd.DataFrame(filled[:, main], columns=[f"{prefix}{p}" for p in m.parties[main]], index=m.districts['key'])
+    df[f"{prefix}อื่นๆ"] = np.delete(filled, main, axis=1).sum(axis=1)
+    return df
+
+def design_matrix(prev_shares, turnout_prev, turnout_now, regions):
+    """
+    Regressors shared by every party: intercept, previous-election shares
+    (the remainder column left out, it is implied by the others), turnout
+    of both elections and region dummies (first region is the baseline).
+    Returns (X, term names).
+    """
+    parts = [pd.Series(1.0, index=prev_shares.index, name='intercept'),
+             prev_shares.drop(columns=prev_shares.columns[-1]),
+             turnout_prev.rename('turnout_2566'), turnout_now.rename('turnout_2569')]
+    dummies = pd.get_dummies(regions, prefix='region', dtype=float)
+    parts.append(dummies.iloc[:, 1:])
+    X = pd.concat(parts, axis=1)
+    return X.to_numpy(dtype=float), list(X.columns)
+
+def batched_ols(X, Y):
+    """
+    Least squares for every column of Y against the same X with one SVD.
+    Because X is shared, the hat matrix (and so the leverage) is the same
+    for every party; residual scales differ per column.
+    Returns dict with coef [k, P], fitted, residuals, leverage [n],
+    sigma [P], std_residual, student_residual, cooks_d [n, P], r2 [P], rank.
+    """
+    n = X.shape[0]
+    U, S, Vt = np.linalg.svd(X, full_matrices=False)
+    rank = int((S > S[0] * max(X.shape) * np.finfo(float).eps).sum())
+    U, S, Vt = U[:, :rank], S[:rank], Vt[:rank]
+    coef = Vt.T @ ((U.T @ Y) / S[:, None])
+    fitted = X @ coef
+    resid = Y - fitted
+    leverage = (U ** 2).sum(axis=1)
+    dof = n - rank
+    sigma = np.sqrt((resid ** 2).sum(axis=0) / dof)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = resid / (sigma[None, :] * np.sqrt(1 - leverage)[:, None])
+        # Externally studentized: the residual's own point left out of sigma
+        student = std * np.sqrt((dof - 1) / np.maximum(dof - std ** 2, 1e-12))
+        cooks = std ** 2 * (leverage / (1 - leverage))[:, None] / rank
+        tss = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+        r2 = 1 - (resid ** 2).sum(axis=0) / tss
+    return {'coef': coef, 'fitted': fitted, 'residuals': resid, 'leverage': leverage, 'sigma': sigma,
+            'std_residual': std, 'student_residual': student, 'cooks_d': cooks, 'r2': r2, 'rank': rank}
+
+def turnout_rate(turnout, year, ballot_code, keys):
+    t = turnout[(turnout['year'] == year) & (turnout['ballot_code'] == ballot_code)].set_index('key')
+    t = t.reindex(keys)
+    return t['voters_used'] / t['eligible_voters'].where(t['eligible_voters'] > 0)
+
+def fit_ballot(m2566, m2569, turnout, regions, ballot_code):
+    """
+    Fits every 2569 party share of one ballot on the 2566 shares of the
+    same ballot, turnout and region in one batched solve.
+    Returns (residual rows, coefficient rows, fit rows).
+    """
+    y = share_frame(m2569, ballot_code)
+    prev = share_frame(m2566, ballot_code, prefix='2566 ')
+    keys = y.index.intersection(prev.index)
+    t_prev = turnout_rate(turnout, 2566, ballot_code, keys)
+    t_now = turnout_rate(turnout, 2569, ballot_code, keys)
+    ok = t_prev.notna().to_numpy() & t_now.notna().to_numpy()
+    keys = keys[ok]
+    districts = m2569.districts.set_index('key').loc[keys]
+    X, terms = design_matrix(prev.loc[keys], t_prev[ok], t_now[ok], districts['province'].map(regions))
+    Y = y.loc[keys].to_numpy()
+    fit = batched_ols(X, Y)
+
+    n, k = len(keys), fit['rank']
+    high_leverage = fit['leverage'] > LEVERAGE_FACTOR * k / n
+    parties = list(y.columns)
+    d_idx, p_idx = np.meshgrid(np.arange(n), np.arange(len(parties)), indexing='ij')
+    d_idx, p_idx = d_idx.ravel(), p_idx.ravel()
+    student = fit['student_residual'].ravel()
+    residuals = pd.DataFrame({
+        'ballot_code': ballot_code,
+        'key': keys[d_idx],
+        'province': districts['province'].to_numpy()[d_idx],
+        'district_number': districts['district_number'].to_numpy()[d_idx],
+        'party': np.array(parties)[p_idx],
+        'observed': Y.ravel(),
+        'expected': fit['fitted'].ravel(),
+        'residual': fit['residuals'].ravel(),
+        'std_residual': fit['std_residual'].ravel(),
+        'student_residual': student,
+        'leverage': fit['leverage'][d_idx],
+        'cooks_d': fit['cooks_d'].ravel(),
+    })
+    flag = np.where(np.abs(student) > RESIDUAL_T, 'Large residual',
+                    np.where(high_leverage[d_idx] & (np.abs(student) > HIGH_LEVERAGE_T), 'High leverage + residual', ''))
+    residuals['flag'] = flag
+
+    coefficients = pd.DataFrame(fit['coef'], index=terms, columns=parties).reset_index(names='term') \
+        .melt(id_vars='term', var_name='party', value_name='coef')
+    coefficients.insert(0, 'ballot_code', ballot_code)
+    fits = pd.DataFrame({'ballot_code': ballot_code, 'party': parties, 'n': n, 'k': k,
+                         'r2': fit['r2'], 'sigma': fit['sigma']})
+    return residuals, coefficients, fits
+
+def main():
+    print("Loading vote counts and turnout...")
+    counts = load_counts()
+    turnout = load_turnout()
+    geo = read_csv_with_encoding('data/m_turnout_master.csv')
+    regions = geo.drop_duplicates('province').set_index('province')['region']
+
+    m2566 = BallotMatrices(counts, turnout, 2566)
+    m2569 = BallotMatrices(counts, turnout, 2569)
+    residuals, coefficients, fits = [], [], []
+    for ballot_code in ('CONS', 'PARTY'):
+        print(f"Fitting expected 2569 shares ({ballot_code})...")
+        r, c, f = fit_ballot(m2566, m2569, turnout, regions, ballot_code)
+        residuals.append(r)
+        coefficients.append(c)
+        fits.append(f)
+
+    df_resid = pd.concat(residuals, ignore_index=True)
+    df_resid.to_csv('q15_expected_residuals.csv', index=False, encoding='utf-8-sig')
+    df_resid[df_resid['flag'] != ''].sort_values('student_residual', key=np.abs, ascending=False) \
+        .to_csv('q15_expected_flags.csv', index=False, encoding='utf-8-sig')
+    pd.concat(coefficients, ignore_index=True).to_csv('q15_expected_coefficients.csv', index=False, encoding='utf-8-sig')
+    df_fits = pd.concat(fits, ignore_index=True)
+    df_fits.to_csv('q15_expected_fit.csv', index=False, encoding='utf-8-sig')
+    print(df_fits.to_string(index=False))
+    print(f"{int((df_resid['flag'] != '').sum())} district-party residuals flagged.")
+
+if __name__ == "__main__":
+    main()
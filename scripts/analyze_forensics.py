@@ -0,0 +1,317 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.warehouse import load_table
+except ImportError:
+    from warehouse import load_table
+
+# Digit tests only use counts large enough for the digit to carry information
+SECOND_DIGIT_MIN = 10
+LAST_DIGIT_MIN = 100
+# Groups need this many usable counts before a digit test is run
+MIN_COUNTS = 10
+# Monte Carlo / permutation draws for the null distributions
+DRAWS = 2000
+# Draws per seeded chunk; chunks, not workers, fix the random streams, so
+# results do not depend on --workers
+CHUNK_DRAWS = 250
+# Flags use Benjamini-Hochberg q-values within a test, year, ballot and level
+FDR = 0.05
+# Robust z-score cutoffs (median / MAD within year and ballot)
+FINGERPRINT_Z = 2.0
+INVALID_Z = 3.0
+
+# Second-digit Benford probabilities for d = 0..9
+BENFORD_2ND = np.array([sum(np.log10(1 + 1 / (10 * k + d)) for k in range(1, 10)) for d in range(10)])
+UNIFORM = np.full(10, 0.1)
+
+def load_counts(year=None, ballot_code=None):
+    """
+    Candidate and party vote counts (all years and ballots unless filtered).
+    Filters are pushed down to the warehouse partitions (see warehouse.py).
+    Returns DataFrame with: year, ballot_code, key (Province_Dist), province, district_number, party, votes
+    """
+    return load_table('votes', year=year, ballot_code=ballot_code)
+
+def load_turnout(year=None, ballot_code=None):
+    """
+    Turnout rows (all years and ballots unless filtered).
+    Returns DataFrame with: year, ballot_code, key, province, district_number,
+    eligible_voters, voters_used, invalid_votes, no_vote
+    """
+    return load_table('turnout', year=year, ballot_code=ballot_code)
+
+# --- Vectorized statistics ---
+
+def second_digits(values):
+    """Second significant digit of each value (values must be >= 10)."""
+    values = np.asarray(values, dtype=np.int64)
+    n_digits = np.floor(np.log10(values)).astype(np.int64)
+    # Guard against log10 rounding at exact powers of ten
+    power = 10 ** n_digits
+    n_digits -= values < power
+    n_digits += values >= 10 * power
+    return (values // 10 ** (n_digits - 1)) % 10
+
+def digit_table(group_idx, digits, n_groups):
+    """(n_groups, 10) matrix of digit counts per group."""
+    flat = np.bincount(group_idx * 10 + digits, minlength=n_groups * 10)
+    return flat.reshape(n_groups, 10)
+
+def chi_square(counts, expected_p):
+    """Pearson chi-square of each row of counts against expected_p."""
+    n = counts.sum(axis=-1, keepdims=True)
+    expected = n * expected_p
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n[..., 0] > 0, ((counts - expected) ** 2 / expected).sum(axis=-1), np.nan)
+
+def _multinomial_null(args):
+    """Worker: chi-square draws (len(sizes), draws) for multinomial(size, p)."""
+    sizes, p, draws, seed = args
+    rng = np.random.default_rng(seed)
+    sims = rng.multinomial(sizes[:, None], p, size=(len(sizes), draws))
+    return chi_square(sims, p)
+
+def _permutation_null(args):
+    """
+    Worker: within-group permutation draws of sum(x * y) per group.
+    Rows are sorted by group; adding U(0,1) to the group index and sorting
+    shuffles every group at once without mixing groups.
+    """
+    x, y, group_idx, starts, draws, seed = args
+    rng = np.random.default_rng(seed)
+    keys = group_idx[None, :] + rng.random((draws, len(group_idx)))
+    perm = np.argsort(keys, axis=1)
+    return np.add.reduceat(x[None, :] * y[perm], starts, axis=1).T
+
+def _parallel(worker, make_args, draws, seed, workers):
+    """
+    Splits draws into chunks of CHUNK_DRAWS (own seed each), runs them on
+    up to workers processes and concatenates on axis 1.
+    """
+    chunks = [CHUNK_DRAWS] * (draws // CHUNK_DRAWS) + ([draws % CHUNK_DRAWS] if draws % CHUNK_DRAWS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [make_args(n, s) for n, s in zip(chunks, seeds)]
+    workers = min(max(1, workers), len(tasks))
+    if workers == 1:
+        return np.concatenate([worker(t) for t in tasks], axis=1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(worker, tasks)), axis=1)
+
+def monte_carlo_p(observed, sizes, p, draws=DRAWS, seed=0, workers=1):
+    """
+    Monte Carlo p-values of chi-square statistics: each group is compared
+    with draws from multinomial(its own count, p), one simulation per
+    distinct group size.
+    """
+    observed = np.asarray(observed, dtype=float)
+    sizes = np.asarray(sizes, dtype=np.int64)
+    p_values = np.full(len(observed), np.nan)
+    ok = sizes > 0
+    if not ok.any():
+        return p_values
+    unique, inverse = np.unique(sizes[ok], return_inverse=True)
+    null = _parallel(_multinomial_null, lambda n, s: (unique, p, n, s), draws, seed, workers)
+    exceed = (null[inverse] >= observed[ok, None]).sum(axis=1)
+    p_values[ok] = (exceed + 1) / (null.shape[1] + 1)
+    return p_values
+
+def bh_qvalues(p_values):
+    """Benjamini-Hochberg adjusted p-values (NaN stays NaN)."""
+    p_values = np.asarray(p_values, dtype=float)
+    q = np.full(len(p_values), np.nan)
+    ok = np.flatnonzero(~np.isnan(p_values))
+    if len(ok) == 0:
+        return q
+    order = ok[np.argsort(p_values[ok])]
+    ranked = p_values[order] * len(ok) / np.arange(1, len(ok) + 1)
+    q[order] = np.minimum.accumulate(ranked[::-1])[::-1].clip(max=1)
+    return q
+
+def robust_z(values, groups):
+    """(value - median) / (1.4826 * MAD) within each group."""
+    values = pd.Series(values)
+    grouped = values.groupby(groups)
+    median = grouped.transform('median')
+    mad = (values - median).abs().groupby(groups).transform('median') * 1.4826
+    return ((values - median) / mad.where(mad > 0)).to_numpy()
+
+# --- Tests ---
+
+def digit_tests(counts, level, draws=DRAWS, seed=0, workers=1):
+    """
+    Benford second-digit and last-digit uniformity tests for every
+    (year, ballot_code, unit) group, where unit is the district key or the
+    province. All groups are tabulated with one bincount.
+    Returns DataFrame with: year, ballot_code, <unit>, n_counts, benford2_n,
+    benford2_mean, benford2_chi2, benford2_p, lastdigit_n, lastdigit_chi2, lastdigit_p
+    """
+    unit = 'key' if level == 'district' else 'province'
+    groups = counts.groupby(['year', 'ballot_code', unit], sort=True).ngroup().to_numpy()
+    index = counts.groupby(['year', 'ballot_code', unit], sort=True).size().reset_index(name='n_counts')
+    n_groups = len(index)
+    votes = counts['votes'].to_numpy()
+
+    ok2 = votes >= SECOND_DIGIT_MIN
+    table2 = digit_table(groups[ok2], second_digits(votes[ok2]), n_groups)
+    okl = votes >= LAST_DIGIT_MIN
+    tablel = digit_table(groups[okl], votes[okl] % 10, n_groups)
+
+    result = index
+    for name, table, p in (('benford2', table2, BENFORD_2ND), ('lastdigit', tablel, UNIFORM)):
+        n = table.sum(axis=1)
+        chi2 = np.where(n >= MIN_COUNTS, chi_square(table, p), np.nan)
+        result[f"{name}_n"] = n
+        if name == 'benford2':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result['benford2_mean'] = np.where(n >= MIN_COUNTS, (table * np.arange(10)).sum(axis=1) / n, np.nan)
+        result[f"{name}_chi2"] = chi2
+        sizes = np.where(np.isnan(chi2), 0, n)
+        result[f"{name}_p"] = monte_carlo_p(chi2, sizes, p, draws, seed + (name == 'lastdigit'), workers)
+    return result
+
+def district_table(counts, turnout):
+    """
+    Turnout rows joined with the winner's share of voters_used.
+    Returns DataFrame with: year, ballot_code, key, province, district_number,
+    turnout_rate, winner_share, invalid_rate
+    """
+    winner = counts.groupby(['year', 'ballot_code', 'key'])['votes'].max().rename('winner_votes').reset_index()
+    df = turnout.merge(winner, on=['year', 'ballot_code', 'key'], how='left')
+    used = df['voters_used'].where(df['voters_used'] > 0)
+    df['turnout_rate'] = used / df['eligible_voters'].where(df['eligible_voters'] > 0)
+    df['winner_share'] = df['winner_votes'] / used
+    df['invalid_rate'] = df['invalid_votes'] / used
+    return df
+
+def fingerprint_permutation(districts, draws=DRAWS, seed=0, workers=1):
+    """
+    Within-province correlation of turnout and winner share, with a
+    one-sided permutation p-value (winner shares shuffled within the
+    province). All provinces of a year and ballot are permuted together.
+    Returns DataFrame with: year, ballot_code, province, fingerprint_corr, fingerprint_p
+    """
+    frames = []
+    df = districts.dropna(subset=['turnout_rate', 'winner_share'])
+    for (year, ballot_code), grp in df.groupby(['year', 'ballot_code']):
+        grp = grp.sort_values('province', kind='stable')
+        group_idx = grp.groupby('province', sort=True).ngroup().to_numpy()
+        provinces = grp['province'].unique()
+        starts = np.flatnonzero(np.r_[True, group_idx[1:] != group_idx[:-1]])
+        sizes = np.diff(np.r_[starts, len(group_idx)])
+        x = grp['turnout_rate'].to_numpy()
+        y = grp['winner_share'].to_numpy()
+        sx, sy = np.add.reduceat(x, starts), np.add.reduceat(y, starts)
+        sxx, syy = np.add.reduceat(x * x, starts), np.add.reduceat(y * y, starts)
+        sxy = np.add.reduceat(x * y, starts)
+        cov_denominator = np.sqrt((sxx - sx ** 2 / sizes) * (syy - sy ** 2 / sizes))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = (sxy - sx * sy / sizes) / cov_denominator
+            null_sxy = _parallel(_permutation_null, lambda n, s: (x, y, group_idx, starts, n, s), draws, seed, workers)
+            null_corr = (null_sxy - (sx * sy / sizes)[:, None]) / cov_denominator[:, None]
+        exceed = (null_corr >= corr[:, None] - 1e-12).sum(axis=1)
+        p = np.where((sizes >= 3) & np.isfinite(corr), (exceed + 1) / (draws + 1), np.nan)
+        frames.append(pd.DataFrame({'year': year, 'ballot_code': ballot_code, 'province': provinces,
+                                    'n_districts': sizes, 'fingerprint_corr': corr, 'fingerprint_p': p}))
+    return pd.concat(frames, ignore_index=True)
+
+def _flags(df, tests):
+    """Joins the names of the tests whose condition holds, per row."""
+    flags = pd.Series([''] * len(df), index=df.index)
+    for name, condition in tests:
+        hit = condition.fillna(False).astype(bool)
+        flags[hit] = flags[hit].where(flags[hit] == '', flags[hit] + ', ') + name
+    return flags
+
+def add_qvalues(df, columns):
+    """BH q-value column per p-value column, within each year and ballot."""
+    for col in columns:
+        q_col = col.replace('_p', '_q')
+        df[q_col] = np.nan
+        for _, idx in df.groupby(['year', 'ballot_code']).groups.items():
+            df.loc[idx, q_col] = bh_qvalues(df.loc[idx, col].to_numpy())
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description="Digit and statistical forensics screening of all vote counts (Q11).")
+    parser.add_argument('--draws', type=int, default=DRAWS, help="Monte Carlo / permutation draws")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=2569)
+    args = parser.parse_args()
+
+    print("Loading vote counts and turnout...")
+    counts = load_counts()
+    turnout = load_turnout()
+    print(f"{len(counts)} vote counts, {len(turnout)} turnout rows")
+
+    print("Running digit tests...")
+    d_digits = digit_tests(counts, 'district', args.draws, args.seed, args.workers)
+    p_digits = digit_tests(counts, 'province', args.draws, args.seed + 10, args.workers)
+
+    print("Running turnout / winner-share and invalid-vote tests...")
+    districts = district_table(counts, turnout)
+    groups = [districts['year'], districts['ballot_code']]
+    districts['turnout_z'] = robust_z(districts['turnout_rate'], groups)
+    districts['winner_share_z'] = robust_z(districts['winner_share'], groups)
+    districts['invalid_z'] = robust_z(districts['invalid_rate'], groups)
+    fingerprint = fingerprint_permutation(districts, args.draws, args.seed + 20, args.workers)
+
+    # District level
+    district = districts.merge(d_digits, on=['year', 'ballot_code', 'key'], how='left')
+    district = add_qvalues(district, ['benford2_p', 'lastdigit_p'])
+    district['flags'] = _flags(district, [
+        ('Benford 2BL', district['benford2_q'] < FDR),
+        ('Last digit', district['lastdigit_q'] < FDR),
+        ('Turnout-winner fingerprint', (district['turnout_z'] > FINGERPRINT_Z) & (district['winner_share_z'] > FINGERPRINT_Z)),
+        ('Invalid outlier', district['invalid_z'] > INVALID_Z),
+    ])
+
+    # Province level
+    totals = districts.groupby(['year', 'ballot_code', 'province']).agg(
+        voters_used=('voters_used', 'sum'), eligible_voters=('eligible_voters', 'sum'),
+        invalid_votes=('invalid_votes', 'sum')).reset_index()
+    totals['turnout_rate'] = totals['voters_used'] / totals['eligible_voters'].where(totals['eligible_voters'] > 0)
+    totals['invalid_rate'] = totals['invalid_votes'] / totals['voters_used'].where(totals['voters_used'] > 0)
+    totals['invalid_z'] = robust_z(totals['invalid_rate'], [totals['year'], totals['ballot_code']])
+    province = totals.merge(p_digits, on=['year', 'ballot_code', 'province'], how='left') \
+        .merge(fingerprint, on=['year', 'ballot_code', 'province'], how='left')
+    province = add_qvalues(province, ['benford2_p', 'lastdigit_p', 'fingerprint_p'])
+    province['flags'] = _flags(province, [
+        ('Benford 2BL', province['benford2_q'] < FDR),
+        ('Last digit', province['lastdigit_q'] < FDR),
+        ('Turnout-winner fingerprint', province['fingerprint_q'] < FDR),
+        ('Invalid outlier', province['invalid_z'] > INVALID_Z),
+    ])
+
+    district_cols = ['year', 'ballot_code', 'key', 'province', 'district_number', 'turnout_rate', 'winner_share',
+                     'invalid_rate', 'turnout_z', 'winner_share_z', 'invalid_z', 'n_counts',
+                     'benford2_n', 'benford2_mean', 'benford2_chi2', 'benford2_p', 'benford2_q',
+                     'lastdigit_n', 'lastdigit_chi2', 'lastdigit_p', 'lastdigit_q', 'flags']
+    district = district[district_cols].sort_values(['year', 'ballot_code', 'province', 'district_number'])
+    district.to_csv('q11_forensics_district.csv', index=False, encoding='utf-8-sig')
+    province = province.sort_values(['year', 'ballot_code', 'province'])
+    province.to_csv('q11_forensics_province.csv', index=False, encoding='utf-8-sig')
+    district[district['flags'] != ''].to_csv('q11_forensics_flags.csv', index=False, encoding='utf-8-sig')
+
+    tests = ['Benford 2BL', 'Last digit', 'Turnout-winner fingerprint', 'Invalid outlier']
+    summary = []
+    for level, df in (('district', district), ('province', province)):
+        for (year, ballot_code), grp in df.groupby(['year', 'ballot_code']):
+            flags = grp['flags'].str.split(', ').explode()
+            row = {'level': level, 'year': year, 'ballot_code': ballot_code, 'units': len(grp),
+                   'flagged': int((grp['flags'] != '').sum())}
+            hits = flags[flags != ''].value_counts()
+            row.update({t: int(hits.get(t, 0)) for t in tests})
+            summary.append(row)
+    pd.DataFrame(summary).to_csv('q11_forensics_summary.csv', index=False, encoding='utf-8-sig')
+    print(f"Forensics complete. {int((district['flags'] != '').sum())} districts and "
+          f"{int((province['flags'] != '').sum())} provinces flagged.")
+
+if __name__ == "__main__":
+    main()
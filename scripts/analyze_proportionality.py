@@ -0,0 +1,230 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.analyze_forensics import load_counts, load_turnout
+    from scripts.data_cache import read_csv_with_encoding
+    from scripts.analyze_split_ticket import BallotMatrices
+except ImportError:
+    from analyze_forensics import load_counts, load_turnout
+    from data_cache import read_csv_with_encoding
+    from analyze_split_ticket import BallotMatrices
+
+LEVELS = ['national', 'region', 'province']
+BOOTSTRAP_DRAWS = 1000
+# Bootstrap draws per seeded chunk; the chunks, not --workers, fix the
+# random streams, so intervals do not depend on the core count
+CHUNK_DRAWS = 100
+# Uniform swings (share points) applied to one party for the seat-vote curves
+SWINGS = np.round(np.arange(-0.10, 0.1001, 0.01), 2)
+# Parties get a seat-vote curve if they reach this national vote share or win a seat
+CURVE_MIN_SHARE = 0.01
+CI = (2.5, 97.5)
+
+def region_map():
+    """province -> region, from the 2569 master (same province names in 2566)."""
+    turnout = read_csv_with_encoding('data/m_turnout_master.csv')
+    return turnout.drop_duplicates('province').set_index('province')['region'].to_dict()
+
+def district_inputs(m):
+    """
+    Constituency votes and seats of one year's BallotMatrices.
+    Returns (votes[d, p], seats[d, p], wasted[d, p]); wasted counts every
+    loser vote and the winner's votes beyond the runner-up plus one.
+    """
+    votes = np.nan_to_num(m.cons_votes)
+    order = np.argsort(-votes, axis=1)
+    rows = np.arange(len(votes))
+    winner, runner_up = order[:, 0], order[:, 1]
+    seats = np.zeros_like(votes)
+    has_votes = votes[rows, winner] > 0
+    seats[rows[has_votes], winner[has_votes]] = 1
+    wasted = votes.copy()
+    surplus = votes[rows, winner] - votes[rows, runner_up] - 1
+    wasted[rows, winner] = np.where(has_votes, np.maximum(surplus, 0), 0)
+    return votes, seats, wasted
+
+def unit_index(districts, regions):
+    """
+    Stacks every unit of every level into one list so a single matrix
+    product aggregates all of them. Returns (units DataFrame, group matrix
+    G[unit, district] of 0/1).
+    """
+    labels = {
+        'national': np.full(len(districts), ''),
+        'region': districts['province'].map(regions).fillna('').to_numpy(),
+        'province': districts['province'].to_numpy(),
+    }
+    units, blocks = [], []
+    for level in LEVELS:
+        names, codes = np.unique(labels[level], return_inverse=True)
+        block = np.zeros((len(names), len(districts)))
+        block[codes, np.arange(len(districts))] = 1
+        units.append(pd.DataFrame({'level': level, 'unit': names}))
+        blocks.append(block)
+    return pd.concat(units, ignore_index=True), np.vstack(blocks)
+
+def unit_metrics(V, S):
+    """
+    Disproportionality and fragmentation for stacked unit x party vote and
+    seat totals (leading axes may be batched, e.g. bootstrap draws).
+    Returns a dict of arrays over the leading axes.
+    """
+    total_v = V.sum(axis=-1, keepdims=True)
+    total_s = S.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        v = V / total_v
+        s = S / total_s
+        diff = v - s
+        return {
+            'gallagher': np.sqrt(0.5 * (diff ** 2).sum(axis=-1)) * 100,
+            'loosemore_hanby': 0.5 * np.abs(diff).sum(axis=-1) * 100,
+            'enp_votes': 1 / (v ** 2).sum(axis=-1),
+            'enp_seats': np.where(total_s[..., 0] > 0, 1 / (s ** 2).sum(axis=-1), np.nan),
+        }
+
+def _bootstrap_worker(args):
+    """Worker: metrics over districts resampled with replacement within every unit."""
+    G, votes, seats, draws, seed = args
+    rng = np.random.default_rng(seed)
+    n_units = G.shape[0]
+    sizes = G.sum(axis=1).astype(np.int64)
+    members = [np.flatnonzero(G[u]) for u in range(n_units)]
+    out = {k: np.empty((n_units, draws)) for k in ('gallagher', 'loosemore_hanby', 'enp_votes', 'enp_seats')}
+    for b in range(draws):
+        # Resampling weights: how often each district is drawn, per unit
+        W = np.zeros_like(G)
+        for u in range(n_units):
+            if sizes[u]:
+                W[u, members[u]] = rng.multinomial(sizes[u], np.full(sizes[u], 1 / sizes[u]))
+        metrics = unit_metrics(W @ votes, W @ seats)
+        for k in out:
+            out[k][:, b] = metrics[k]
+    return out
+
+def _seat_curve_worker(args):
+    """
+    Worker: seats a party would win under uniform swings. Its share in each
+    district moves by the swing (floored at 0) and the other parties absorb
+    the difference in proportion to their votes.
+    """
+    votes, party_indices, swings = args
+    totals = votes.sum(axis=1, keepdims=True)
+    shares = np.divide(votes, totals, out=np.zeros_like(votes), where=totals > 0)
+    rows = []
+    for p in party_indices:
+        own = shares[:, p]
+        others = shares.copy()
+        others[:, p] = 0
+        other_total = others.sum(axis=1)
+        for swing in swings:
+            new_own = np.clip(own + swing, 0, 1)
+            scale = np.divide(1 - new_own, other_total, out=np.zeros_like(other_total), where=other_total > 0)
+            best_other = (others * scale[:, None]).max(axis=1)
+            won = (new_own > best_other) & (totals[:, 0] > 0)
+            national_share = (new_own * totals[:, 0]).sum() / totals.sum()
+            rows.append((p, swing, national_share, int(won.sum())))
+    return rows
+
+def _pool_map(worker, tasks, workers):
+    if workers <= 1 or len(tasks) <= 1:
+        return [worker(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(worker, tasks))
+
+def analyze_year(m, regions, draws=BOOTSTRAP_DRAWS, seed=0, workers=1):
+    """
+    All metrics of one year. Returns (units table, party table, seat-vote curves).
+    """
+    votes, seats, wasted = district_inputs(m)
+    units, G = unit_index(m.districts, regions)
+
+    # One pass: every unit of every level at once
+    V, S, Wv = G @ votes, G @ seats, G @ wasted
+    metrics = unit_metrics(V, S)
+    for k, v in metrics.items():
+        units[k] = v
+    units['districts'] = G.sum(axis=1).astype(int)
+
+    # Bootstrap intervals, seeded chunks of draws split across the pool
+    chunks = [CHUNK_DRAWS] * (draws // CHUNK_DRAWS) + ([draws % CHUNK_DRAWS] if draws % CHUNK_DRAWS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    parts = _pool_map(_bootstrap_worker, [(G, votes, seats, n, s) for n, s in zip(chunks, seeds)], workers)
+    for k in metrics:
+        boot = np.concatenate([p[k] for p in parts], axis=1)
+        units[f"{k}_lo"] = np.nanpercentile(boot, CI[0], axis=1)
+        units[f"{k}_hi"] = np.nanpercentile(boot, CI[1], axis=1)
+    lead = V.argmax(axis=1)
+    rows = np.arange(len(units))
+    units['largest_party'] = m.parties[lead]
+    units['largest_vote_share'] = V[rows, lead] / V.sum(axis=1)
+    units['largest_seat_share'] = S[rows, lead] / np.where(S.sum(axis=1) > 0, S.sum(axis=1), np.nan)
+    units.insert(0, 'year', m.year)
+
+    # Per party and unit: votes, seats, wasted votes, efficiency gap
+    u, p = np.nonzero(V > 0)
+    total_v, total_w = V.sum(axis=1), Wv.sum(axis=1)
+    parties = pd.DataFrame({
+        'year': m.year,
+        'level': units['level'].to_numpy()[u],
+        'unit': units['unit'].to_numpy()[u],
+        'party': m.parties[p],
+        'votes': V[u, p],
+        'seats': S[u, p].astype(int),
+        'vote_share': V[u, p] / total_v[u],
+        'seat_share': S[u, p] / units['districts'].to_numpy()[u],
+        'wasted_votes': Wv[u, p],
+        'wasted_share': Wv[u, p] / V[u, p],
+        # Share of all wasted votes minus share of all votes; > 0 means the party wastes more than its weight
+        'efficiency_gap': Wv[u, p] / total_w[u] - V[u, p] / total_v[u],
+    })
+
+    # Seat-vote curves for the national contenders, one pool task per party group
+    national_share = votes.sum(axis=0) / votes.sum()
+    contenders = np.flatnonzero((national_share >= CURVE_MIN_SHARE) | (seats.sum(axis=0) > 0))
+    tasks = [(votes, group, SWINGS) for group in np.array_split(contenders, max(1, workers)) if len(group)]
+    curve_rows = [r for part in _pool_map(_seat_curve_worker, tasks, workers) for r in part]
+    curves = pd.DataFrame(curve_rows, columns=['party_index', 'swing', 'vote_share', 'seats'])
+    curves.insert(0, 'year', m.year)
+    curves.insert(1, 'party', m.parties[curves['party_index'].to_numpy()])
+    curves['seat_share'] = curves['seats'] / len(votes)
+    curves = curves.drop(columns='party_index')
+    return units, parties, curves
+
+def main():
+    parser = argparse.ArgumentParser(description="Proportionality and seat-vote metrics with bootstrap intervals (Q13).")
+    parser.add_argument('--draws', type=int, default=BOOTSTRAP_DRAWS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=2569)
+    args = parser.parse_args()
+
+    print("Loading vote counts and turnout...")
+    counts = load_counts()
+    turnout = load_turnout()
+    regions = region_map()
+
+    units, parties, curves = [], [], []
+    for year in sorted(counts['year'].unique()):
+        print(f"Computing proportionality metrics {year}...")
+        m = BallotMatrices(counts, turnout, year)
+        u, p, c = analyze_year(m, regions, args.draws, args.seed + int(year), args.workers)
+        units.append(u)
+        parties.append(p)
+        curves.append(c)
+
+    df_units = pd.concat(units, ignore_index=True)
+    df_units.to_csv('q13_proportionality.csv', index=False, encoding='utf-8-sig')
+    pd.concat(parties, ignore_index=True).to_csv('q13_party_wasted_votes.csv', index=False, encoding='utf-8-sig')
+    pd.concat(curves, ignore_index=True).to_csv('q13_seat_vote_curves.csv', index=False, encoding='utf-8-sig')
+
+    national = df_units[df_units['level'] == 'national']
+    for row in national.itertuples():
+        print(f"{row.year}: Gallagher {row.gallagher:.2f} [{row.gallagher_lo:.2f}, {row.gallagher_hi:.2f}], "
+              f"ENP votes {row.enp_votes:.2f}, ENP seats {row.enp_seats:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.analyze_forensics import load_counts, load_turnout
+except ImportError:
+    from analyze_forensics import load_counts, load_turnout
+
+class BallotMatrices:
+    """
+    Aligned district x party vote-share matrices of both ballots for one year.
+    cons[d, p] / party[d, p] are shares of voters_used (NaN where the party
+    has no candidate / no party-list count in that district). Everything
+    downstream is whole-matrix numpy, so all parties are handled at once.
+    """
+
+    def __init__(self, counts, turnout, year):
+        counts = counts[counts['year'] == year]
+        turnout = turnout[turnout['year'] == year]
+        districts = turnout[turnout['ballot_code'] == 'CONS'][['key', 'province', 'district_number']] \
+            .drop_duplicates('key').sort_values(['province', 'district_number']).reset_index(drop=True)
+        self.year = year
+        self.districts = districts
+        self.parties = np.array(sorted(counts['party'].dropna().unique()))
+        d_index = pd.Index(districts['key'])
+        p_index = pd.Index(self.parties)
+
+        self.voters = {}
+        for ballot_code, attr in (('CONS', 'cons'), ('PARTY', 'party')):
+            used = turnout[turnout['ballot_code'] == ballot_code].set_index('key')['voters_used']
+            voters = used.reindex(d_index).to_numpy(dtype=float)
+            voters[voters <= 0] = np.nan
+            rows = counts[(counts['ballot_code'] == ballot_code) & counts['key'].isin(d_index)]
+            d = d_index.get_indexer(rows['key'])
+            p = p_index.get_indexer(rows['party'])
+            votes = np.full((len(d_index), len(p_index)), np.nan)
+            # Several rows of one party in a district add up
+            votes[d, p] = 0
+            np.add.at(votes, (d, p), rows['votes'].to_numpy(dtype=float))
+            self.voters[ballot_code] = voters
+            setattr(self, f"{attr}_votes", votes)
+            setattr(self, attr, votes / voters[:, None])
+        # Parties with a party-list count anywhere this year (2566: six named parties)
+        self.party_list_known = ~np.isnan(self.party).all(axis=0)
+
+    def personal_vote(self):
+        """Candidate share minus party-list share (NaN unless both exist)."""
+        return self.cons - self.party
+
+    def split_index(self):
+        """
+        Dissimilarity between the two ballots per district: half the sum of
+        |cons - party| over the parties with party-list counts, plus the
+        remainder (other parties, invalid and no-vote ballots) as one bucket.
+        The share of voters who must have split their ticket, at minimum.
+        """
+        known = self.party_list_known
+        cons = np.nan_to_num(self.cons[:, known])
+        party = np.nan_to_num(self.party[:, known])
+        rest = np.abs((1 - cons.sum(axis=1)) - (1 - party.sum(axis=1)))
+        return 0.5 * (np.abs(cons - party).sum(axis=1) + rest)
+
+    def winners(self):
+        """(cons winner index, party-list winner index) per district (-1 if none)."""
+        def leader(matrix):
+            filled = np.where(np.isnan(matrix), -np.inf, matrix)
+            idx = filled.argmax(axis=1)
+            idx[np.isinf(filled.max(axis=1))] = -1
+            return idx
+        return leader(self.cons), leader(self.party)
+
+def district_table(m):
+    """
+    Returns DataFrame with: year, key, province, district_number, cons_winner,
+    cons_winner_share, party_winner, party_winner_share, winner_differs, split_index
+    """
+    cons_w, party_w = m.winners()
+    rows = np.arange(len(m.districts))
+    name = lambda idx: np.where(idx >= 0, m.parties[np.maximum(idx, 0)], None)
+    share = lambda matrix, idx: np.where(idx >= 0, matrix[rows, np.maximum(idx, 0)], np.nan)
+    df = m.districts.copy()
+    df.insert(0, 'year', m.year)
+    df['cons_winner'] = name(cons_w)
+    df['cons_winner_share'] = share(m.cons, cons_w)
+    df['party_winner'] = name(party_w)
+    df['party_winner_share'] = share(m.party, party_w)
+    df['winner_differs'] = (cons_w >= 0) & (party_w >= 0) & (cons_w != party_w)
+    df['split_index'] = m.split_index()
+    return df
+
+def personal_vote_table(m):
+    """
+    Long table of every (district, party) where the party both ran a
+    candidate and has a party-list count.
+    Returns DataFrame with: year, key, province, district_number, party,
+    cons_share, party_share, personal_vote
+    """
+    pv = m.personal_vote()
+    d, p = np.nonzero(~np.isnan(pv))
+    df = m.districts.iloc[d].reset_index(drop=True)
+    df.insert(0, 'year', m.year)
+    df['party'] = m.parties[p]
+    df['cons_share'] = m.cons[d, p]
+    df['party_share'] = m.party[d, p]
+    df['personal_vote'] = pv[d, p]
+    return df
+
+def party_summary(m):
+    """
+    Per-party split indicators over the districts the party contested on
+    both ballots, computed column-wise for all parties at once.
+    Returns DataFrame with: year, party, districts, cons_votes, party_votes,
+    mean_personal_vote, weighted_personal_vote, outperform_rate, cons_party_corr
+    """
+    pv = m.personal_vote()
+    both = ~np.isnan(pv)
+    n = both.sum(axis=0)
+    cons_votes = np.where(both, m.cons_votes, 0).sum(axis=0)
+    party_votes = np.where(both, m.party_votes, 0).sum(axis=0)
+    voters = np.where(both, m.voters['CONS'][:, None], 0).sum(axis=0)
+
+    cons = np.where(both, m.cons, np.nan)
+    party = np.where(both, m.party, np.nan)
+    # Parties with no district on both ballots give all-NaN columns; they are dropped below
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean_pv = np.nanmean(pv, axis=0)
+        # Personal vote in votes: candidate votes vs the party-list share applied to the same voters
+        weighted_pv = (cons_votes - np.nansum(party * m.voters['CONS'][:, None], axis=0)) / voters
+        outperform = (pv > 0).sum(axis=0) / n
+        cc = cons - np.nanmean(cons, axis=0)
+        pc = party - np.nanmean(party, axis=0)
+        corr = np.nansum(cc * pc, axis=0) / np.sqrt(np.nansum(cc ** 2, axis=0) * np.nansum(pc ** 2, axis=0))
+    df = pd.DataFrame({
+        'year': m.year,
+        'party': m.parties,
+        'districts': n,
+        'cons_votes': cons_votes,
+        'party_votes': party_votes,
+        'mean_personal_vote': mean_pv,
+        'weighted_personal_vote': weighted_pv,
+        'outperform_rate': outperform,
+        'cons_party_corr': np.where(n >= 3, corr, np.nan),
+    })
+    return df[df['districts'] > 0].sort_values('cons_votes', ascending=False).reset_index(drop=True)
+
+def main():
+    print("Loading vote counts and turnout...")
+    counts = load_counts()
+    turnout = load_turnout()
+
+    districts, personal, parties = [], [], []
+    for year in sorted(counts['year'].unique()):
+        print(f"Building ballot matrices {year}...")
+        m = BallotMatrices(counts, turnout, year)
+        districts.append(district_table(m))
+        personal.append(personal_vote_table(m))
+        parties.append(party_summary(m))
+
+    df_districts = pd.concat(districts, ignore_index=True)
+    df_districts.to_csv('q12_split_district.csv', index=False, encoding='utf-8-sig')
+    df_districts[df_districts['winner_differs']].to_csv('q12_winner_differs.csv', index=False, encoding='utf-8-sig')
+    pd.concat(personal, ignore_index=True).to_csv('q12_personal_vote.csv', index=False, encoding='utf-8-sig')
+    pd.concat(parties, ignore_index=True).to_csv('q12_party_split_summary.csv', index=False, encoding='utf-8-sig')
+
+    for year, grp in df_districts.groupby('year'):
+        print(f"{year}: {int(grp['winner_differs'].sum())} districts with different winners, "
+              f"mean split index {grp['split_index'].mean():.3f}")
+
+if __name__ == "__main__":
+    main()
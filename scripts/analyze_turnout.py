@@ -1,18 +1,13 @@
 import pandas as pd
+import numpy as np
 import os
 
-def read_csv_with_encoding(filepath):
-    """
-    Attempts to read a CSV file with multiple encodings.
-    Tries utf-8, then tis-620, then cp874.
-    """
-    try:
-        return pd.read_csv(filepath, encoding='utf-8')
-    except UnicodeDecodeError:
-        try:
-            return pd.read_csv(filepath, encoding='tis-620')
-        except UnicodeDecodeError:
-            return pd.read_csv(filepath, encoding='cp874')
+try:
+    from scripts.data_cache import read_csv_with_encoding
+    from scripts.turnout_analytics import load_amphoe_composition, rollup, top_k_indices, TurnoutRanking
+except ImportError:
+    from data_cache import read_csv_with_encoding
+    from turnout_analytics import load_amphoe_composition, rollup, top_k_indices, TurnoutRanking
 
 def get_turnout_data(data_dir='data'):
     """
@@ -119,9 +114,9 @@ def get_turnout_data(data_dir='data'):
             print(f"Warning: {len(zeros)} districts with 0 eligible voters for {code}")
             # print(zeros[['district_label', 'province']])
         
-        df['turnout_rate'] = df.apply(
-            lambda x: x['voters_used'] / x['eligible_voters'] if x['eligible_voters'] > 0 else 0, axis=1
-        )
+        eligible = df['eligible_voters'].to_numpy(dtype=float)
+        used = df['voters_used'].to_numpy(dtype=float)
+        df['turnout_rate'] = np.divide(used, eligible, out=np.zeros(len(df)), where=eligible > 0)
         
         # Sanity check
         mask_invalid = (df['turnout_rate'] < 0) | (df['turnout_rate'] > 1)
@@ -138,57 +133,52 @@ def get_turnout_data(data_dir='data'):
     return results
 
 
+def _top_bottom(df, rate_col, top_n):
+    """Top and bottom N rows of df by rate_col, selected by partition instead of a full sort."""
+    rates = df[rate_col].to_numpy(dtype=float)
+    top_n_df = df.iloc[top_k_indices(rates, top_n, largest=True)].copy()
+    top_n_df['rank_type'] = f'Top {top_n}'
+
+    bottom_n_df = df.iloc[top_k_indices(rates, top_n, largest=False)].copy()
+    bottom_n_df['rank_type'] = f'Bottom {top_n}'
+
+    return top_n_df, bottom_n_df
+
+def _sum_rates(df, keys, prefix):
+    """eligible/used sums per unit and their rate (0 where nobody was eligible)."""
+    grp = rollup(df, keys).rename(columns={'eligible_voters': 'eligible_voters_sum',
+                                           'voters_used': 'voters_used_sum'})
+    grp[f'{prefix}_turnout_rate'] = grp.pop('turnout_rate').fillna(0)
+    return grp
+
 def get_district_stats(df, top_n=10):
     """
     Returns top and bottom N district stats based on turnout_rate.
     """
-    df_sorted = df.sort_values('turnout_rate', ascending=False)
-    top_n_df = df_sorted.head(top_n).copy()
-    top_n_df['rank_type'] = f'Top {top_n}'
-    
-    bottom_n_df = df_sorted.tail(top_n).sort_values('turnout_rate', ascending=True).copy()
-    bottom_n_df['rank_type'] = f'Bottom {top_n}'
-    
-    return top_n_df, bottom_n_df
+    return _top_bottom(df, 'turnout_rate', top_n)
 
 def get_province_stats(df, top_n=10):
     """
     Returns top and bottom N province stats based on turnout_rate.
     """
-    prov_grp = df.groupby(['region', 'province']).agg(
-        eligible_voters_sum=('eligible_voters', 'sum'),
-        voters_used_sum=('voters_used', 'sum')
-    ).reset_index()
-    
-    prov_grp['province_turnout_rate'] = prov_grp.apply(
-        lambda x: x['voters_used_sum'] / x['eligible_voters_sum'] if x['eligible_voters_sum'] > 0 else 0, axis=1
-    )
-    
-    prov_grp_sorted = prov_grp.sort_values('province_turnout_rate', ascending=False)
-    
-    top_n_df = prov_grp_sorted.head(top_n).copy()
-    top_n_df['rank_type'] = f'Top {top_n}'
-    
-    bottom_n_df = prov_grp_sorted.tail(top_n).sort_values('province_turnout_rate', ascending=True).copy()
-    bottom_n_df['rank_type'] = f'Bottom {top_n}'
+    return _top_bottom(_sum_rates(df, ['region', 'province'], 'province'), 'province_turnout_rate', top_n)
 
-    return top_n_df, bottom_n_df
+def get_amphoe_stats(df, composition, top_n=10):
+    """
+    Returns top and bottom N amphoe stats based on turnout_rate, with the
+    district counts apportioned over amphoes as in turnout_analytics.
+    """
+    amphoe = TurnoutRanking(df, composition).level('amphoe').rename(
+        columns={'eligible_voters': 'eligible_voters_sum', 'voters_used': 'voters_used_sum',
+                 'turnout_rate': 'amphoe_turnout_rate'})
+    return _top_bottom(amphoe, 'amphoe_turnout_rate', top_n)
 
 def get_region_stats(df):
     """
     Returns region stats sorted by turnout_rate.
     """
-    reg_grp = df.groupby(['region']).agg(
-        eligible_voters_sum=('eligible_voters', 'sum'),
-        voters_used_sum=('voters_used', 'sum')
-    ).reset_index()
-    
-    reg_grp['region_turnout_rate'] = reg_grp.apply(
-        lambda x: x['voters_used_sum'] / x['eligible_voters_sum'] if x['eligible_voters_sum'] > 0 else 0, axis=1
-    )
-    
-    reg_grp_sorted = reg_grp.sort_values('region_turnout_rate', ascending=False)
-    return reg_grp_sorted
+    reg_grp = _sum_rates(df, ['region'], 'region')
+    return reg_grp.iloc[top_k_indices(reg_grp['region_turnout_rate'], len(reg_grp))]
 
 def perform_analysis(output_dir='.'):
     results = get_turnout_data(data_dir='data') # Assuming running from root
@@ -232,6 +222,26 @@ def perform_analysis(output_dir='.'):
     df_province_final.to_csv(os.path.join(output_dir, 'q1_turnout_province_top_bottom.csv'), index=False, encoding='utf-8-sig')
     print("Created q1_turnout_province_top_bottom.csv")
 
+    # B2) Amphoe level (district counts apportioned via const_dataset.csv)
+    composition = load_amphoe_composition(2569, 'data')
+    amphoe_outputs = []
+
+    for code, df in results.items():
+        top10, bottom10 = get_amphoe_stats(df, composition, 10)
+
+        top10['ballot_code'] = code
+        bottom10['ballot_code'] = code
+
+        amphoe_outputs.append(top10)
+        amphoe_outputs.append(bottom10)
+
+    df_amphoe_final = pd.concat(amphoe_outputs)
+    final_cols_amphoe = ['ballot_code', 'rank_type', 'region', 'province', 'amphoe', 'eligible_voters_sum', 'voters_used_sum', 'amphoe_turnout_rate']
+    df_amphoe_final = df_amphoe_final[final_cols_amphoe]
+
+    df_amphoe_final.to_csv(os.path.join(output_dir, 'q1_turnout_amphoe_top_bottom.csv'), index=False, encoding='utf-8-sig')
+    print("Created q1_turnout_amphoe_top_bottom.csv")
+
     # C) Region ranking
     region_outputs = []
     
@@ -1,182 +1,183 @@
+import argparse
+import json
+import os
 
-import pandas as pd
 import numpy as np
+import pandas as pd
+
+try:
+    from scripts.analyze_forensics import load_counts, load_turnout
+    from scripts.data_cache import read_csv_with_encoding
+    from scripts.analyze_split_ticket import BallotMatrices
+except ImportError:
+    from analyze_forensics import load_counts, load_turnout
+    from data_cache import read_csv_with_encoding
+    from analyze_split_ticket import BallotMatrices
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'typology_rules.json')
+# The per-typology q9 files keep their original 2569 scope
+OUTPUT_YEAR = 2569
+
+def load_rules(path=RULES_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def party_names_by_id():
+    """party_id (as the string forms used in the rules, e.g. '34') -> party_name, from the 2569 master."""
+    votes = read_csv_with_encoding('data/m_votes_master.csv')
+    ids = votes.dropna(subset=['party_id']).drop_duplicates('party_id')
+    return {str(int(i)): name for i, name in zip(ids['party_id'], ids['party_name'])}
 
-def load_data():
+class DistrictFrame:
     """
-    Loads 2569 CON data.
+    The inputs every rule reads, as arrays over the districts of one year
+    (constituency ballot): the district x party share matrix, the rank 1-3
+    shares and the winner's party column.
     """
-    try:
-        try:
-             df = pd.read_csv('data/m_votes_master.csv', encoding='utf-8')
-        except:
-             df = pd.read_csv('data/m_votes_master.csv', encoding='tis-620')
-        
-        # Filter CON
-        ballot_col = 'ballot_code' if 'ballot_code' in df.columns else 'ballot_type'
-        if 'CONS' in df[ballot_col].unique():
-            df = df[df[ballot_col] == 'CONS']
-        elif 'CON' in df[ballot_col].unique():
-            df = df[df[ballot_col] == 'CON']
-            
-        # Get voters_used map
-        try:
-             df_turnout = pd.read_csv('data/m_turnout_master.csv', encoding='utf-8')
-        except:
-             df_turnout = pd.read_csv('data/m_turnout_master.csv', encoding='tis-620')
-        
-        # Filter Turnout CON
-        t_col = 'ballot_code' if 'ballot_code' in df_turnout.columns else 'ballot_type'
-        if 'CONS' in df_turnout[t_col].unique():
-            df_turnout = df_turnout[df_turnout[t_col] == 'CONS']
-        elif 'CON' in df_turnout[t_col].unique():
-            df_turnout = df_turnout[df_turnout[t_col] == 'CON']
-            
-        turnout_map = df_turnout.set_index('district_id')['voters_used'].to_dict()
-        df['voters_used'] = df['district_id'].map(turnout_map)
-        
-        # Ensure 'votes' column
-        vote_col = 'votes' if 'votes' in df.columns else 'score'
-        if vote_col != 'votes':
-            df = df.rename(columns={vote_col: 'votes'})
-            
-        return df
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return pd.DataFrame()
-
-def analyze_typology():
-    df = load_data()
-    if df.empty: return
-
-    # Target Parties
-    # P000/000 = People's Party
-    # P034 = Move Forward (2566) -> used as proxy or if present? 
-    # Prompt says P034. In 2569 data, likely P000 is the successor.
-    # But let's follow prompt strictly: P000, P034, P001.
-    # Note: P034 might not exist in 2569 if dissolved? 
-    # If not exist, shares will be 0.
-    
-    target_ids = ['P000', 'P034', 'P001']
-    
-    results = []
-    
-    grouped = df.groupby(['province', 'district_number'])
-    
-    for (prov, dist), group in grouped:
-        group = group.sort_values('votes', ascending=False)
-        candidates = group.to_dict('records')
-        
-        if not candidates: continue
-        
-        voters_used = candidates[0]['voters_used']
-        if pd.isna(voters_used) or voters_used == 0:
-            voters_used = sum(c['votes'] for c in candidates) # Fallback
-            
-        # Ranks
-        rk1 = candidates[0]
-        rk2 = candidates[1] if len(candidates) > 1 else None
-        rk3 = candidates[2] if len(candidates) > 2 else None
-        
-        share_rk1 = rk1['votes'] / voters_used
-        share_rk2 = (rk2['votes'] / voters_used) if rk2 else 0
-        share_rk3 = (rk3['votes'] / voters_used) if rk3 else 0
-        
-        # Party Shares
-        shares = {}
-        votes = {}
-        for pid in target_ids:
-            # Match by ID (approx)
-            # P000 might be '000'
-            party_votes = 0
-            for c in candidates:
-                c_pid = str(c['party_id']).replace('.0', '')
-                if c_pid == pid or c_pid == pid.replace('P', ''):
-                    party_votes += c['votes']
-            
-            votes[pid] = party_votes
-            shares[pid] = party_votes / voters_used
-            
-        # 9.1 P000 + P034 Analysis
-        # Category A: P000 Winner & Share > (Rk2+Rk3)
-        # Category B: P034 Winner & Share > (Rk2+Rk3)
-        # Category C: Combined (Non-Winner) > Rk1
-        # Category D: Others
-        
-        cat_91 = 'D' # Default
-        
-        # Check Winner Dominance
-        winner_pid = str(rk1['party_id']).replace('.0', '')
-        # Normalize to match target_ids
-        if winner_pid == '000': winner_pid = 'P000'
-        if winner_pid == '034': winner_pid = 'P034'
-        
-        combined_nw_91 = 0
-        if winner_pid not in ['P000']: combined_nw_91 += shares['P000']
-        if winner_pid not in ['P034']: combined_nw_91 += shares['P034']
-        
-        if winner_pid == 'P000' and share_rk1 > (share_rk2 + share_rk3):
-            cat_91 = 'A'
-        elif winner_pid == 'P034' and share_rk1 > (share_rk2 + share_rk3):
-            cat_91 = 'B'
-        elif combined_nw_91 > share_rk1:
-            cat_91 = 'C'
-        else:
-            cat_91 = 'D'
-            
-        # 9.2 P000 + P034 + P001 Analysis
-        # A: P000 Winner & Dominant
-        # B: P034 Winner & Dominant
-        # C: P001 Winner & Dominant
-        # D: Combined (Non-Winner) > Rk1
-        # E: Others
-        
-        cat_92 = 'E'
-        
-        combined_nw_92 = 0
-        if winner_pid not in ['P000']: combined_nw_92 += shares['P000']
-        if winner_pid not in ['P034']: combined_nw_92 += shares['P034']
-        if winner_pid not in ['P001']: combined_nw_92 += shares['P001']
-        
-        if winner_pid == 'P000' and share_rk1 > (share_rk2 + share_rk3):
-            cat_92 = 'A'
-        elif winner_pid == 'P034' and share_rk1 > (share_rk2 + share_rk3):
-            cat_92 = 'B'
-        elif winner_pid == 'P001' and share_rk1 > (share_rk2 + share_rk3):
-            cat_92 = 'C'
-        elif combined_nw_92 > share_rk1:
-            cat_92 = 'D'
+
+    def __init__(self, m):
+        self.year = m.year
+        self.districts = m.districts
+        self.parties = m.parties
+        self.shares = np.nan_to_num(m.cons)
+        ranked = -np.sort(-self.shares, axis=1)
+        self.share_rk = [ranked[:, i] if ranked.shape[1] > i else np.zeros(len(ranked)) for i in range(3)]
+        self.winner = self.shares.argmax(axis=1)
+        self.has_votes = self.shares.max(axis=1) > 0
+
+class RuleEngine:
+    """
+    Compiles typologies declared in typology_rules.json into numpy masks.
+
+    A group is a set of parties given by ECT party ids and/or names. A
+    condition is a dict of primitives that must all hold:
+      winner_in: <group>                      the district winner belongs to the group
+      dominant: true                          share_rk1 > share_rk2 + share_rk3
+      combined_non_winner_gt_winner: [groups] summed shares of the listed groups,
+                                              except the winner's group, > share_rk1
+      rank23_gt_rank1: true                   share_rk2 + share_rk3 > share_rk1
+      group_share_gt: {group: <g>, value: x}  the group's share > x
+    Categories are tried in order; the first matching one wins, otherwise
+    the default applies. A typology with 'flag' instead yields a boolean.
+    Every mask is computed over all districts at once.
+    """
+
+    def __init__(self, rules, names_by_id=None):
+        self.rules = rules
+        self.names_by_id = names_by_id or {}
+
+    def group_columns(self, group, frame):
+        """Boolean mask over frame.parties for a group."""
+        spec = self.rules['groups'][group]
+        names = set(spec.get('names', []))
+        names |= {self.names_by_id[str(i)] for i in spec.get('ids', []) if str(i) in self.names_by_id}
+        return np.isin(frame.parties, list(names))
+
+    def _primitive(self, name, arg, frame):
+        rk1, rk2, rk3 = frame.share_rk
+        if name == 'winner_in':
+            return self.group_columns(arg, frame)[frame.winner] & frame.has_votes
+        if name == 'dominant':
+            return (rk1 > rk2 + rk3) == bool(arg)
+        if name == 'rank23_gt_rank1':
+            return ((rk2 + rk3) > rk1) == bool(arg)
+        if name == 'combined_non_winner_gt_winner':
+            combined = np.zeros(len(frame.shares))
+            for group in arg:
+                cols = self.group_columns(group, frame)
+                share = frame.shares[:, cols].sum(axis=1)
+                combined += np.where(cols[frame.winner], 0, share)
+            return combined > rk1
+        if name == 'group_share_gt':
+            return frame.shares[:, self.group_columns(arg['group'], frame)].sum(axis=1) > arg['value']
+        raise ValueError(f"Unknown typology condition '{name}'")
+
+    def mask(self, condition, frame):
+        result = np.ones(len(frame.shares), dtype=bool)
+        for name, arg in condition.items():
+            result &= self._primitive(name, arg, frame)
+        return result
+
+    def evaluate(self, name, frame):
+        """Category labels (or flags) of one typology for every district."""
+        spec = self.rules['typologies'][name]
+        if 'flag' in spec:
+            return self.mask(spec['flag'], frame)
+        labels = np.full(len(frame.shares), spec['default'], dtype=object)
+        # Reverse order so earlier categories overwrite later ones
+        for category in reversed(spec['categories']):
+            labels[self.mask(category['when'], frame)] = category['label']
+        return labels
+
+    def evaluate_all(self, frames, names=None):
+        """
+        Every typology (or the given names) for every year.
+        Returns DataFrame with: year, province, district_number, district_label,
+        winner_party, share_rk1..3 and one column per typology.
+        """
+        names = names or list(self.rules['typologies'])
+        results = []
+        for frame in frames:
+            rk1, rk2, rk3 = frame.share_rk
+            df = pd.DataFrame({
+                'year': frame.year,
+                'province': frame.districts['province'].to_numpy(),
+                'district_number': frame.districts['district_number'].to_numpy(),
+            })
+            df['district_label'] = df['province'] + " เขต " + df['district_number'].astype(str)
+            df['winner_party'] = np.where(frame.has_votes, frame.parties[frame.winner], None)
+            for name in names:
+                df[self.rules['typologies'][name]['column']] = self.evaluate(name, frame)
+            df['share_rk1'], df['share_rk2'], df['share_rk3'] = rk1, rk2, rk3
+            results.append(df)
+        return pd.concat(results, ignore_index=True)
+
+def write_outputs(df, rules, names=None):
+    """
+    Writes q9_typology_all.csv (every year) and the per-typology q9 files
+    (OUTPUT_YEAR). With names, only those typology columns are replaced in
+    the existing all-years file.
+    """
+    typologies = rules['typologies']
+    names = names or list(typologies)
+    all_path = 'q9_typology_all.csv'
+    if os.path.exists(all_path) and set(names) != set(typologies):
+        existing = pd.read_csv(all_path, encoding='utf-8-sig', float_precision='round_trip')
+        keys = ['year', 'province', 'district_number']
+        cols = [typologies[n]['column'] for n in names]
+        order = list(existing.columns) + [c for c in cols if c not in existing.columns]
+        df = existing.drop(columns=[c for c in cols if c in existing.columns]) \
+            .merge(df[keys + cols], on=keys, how='left')[order]
+    df.to_csv(all_path, index=False, encoding='utf-8-sig')
+
+    # Every file is rewritten, as the flag files carry the category columns too
+    current = df[df['year'] == OUTPUT_YEAR]
+    for spec in typologies.values():
+        if spec['column'] not in current.columns:
+            continue
+        if 'flag' in spec:
+            current[current[spec['column']].astype(bool)].drop(columns='year') \
+                .to_csv(spec['output'], index=False, encoding='utf-8-sig')
         else:
-            cat_92 = 'E'
-
-        # 9.3 Rk2 + Rk3 > Rk1
-        flag_93 = (share_rk2 + share_rk3) > share_rk1
-        
-        results.append({
-            'province': prov,
-            'district_number': dist,
-            'district_label': f"{prov} เขต {dist}",
-            'winner_party': rk1['party_name'],
-            'cat_91': cat_91,
-            'cat_92': cat_92,
-            'flag_93': flag_93,
-            'share_rk1': share_rk1,
-            'share_rk2': share_rk2,
-            'share_rk3': share_rk3
-        })
-        
-    df_res = pd.DataFrame(results)
-    
-    # Save Outputs
-    # 9.1
-    df_res[['province', 'district_label', 'cat_91']].to_csv('q9_typology_91.csv', index=False, encoding='utf-8-sig')
-    # 9.2
-    df_res[['province', 'district_label', 'cat_92']].to_csv('q9_typology_92.csv', index=False, encoding='utf-8-sig')
-    # 9.3
-    df_93 = df_res[df_res['flag_93']].copy()
-    df_93.to_csv('q9_rank23_gt_rank1.csv', index=False, encoding='utf-8-sig')
-    
+            current[['province', 'district_label', spec['column']]].to_csv(spec['output'], index=False, encoding='utf-8-sig')
+
+def analyze_typology(rules_path=RULES_FILE, names=None):
+    rules = load_rules(rules_path)
+    counts = load_counts()
+    turnout = load_turnout()
+    frames = [DistrictFrame(BallotMatrices(counts, turnout, year)) for year in sorted(counts['year'].unique())]
+    engine = RuleEngine(rules, party_names_by_id())
+    df = engine.evaluate_all(frames, names)
+    write_outputs(df, rules, names)
+    for name in names or rules['typologies']:
+        col = rules['typologies'][name]['column']
+        print(f"{name}: " + "; ".join(f"{year} {grp[col].value_counts().sort_index().to_dict()}"
+                                     for year, grp in df.groupby('year')))
     print("Analysis Complete.")
 
 if __name__ == "__main__":
-    analyze_typology()
+    parser = argparse.ArgumentParser(description="Evaluate the Q9 district typologies declared in typology_rules.json.")
+    parser.add_argument('--rules', default=RULES_FILE)
+    parser.add_argument('--only', nargs='*', help="Typology names to (re)evaluate, e.g. 91 92")
+    args = parser.parse_args()
+    analyze_typology(args.rules, args.only)
@@ -0,0 +1,300 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+try:
+    import scripts.synthetic_election as synthetic
+except ImportError:
+    import synthetic_election as synthetic
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(os.path.dirname(SCRIPTS_DIR), 'data', 'benchmark_baseline.json')
+# The real feed files the generator takes provinces and parties from
+TEMPLATE_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), 'data', 'raw')
+
+# A case is a regression when it is this much slower / bigger than its
+# baseline and the difference is above the noise floor
+TOLERANCE = 0.25
+MIN_SECONDS = 0.1
+MIN_PEAK_MB = 1.0
+
+# Analysis scripts and their arguments (Monte Carlo draws cut to keep the
+# suite short; workers=1 so timings do not depend on the machine's cores)
+ANALYSES = [
+    ('analyze_turnout', []),
+    ('analyze_territory', []),
+    ('analyze_concentration', []),
+    ('analyze_gap_p000', []),
+    ('analyze_no_vote', []),
+    ('analyze_referendum', []),
+    ('analyze_typology', []),
+    ('analyze_clusters', ['--cold']),
+    ('analyze_forensics', ['--draws', '200', '--workers', '1']),
+    ('analyze_split_ticket', []),
+    ('analyze_proportionality', ['--draws', '200', '--workers', '1']),
+    ('analyze_expected', []),
+    ('district_similarity', []),
+]
+# Files the ETL writes next to the feed that belong in data/
+ETL_OUTPUTS = ['m_district_geo.csv', 'm_turnout_master.csv', 'm_votes_master.csv', 'm_referendum_master.csv',
+               'm_turnout_cube.csv', 'm_party_cube.csv', 'candidates']
+
+def measure(fn, repeat=1):
+    """
+    Best-of-repeat wall time, then one more run under tracemalloc for the
+    peak of Python and numpy allocations (tracing slows that run down, so
+    it is not timed). Returns (seconds, peak_bytes, result of the last run).
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak, result
+
+@contextlib.contextmanager
+def working_dir(path, log):
+    """Runs the block in path with its stdout going to log."""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        with contextlib.redirect_stdout(log):
+            yield
+    finally:
+        os.chdir(cwd)
+
+def run_script(name, argv=()):
+    """Runs scripts/<name>.py as __main__ in the current directory."""
+    saved = sys.argv
+    sys.argv = [name] + list(argv)
+    try:
+        runpy.run_path(os.path.join(SCRIPTS_DIR, f'{name}.py'), run_name='__main__')
+    finally:
+        sys.argv = saved
+
+class Suite:
+    """
+    Runs the pipeline on a generated workspace in the order the real one
+    runs (ETL, warehouse, analyses, dashboard reads), one measured case per
+    step. Each step leaves its outputs for the next, so a case measures
+    the same work as in production at the workspace's scale.
+    """
+
+    def __init__(self, workspace, repeat=1, verbose=False):
+        self.workspace = workspace
+        self.data_dir = os.path.join(workspace, 'data')
+        self.repeat = repeat
+        self.verbose = verbose
+        self.results = []
+
+    def case(self, group, name, fn, cwd=None):
+        log = io.StringIO()
+        with working_dir(cwd or self.workspace, log):
+            seconds, peak, result = measure(fn, self.repeat)
+        self.results.append({'group': group, 'case': name, 'seconds': seconds, 'peak_mb': peak / 2**20})
+        print(f"  {group:<10} {name:<32} {seconds:9.3f} s {peak / 2**20:10.1f} MB")
+        if self.verbose and log.getvalue():
+            print(log.getvalue())
+        return result
+
+    def etl(self):
+        raw_dir = os.path.join(self.data_dir, 'raw')
+
+        def etl():
+            # A fresh snapshot store each run, so every run archives the feed
+            shutil.rmtree(os.path.join('..', 'snapshots'), ignore_errors=True)
+            run_script('etl')
+        self.case('etl', 'etl', etl, cwd=raw_dir)
+        for name in ETL_OUTPUTS:
+            target = os.path.join(self.data_dir, name)
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            shutil.move(os.path.join(raw_dir, name), target)
+
+    def warehouse(self):
+        try:
+            import scripts.warehouse as wh
+        except ImportError:
+            import warehouse as wh
+        self.case('warehouse', 'build', lambda: wh.build())
+        self.case('warehouse', 'scan 2569 PARTY', lambda: wh.Warehouse().scan('votes')
+                  .where(year=2569, ballot_code='PARTY').collect())
+
+    def analyses(self, only=None):
+        for name, argv in ANALYSES:
+            if only and name not in only:
+                continue
+            self.case('analysis', name, lambda: run_script(name, argv))
+
+    def dashboard(self):
+        """The reads behind the dashboard pages, as a fresh server process does them."""
+        try:
+            import scripts.build_cube as bc
+            import scripts.candidates as cand
+            import scripts.data_cache as dc
+            import scripts.search_index as si
+            import scripts.sql_query as sq
+            import scripts.turnout_analytics as ta
+        except ImportError:
+            import build_cube as bc
+            import candidates as cand
+            import data_cache as dc
+            import search_index as si
+            import sql_query as sq
+            import turnout_analytics as ta
+
+        self.case('dashboard', 'masters', lambda: [dc.read_csv_with_encoding(os.path.join('data', name))
+                                                   for name in dc.MASTER_TABLES if os.path.exists(os.path.join('data', name))])
+        cube = self.case('dashboard', 'cube load', lambda: bc.load_cube('data'))
+        self.case('dashboard', 'cube top/bottom x100', lambda: [bc.get_top_bottom(cube, 'district', k=10) for _ in range(100)])
+        rankings = self.case('dashboard', 'turnout rankings load', lambda: ta.load_rankings('data'))
+        ranking = rankings[(2569, 'CONS')]
+        self.case('dashboard', 'amphoe top/bottom x100', lambda: [ranking.top_bottom('amphoe', 10) for _ in range(100)])
+        index = self.case('dashboard', 'search index build', lambda: si.build_index('data'))
+        self.case('dashboard', 'search x100', lambda: [index.search(q) for q in ['กรุง', 'สม', 'เพื่อ', 'ใจดี'] * 25])
+        # Built outside case(), so every path points into the workspace
+        store = cand.CandidateStore(os.path.join(self.data_dir, 'candidates'))
+        districts = store.dim['district_id'].drop_duplicates().head(100).tolist()
+        self.case('dashboard', 'candidates by district x100', lambda: [store.by_district(d) for d in districts])
+
+        db_path = os.path.join(self.data_dir, 'election.sqlite')
+
+        def open_sql():
+            return sq.ElectionSQL(db_path, data_dir=self.data_dir, output_dir=self.workspace,
+                                  warehouse_dir=os.path.join(self.data_dir, 'warehouse'))
+
+        def build_sql():
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            open_sql().close()
+        self.case('dashboard', 'sql build', build_sql)
+        db = open_sql()
+        sql = ("SELECT province, party, SUM(votes) AS votes FROM votes WHERE ballot_code = 'PARTY' "
+               "GROUP BY province, party ORDER BY votes DESC LIMIT 20")
+        self.case('dashboard', 'sql group-by', lambda: db.query(sql, cache=False))
+        db.close()
+
+def baseline_key(size):
+    return f"d{size['districts']}-p{size['parties']}-c{size['candidates']}"
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baseline(results, key, path=BASELINE_FILE):
+    """Stores the results of one size under key, keeping the other sizes."""
+    baseline = load_baseline(path)
+    baseline[key] = {f"{r['group']}/{r['case']}": {'seconds': round(r['seconds'], 4), 'peak_mb': round(r['peak_mb'], 2)}
+                     for r in results.to_dict('records')}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+def compare(results, baseline):
+    """
+    Adds the baseline of every case and its time / peak ratios and a
+    status: 'regression' (slower or bigger beyond TOLERANCE and the noise
+    floor), 'improved', 'ok' or 'new' (no baseline).
+    Returns DataFrame with: group, case, seconds, peak_mb, base_seconds, base_peak_mb, time_ratio, peak_ratio, status
+    """
+    df = results.copy()
+    base = [baseline.get(f"{g}/{c}", {}) for g, c in zip(df['group'], df['case'])]
+    df['base_seconds'] = [b.get('seconds', np.nan) for b in base]
+    df['base_peak_mb'] = [b.get('peak_mb', np.nan) for b in base]
+    df['time_ratio'] = df['seconds'] / df['base_seconds']
+    df['peak_ratio'] = df['peak_mb'] / df['base_peak_mb']
+    slower = (df['time_ratio'] > 1 + TOLERANCE) & (df['seconds'] - df['base_seconds'] > MIN_SECONDS)
+    bigger = (df['peak_ratio'] > 1 + TOLERANCE) & (df['peak_mb'] - df['base_peak_mb'] > MIN_PEAK_MB)
+    faster = (df['time_ratio'] < 1 - TOLERANCE) & (df['base_seconds'] - df['seconds'] > MIN_SECONDS)
+    df['status'] = 'ok'
+    df.loc[faster, 'status'] = 'improved'
+    df.loc[slower | bigger, 'status'] = 'regression'
+    df.loc[df['base_seconds'].isna(), 'status'] = 'new'
+    return df
+
+def run(size, years=synthetic.YEARS, seed=0, repeat=1, workspace=None, only=None, verbose=False):
+    """
+    Generates a synthetic election of the given size and runs the suite on
+    it. Returns DataFrame with: group, case, seconds, peak_mb.
+    """
+    keep = workspace is not None
+    workspace = os.path.abspath(workspace or tempfile.mkdtemp(prefix='election-bench-'))
+    os.makedirs(workspace, exist_ok=True)
+    try:
+        suite = Suite(workspace, repeat, verbose)
+        print(f"Workspace: {workspace}")
+        suite.case('generate', 'synthetic election',
+                   lambda: synthetic.generate(workspace, years=years, seed=seed,
+                                              raw_dir=TEMPLATE_DIR, **size))
+        suite.etl()
+        suite.warehouse()
+        suite.analyses(only)
+        suite.dashboard()
+        return pd.DataFrame(suite.results)
+    finally:
+        if not keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the ETL, the analyses and the dashboard reads on a synthetic election. "
+                                                 "Run from the repository root: python -m scripts.benchmark")
+    parser.add_argument('--scale', choices=list(synthetic.SCALES), default='national')
+    parser.add_argument('--districts', type=int, help="Overrides the scale preset")
+    parser.add_argument('--parties', type=int, help="Overrides the scale preset")
+    parser.add_argument('--candidates', type=int, help="Candidates per district; overrides the scale preset")
+    parser.add_argument('--years', type=int, nargs='+', default=list(synthetic.YEARS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (best is kept)")
+    parser.add_argument('--only', nargs='*', help="Analysis scripts to run, e.g. analyze_forensics")
+    parser.add_argument('--workspace', help="Generate into this directory and keep it (default: a temp dir)")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the baseline of this size")
+    parser.add_argument('--check', action='store_true', help="Exit with status 1 on any regression")
+    parser.add_argument('--output', help="Also write the comparison as CSV")
+    parser.add_argument('--verbose', action='store_true', help="Show the output of every case")
+    args = parser.parse_args()
+
+    size = dict(synthetic.SCALES[args.scale])
+    for name in size:
+        if getattr(args, name) is not None:
+            size[name] = getattr(args, name)
+    key = baseline_key(size)
+    print(f"Benchmark {key} (scale {args.scale}), years {sorted(args.years)}")
+
+    results = run(size, args.years, args.seed, args.repeat, args.workspace, args.only, args.verbose)
+    report = compare(results, load_baseline(args.baseline).get(key, {}))
+    with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.float_format', '{:,.3f}'.format):
+        print()
+        print(report.to_string(index=False))
+    if args.output:
+        report.to_csv(args.output, index=False, encoding='utf-8-sig')
+    if args.update_baseline:
+        save_baseline(results, key, args.baseline)
+        print(f"\nBaseline {key} saved to {args.baseline}")
+
+    regressions = report[report['status'] == 'regression']
+    if not regressions.empty:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions['group'] + '/' + regressions['case'])}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
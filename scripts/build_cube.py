@@ -0,0 +1,199 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.data_cache import read_csv_with_encoding
+except ImportError:
+    from data_cache import read_csv_with_encoding
+
+TURNOUT_CUBE = 'm_turnout_cube.csv'
+PARTY_CUBE = 'm_party_cube.csv'
+
+MEASURES = ['eligible_voters', 'voters_used', 'valid_votes', 'invalid_votes', 'no_vote']
+
+# Level -> columns that identify a unit at that level (beyond year/ballot_code)
+LEVELS = {
+    'national': [],
+    'region': ['region'],
+    'province': ['region', 'province'],
+    'district': ['region', 'province', 'district_id', 'district_number', 'district_label'],
+}
+# Column used as the lookup key of each level
+LEVEL_KEY = {'national': None, 'region': 'region', 'province': 'province', 'district': 'district_id'}
+
+def _safe_ratio(num, den):
+    """num / den, NaN where den is missing or zero."""
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    out = np.full(num.shape, np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+def _with_key(df, level):
+    """Adds the level and key columns and the empty geography columns."""
+    df['level'] = level
+    key_col = LEVEL_KEY[level]
+    df['key'] = df[key_col].astype(str) if key_col else ''
+    for col in LEVELS['district']:
+        if col not in df.columns:
+            df[col] = np.nan
+    return df
+
+def build_turnout_cube(m_turnout_master, m_referendum_master=None):
+    """
+    Aggregates turnout counts to every level (national, region, province,
+    district) for each year and ballot_code, with rates and rank orders.
+    RFD rows come from m_referendum_master (eligible_voters/voters_used only).
+    Returns one long DataFrame.
+    """
+    base_cols = ['year', 'ballot_code'] + LEVELS['district'] + MEASURES
+    base = m_turnout_master[base_cols].copy()
+
+    if m_referendum_master is not None and not m_referendum_master.empty:
+        rfd = m_referendum_master.copy()
+        rfd['ballot_code'] = 'RFD'
+        # The referendum master has no abstained/invalid split
+        rfd['valid_votes'] = np.nan
+        rfd['invalid_votes'] = np.nan
+        rfd['no_vote'] = np.nan
+        base = pd.concat([base, rfd[base_cols]], ignore_index=True)
+
+    frames = []
+    for level, cols in LEVELS.items():
+        keys = ['year', 'ballot_code'] + cols
+        if level == 'district':
+            grp = base.copy()
+        else:
+            grp = base.groupby(keys, dropna=False)[MEASURES].sum(min_count=1).reset_index()
+        frames.append(_with_key(grp, level))
+
+    cube = pd.concat(frames, ignore_index=True)
+    cube['turnout_rate'] = _safe_ratio(cube['voters_used'], cube['eligible_voters'])
+    cube['valid_rate'] = _safe_ratio(cube['valid_votes'], cube['voters_used'])
+    cube['invalid_rate'] = _safe_ratio(cube['invalid_votes'], cube['voters_used'])
+    cube['no_vote_rate'] = _safe_ratio(cube['no_vote'], cube['voters_used'])
+
+    # 1 = highest turnout within (level, year, ballot_code); NaN rates are unranked
+    grp_keys = ['level', 'year', 'ballot_code']
+    cube['turnout_rank'] = cube.groupby(grp_keys)['turnout_rate'].rank(method='min', ascending=False)
+    cube['no_vote_rank'] = cube.groupby(grp_keys)['no_vote_rate'].rank(method='min', ascending=False)
+
+    cols = ['level', 'key', 'year', 'ballot_code'] + LEVELS['district'] + MEASURES + \
+           ['turnout_rate', 'valid_rate', 'invalid_rate', 'no_vote_rate', 'turnout_rank', 'no_vote_rank']
+    return cube[cols].sort_values(['level', 'year', 'ballot_code', 'turnout_rank'], na_position='last')
+
+def build_party_cube(m_votes_master, turnout_cube):
+    """
+    Aggregates party/candidate votes to every level for each year and
+    ballot_code. vote_share uses the voters_used of the same unit from the
+    turnout cube. party_rank is 1 for the party with most votes in the unit.
+    Returns one long DataFrame.
+    """
+    base = m_votes_master.copy()
+    base['party_id'] = pd.to_numeric(base['party_id'], errors='coerce').astype('Int64')
+
+    frames = []
+    for level, cols in LEVELS.items():
+        keys = ['year', 'ballot_code'] + cols + ['party_id', 'party_name']
+        grp = base.groupby(keys, dropna=False)['votes'].sum().reset_index()
+        frames.append(_with_key(grp, level))
+    cube = pd.concat(frames, ignore_index=True)
+
+    denom = turnout_cube[['level', 'key', 'year', 'ballot_code', 'voters_used']]
+    cube = cube.merge(denom, on=['level', 'key', 'year', 'ballot_code'], how='left')
+    cube['vote_share'] = _safe_ratio(cube['votes'], cube['voters_used'])
+    cube['party_rank'] = cube.groupby(['level', 'key', 'year', 'ballot_code'])['votes'].rank(method='min', ascending=False)
+
+    cols = ['level', 'key', 'year', 'ballot_code'] + LEVELS['district'] + \
+           ['party_id', 'party_name', 'votes', 'voters_used', 'vote_share', 'party_rank']
+    return cube[cols].sort_values(['level', 'key', 'year', 'ballot_code', 'party_rank'])
+
+def build_cubes(m_turnout_master, m_votes_master, m_referendum_master=None):
+    """Builds (turnout_cube, party_cube) from the master tables."""
+    turnout_cube = build_turnout_cube(m_turnout_master, m_referendum_master)
+    party_cube = build_party_cube(m_votes_master, turnout_cube)
+    return turnout_cube, party_cube
+
+def load_cube(data_dir='data'):
+    """
+    Loads the cube tables and indexes them for constant-time lookups:
+      kpis[(level, year, ballot_code, key)]          -> dict of measures and rates
+      ranked[(level, year, ballot_code)]             -> DataFrame sorted by turnout_rank
+      rated[(level, year, ballot_code)]              -> same, units with a rate only
+      children[(level, year, ballot_code, parent)]   -> units of a level inside a
+                                                        region (province level) or
+                                                        province (district level)
+      parties[(level, year, ballot_code, key)]       -> DataFrame sorted by party_rank
+    national rows use key ''.
+    Returns a dict with those indexes plus the raw 'turnout'/'party' frames.
+    """
+    turnout = read_csv_with_encoding(os.path.join(data_dir, TURNOUT_CUBE))
+    party = read_csv_with_encoding(os.path.join(data_dir, PARTY_CUBE))
+    for df in (turnout, party):
+        df['key'] = df['key'].fillna('').astype(str)
+
+    kpis = {
+        (row['level'], row['year'], row['ballot_code'], row['key']): row
+        for row in turnout.to_dict('records')
+    }
+    turnout_sorted = turnout.sort_values('turnout_rank', na_position='last', kind='stable')
+    ranked, rated = {}, {}
+    for k, grp in turnout_sorted.groupby(['level', 'year', 'ballot_code']):
+        grp = grp.reset_index(drop=True)
+        ranked[k] = grp
+        rated[k] = grp.iloc[:int(grp['turnout_rank'].notna().sum())]
+    children = {}
+    for level, parent_col in (('province', 'region'), ('district', 'province')):
+        subset = turnout_sorted[turnout_sorted['level'] == level]
+        for (year, ballot_code, parent), grp in subset.groupby(['year', 'ballot_code', parent_col]):
+            children[(level, year, ballot_code, parent)] = grp.reset_index(drop=True)
+    parties = {
+        k: grp.reset_index(drop=True)
+        for k, grp in party.groupby(['level', 'year', 'ballot_code', 'key'])
+    }
+    return {'turnout': turnout, 'party': party, 'kpis': kpis, 'ranked': ranked,
+            'rated': rated, 'children': children, 'parties': parties}
+
+def get_kpis(cube, level='national', year=2569, ballot_code='CONS', key=''):
+    """Returns the measures/rates dict for one unit, or None."""
+    return cube['kpis'].get((level, year, ballot_code, key))
+
+def get_top_bottom(cube, level='district', year=2569, ballot_code='CONS', k=10):
+    """
+    Returns (top_k, bottom_k) units by turnout_rate at a level. Both come
+    straight from the pre-sorted slice; bottom_k is ordered lowest first.
+    """
+    rated = cube['rated'].get((level, year, ballot_code))
+    if rated is None:
+        return pd.DataFrame(), pd.DataFrame()
+    return rated.head(k), rated.tail(k).iloc[::-1]
+
+def get_children(cube, level='district', year=2569, ballot_code='CONS', parent=''):
+    """Returns the units of a level inside a parent region/province, by turnout_rank."""
+    return cube['children'].get((level, year, ballot_code, parent), pd.DataFrame())
+
+def get_level(cube, level='region', year=2569, ballot_code='CONS'):
+    """Returns every unit of a level, sorted by turnout_rank."""
+    return cube['ranked'].get((level, year, ballot_code), pd.DataFrame())
+
+def get_parties(cube, level='national', year=2569, ballot_code='PARTY', key='', k=None):
+    """Returns the party rows of one unit sorted by votes (first k if given)."""
+    parties = cube['parties'].get((level, year, ballot_code, key), pd.DataFrame())
+    return parties.head(k) if k else parties
+
+def main(data_dir='data'):
+    print("Loading master tables...")
+    m_turnout_master = read_csv_with_encoding(os.path.join(data_dir, 'm_turnout_master.csv'))
+    m_votes_master = read_csv_with_encoding(os.path.join(data_dir, 'm_votes_master.csv'))
+    m_referendum_master = read_csv_with_encoding(os.path.join(data_dir, 'm_referendum_master.csv'))
+
+    print("Building aggregate cubes...")
+    turnout_cube, party_cube = build_cubes(m_turnout_master, m_votes_master, m_referendum_master)
+    turnout_cube.to_csv(os.path.join(data_dir, TURNOUT_CUBE), index=False)
+    party_cube.to_csv(os.path.join(data_dir, PARTY_CUBE), index=False)
+    print(f"{TURNOUT_CUBE}: {len(turnout_cube)} rows, {PARTY_CUBE}: {len(party_cube)} rows")
+
+if __name__ == "__main__":
+    main()
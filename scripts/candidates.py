@@ -0,0 +1,217 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.ect_decoders import decode_file, to_frame
+except ImportError:
+    from ect_decoders import decode_file, to_frame
+
+STORE_DIR = 'candidates'
+DIM_FILE = 'candidate_dim.csv'
+META_FILE = 'meta.json'
+
+# Fact table columns, stored one .npy file per column
+RESULT_COLUMNS = {
+    'candidate_key': np.int32,
+    'district_key': np.int32,
+    'party_id': np.int32,
+    'votes': np.int64,
+    'rank': np.int16,
+    'vote_percent': np.float32,
+}
+
+def load_candidate_sources(raw_dir='.'):
+    """
+    Decodes info_mp_candidate.txt, stats_party.txt and info_party_overview.txt
+    with the typed decoders (see ect_decoders.py).
+    Returns (df_candidate_info, df_candidate_votes, df_party_info).
+    """
+    candidate_info = decode_file(os.path.join(raw_dir, 'info_mp_candidate.txt'))
+    stats_party = decode_file(os.path.join(raw_dir, 'stats_party.txt'))
+    party_info = decode_file(os.path.join(raw_dir, 'info_party_overview.txt'))
+    return (to_frame(candidate_info['candidate']), to_frame(stats_party['candidate']),
+            to_frame(party_info['party']))
+
+def build_candidate_dim(df_candidate_info, df_party_info, year=2569):
+    """
+    One row per candidate with a dense integer candidate_key.
+    district_id is the mp_app_id prefix ('KBI_1_3' -> 'KBI_1');
+    district_key is a dense integer over the sorted district_ids.
+    Returns DataFrame with: candidate_key, mp_app_id, year, district_key,
+    district_id, candidate_no, party_id, party_name, candidate_name, image_url
+    """
+    dim = df_candidate_info.rename(columns={
+        'mp_app_no': 'candidate_no',
+        'mp_app_party_id': 'party_id',
+        'mp_app_name': 'candidate_name',
+    })
+    dim['district_id'] = dim['mp_app_id'].str.rsplit('_', n=1).str[0]
+    dim['party_id'] = pd.to_numeric(dim['party_id'], errors='coerce').astype('Int64')
+    dim = dim.sort_values(['district_id', 'candidate_no']).reset_index(drop=True)
+    dim['candidate_key'] = np.arange(1, len(dim) + 1, dtype=np.int32)
+    district_ids = sorted(dim['district_id'].unique())
+    dim['district_key'] = dim['district_id'].map({d: i for i, d in enumerate(district_ids, 1)}).astype(np.int32)
+    dim['year'] = year
+
+    parties = df_party_info[['id', 'name']].copy()
+    parties['id'] = pd.to_numeric(parties['id']).astype('Int64')
+    dim = dim.merge(parties.rename(columns={'id': 'party_id', 'name': 'party_name'}), on='party_id', how='left')
+    return dim[['candidate_key', 'mp_app_id', 'year', 'district_key', 'district_id', 'candidate_no',
+                'party_id', 'party_name', 'candidate_name', 'image_url']]
+
+def build_candidate_results(df_candidate_votes, candidate_dim):
+    """
+    Candidate results from the flattened result_party[].candidates of
+    stats_party, keyed by the integer IDs of candidate_dim.
+    Candidates without a result (not yet counted) are left out.
+    Returns DataFrame with the RESULT_COLUMNS.
+    """
+    results = df_candidate_votes.rename(columns={
+        'mp_app_vote': 'votes',
+        'mp_app_rank': 'rank',
+        'mp_app_vote_percent': 'vote_percent',
+    })
+    keys = candidate_dim[['mp_app_id', 'candidate_key', 'district_key']]
+    merged = results.merge(keys, on='mp_app_id', how='inner')
+    missing = len(results) - len(merged)
+    if missing:
+        print(f"Warning: {missing} candidate results have no entry in info_mp_candidate")
+
+    merged = merged.sort_values(['district_key', 'rank']).reset_index(drop=True)
+    return pd.DataFrame({c: merged[c].fillna(0).astype(t) for c, t in RESULT_COLUMNS.items()})
+
+def _csr_index(values):
+    """
+    Groups row numbers by value: returns (keys, offsets, order) so that the
+    rows with keys[i] are order[offsets[i]:offsets[i + 1]].
+    """
+    order = np.argsort(values, kind='stable').astype(np.int32)
+    keys, starts = np.unique(values[order], return_index=True)
+    offsets = np.append(starts, len(values)).astype(np.int32)
+    return keys, offsets, order
+
+def write_candidate_store(candidate_dim, candidate_results, store_dir=STORE_DIR):
+    """
+    Writes the dimension as CSV, the fact table as one .npy per column and
+    party -> rows / district -> rows indexes, plus meta.json with row counts.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    candidate_dim.to_csv(os.path.join(store_dir, DIM_FILE), index=False, encoding='utf-8')
+    for col in RESULT_COLUMNS:
+        np.save(os.path.join(store_dir, f"results_{col}.npy"), candidate_results[col].to_numpy())
+    for name, col in (('party', 'party_id'), ('district', 'district_key')):
+        keys, offsets, order = _csr_index(candidate_results[col].to_numpy())
+        np.save(os.path.join(store_dir, f"index_{name}_keys.npy"), keys)
+        np.save(os.path.join(store_dir, f"index_{name}_offsets.npy"), offsets)
+        np.save(os.path.join(store_dir, f"index_{name}_order.npy"), order)
+    meta = {
+        'candidates': int(len(candidate_dim)),
+        'results': int(len(candidate_results)),
+        'columns': list(RESULT_COLUMNS),
+    }
+    with open(os.path.join(store_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+
+class CandidateStore:
+    """
+    Read side of the candidate store. Fact columns are memory-mapped and
+    only opened when first used; the dimension is joined to the selected
+    rows only.
+    """
+
+    def __init__(self, store_dir=os.path.join('data', STORE_DIR)):
+        self.store_dir = store_dir
+        self._columns = {}
+        self._indexes = {}
+        self._dim = None
+        self._lookups = {}
+
+    @property
+    def dim(self):
+        if self._dim is None:
+            self._dim = pd.read_csv(os.path.join(self.store_dir, DIM_FILE), encoding='utf-8',
+                                    dtype={'party_id': 'Int64'}).set_index('candidate_key')
+        return self._dim
+
+    def _lookup(self, name):
+        """
+        Dict lookups built once on first use: mp_app_id -> candidate_key,
+        district_id -> district_key and candidate_key -> fact row.
+        """
+        if name not in self._lookups:
+            if name == 'app_id':
+                self._lookups[name] = dict(zip(self.dim['mp_app_id'], self.dim.index.tolist()))
+            elif name == 'district':
+                self._lookups[name] = dict(zip(self.dim['district_id'], self.dim['district_key'].tolist()))
+            else:
+                keys = np.asarray(self.column('candidate_key')).tolist()
+                self._lookups[name] = dict(zip(keys, range(len(keys))))
+        return self._lookups[name]
+
+    def column(self, name):
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.store_dir, f"results_{name}.npy"), mmap_mode='r')
+        return self._columns[name]
+
+    def _index(self, name):
+        if name not in self._indexes:
+            self._indexes[name] = tuple(
+                np.load(os.path.join(self.store_dir, f"index_{name}_{part}.npy"))
+                for part in ('keys', 'offsets', 'order'))
+        return self._indexes[name]
+
+    def _rows_for(self, name, key):
+        keys, offsets, order = self._index(name)
+        i = np.searchsorted(keys, key)
+        if i >= len(keys) or keys[i] != key:
+            return order[:0]
+        return order[offsets[i]:offsets[i + 1]]
+
+    def results(self, rows, columns=('candidate_name', 'party_name', 'district_id')):
+        """Fact rows joined with the requested dimension columns."""
+        rows = np.sort(rows)
+        df = pd.DataFrame({c: np.asarray(self.column(c)[rows]) for c in RESULT_COLUMNS})
+        if columns:
+            df = df.join(self.dim[list(columns)], on='candidate_key')
+        return df
+
+    def district_key(self, district_id):
+        return self._lookup('district').get(district_id)
+
+    def by_party(self, party_id, columns=('candidate_name', 'district_id', 'image_url')):
+        """Every candidate of a party with votes and rank, best rank first."""
+        df = self.results(self._rows_for('party', int(party_id)), columns)
+        return df.sort_values(['rank', 'votes'], ascending=[True, False]).reset_index(drop=True)
+
+    def by_district(self, district_id, columns=('candidate_name', 'party_name', 'image_url')):
+        """Every candidate in a constituency, by rank."""
+        district_key = self.district_key(district_id)
+        if district_key is None:
+            return pd.DataFrame()
+        return self.results(self._rows_for('district', district_key), columns).sort_values('rank').reset_index(drop=True)
+
+    def candidate(self, mp_app_id):
+        """Dimension row plus result for one candidate, or None."""
+        key = self._lookup('app_id').get(mp_app_id)
+        if key is None:
+            return None
+        row = {k: (None if pd.isna(v) else v) for k, v in self.dim.loc[key].to_dict().items()}
+        fact_row = self._lookup('fact_row').get(key)
+        if fact_row is not None:
+            row.update({c: self.column(c)[fact_row].item() for c in ('votes', 'rank', 'vote_percent')})
+        row['candidate_key'] = int(key)
+        return row
+
+def main(raw_dir=os.path.join('data', 'raw'), store_dir=os.path.join('data', STORE_DIR)):
+    print("Loading candidate sources...")
+    df_candidate_info, df_candidate_votes, df_party_info = load_candidate_sources(raw_dir)
+    candidate_dim = build_candidate_dim(df_candidate_info, df_party_info)
+    candidate_results = build_candidate_results(df_candidate_votes, candidate_dim)
+    write_candidate_store(candidate_dim, candidate_results, store_dir)
+    print(f"{len(candidate_dim)} candidates, {len(candidate_results)} results written to {store_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import glob
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+MASTER_TABLES = [
+    'm_district_geo.csv',
+    'm_turnout_master.csv',
+    'm_votes_master.csv',
+    'm_referendum_master.csv',
+    'm_turnout_cube.csv',
+    'm_party_cube.csv',
+]
+
+# path -> ((size, mtime_ns), sha1 hex digest)
+_digests = {}
+# (path, digest) -> DataFrame
+_tables = {}
+_lock = threading.Lock()
+
+def read_csv_with_encoding(filepath):
+    """
+    Attempts to read a CSV file with multiple encodings.
+    Tries utf-8, then tis-620, then cp874.
+    """
+    try:
+        return pd.read_csv(filepath, encoding='utf-8')
+    except UnicodeDecodeError:
+        try:
+            return pd.read_csv(filepath, encoding='tis-620')
+        except UnicodeDecodeError:
+            return pd.read_csv(filepath, encoding='cp874')
+
+def file_digest(path):
+    """
+    Returns the sha1 of a file's content.
+    The hash is only recomputed when the file's size or mtime changes, so
+    calling this on every rerun costs one stat() per file.
+    Raises FileNotFoundError if the file does not exist.
+    """
+    st = os.stat(path)
+    signature = (st.st_size, st.st_mtime_ns)
+    cached = _digests.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _digests[path] = (signature, digest)
+    return digest
+
+def published_files(data_dir='data', output_dir='.'):
+    """
+    Lists the files the pipeline publishes: the master tables and cubes in
+    data_dir and the q*_ result tables in output_dir.
+    """
+    files = [os.path.join(data_dir, name) for name in MASTER_TABLES]
+    files += sorted(glob.glob(os.path.join(output_dir, 'q*_*.csv')))
+    return [f for f in files if os.path.exists(f)]
+
+def data_version(paths=None):
+    """
+    Returns a short version string that changes whenever any of the given
+    files (default: all published files) changes content.
+    """
+    if paths is None:
+        paths = published_files()
+    h = hashlib.sha1()
+    for path in sorted(paths):
+        if os.path.exists(path):
+            h.update(path.encode('utf-8'))
+            h.update(file_digest(path).encode('ascii'))
+    return h.hexdigest()[:16]
+
+def load_table(path):
+    """
+    Returns the DataFrame for a CSV file, parsed once per process and per
+    content version. The returned frame is shared: callers must copy before
+    modifying it.
+    """
+    digest = file_digest(path)
+    key = (path, digest)
+    df = _tables.get(key)
+    if df is not None:
+        return df
+
+    with _lock:
+        df = _tables.get(key)
+        if df is None:
+            df = read_csv_with_encoding(path)
+            # Drop stale versions of the same file
+            for old_key in [k for k in _tables if k[0] == path]:
+                del _tables[old_key]
+            _tables[key] = df
+    return df
@@ -0,0 +1,198 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.analyze_forensics import load_counts, load_turnout
+    from scripts.data_cache import read_csv_with_encoding
+    from scripts.analyze_split_ticket import BallotMatrices
+except ImportError:
+    from analyze_forensics import load_counts, load_turnout
+    from data_cache import read_csv_with_encoding
+    from analyze_split_ticket import BallotMatrices
+
+INDEX_FILE = os.path.join('data', 'district_similarity.npz')
+# Neighbours stored per district (lookups with a larger k are capped here)
+MAX_K = 20
+# Features named on each neighbour as the reasons for the match
+N_DRIVERS = 3
+# Districts per block of the distance matrix (block x n float64)
+BLOCK_ROWS = 1024
+# Parties below this national share of a ballot are folded into 'อื่นๆ'
+MIN_PARTY_SHARE = 0.02
+
+def build_features(counts, turnout, districts):
+    """
+    One row per 2569 district: vote shares of the main parties on both
+    ballots of both years, plus turnout and no-vote rates per ballot and year.
+    Each block (year x ballot shares, year x ballot rates) is z-scored and
+    scaled by 1/sqrt(block width) so no block dominates the distance by
+    having more columns. Missing values (e.g. no 2566 match) sit at the mean.
+    Returns (X float32 [districts, features], feature names, raw values DataFrame).
+    """
+    keys = pd.Index(districts['key'])
+    raw = {}
+    blocks = []
+    for year in sorted(counts['year'].unique()):
+        m = BallotMatrices(counts, turnout, year)
+        rows = keys.get_indexer(m.districts['key'])
+        for ballot_code, shares, votes in (('CONS', m.cons, m.cons_votes), ('PARTY', m.party, m.party_votes)):
+            national = np.nansum(votes, axis=0) / np.nansum(votes)
+            main = np.flatnonzero(national >= MIN_PARTY_SHARE)
+            block = {}
+            filled = np.nan_to_num(shares)
+            for p in main:
+                block[f"{year} {ballot_code} {m.parties[p]}"] = filled[:, p]
+            other = np.setdiff1d(np.arange(len(m.parties)), main)
+            block[f"{year} {ballot_code} อื่นๆ"] = filled[:, other].sum(axis=1)
+            blocks.append((rows, block))
+
+        t = turnout[turnout['year'] == year]
+        for ballot_code, grp in t.groupby('ballot_code'):
+            grp = grp.set_index('key').reindex(m.districts['key'])
+            used = grp['voters_used'].where(grp['voters_used'] > 0)
+            blocks.append((rows, {
+                f"{year} {ballot_code} turnout_rate": (used / grp['eligible_voters']).to_numpy(),
+                f"{year} {ballot_code} no_vote_rate": (grp['no_vote'] / used).to_numpy(),
+            }))
+
+    columns, names = [], []
+    for rows, block in blocks:
+        ok = rows >= 0
+        width = np.sqrt(len(block))
+        for name, values in block.items():
+            col = np.full(len(keys), np.nan)
+            col[rows[ok]] = np.asarray(values, dtype=float)[ok]
+            raw[name] = col
+            mean, std = np.nanmean(col), np.nanstd(col)
+            z = (col - mean) / std if std > 0 else col - mean
+            columns.append(np.nan_to_num(z) / width)
+            names.append(name)
+    X = np.column_stack(columns).astype(np.float32)
+    return X, names, pd.DataFrame(raw, index=keys)
+
+def nearest_neighbours(X, k=MAX_K, n_drivers=N_DRIVERS, block_rows=BLOCK_ROWS):
+    """
+    Exact k nearest neighbours of every district
+    (|a|^2 + |b|^2 - 2ab against the whole matrix, block_rows districts at a
+    time so memory stays at block_rows x n). For each pair the drivers
+    are the features where both districts sit furthest from the mean on the
+    same side (largest z_a * z_b).
+    Returns (neighbours int32 [n, k], distances float32 [n, k], drivers int16 [n, k, n_drivers]).
+    """
+    sq = (X ** 2).sum(axis=1)
+    k = min(k, len(X) - 1)
+    neighbours = np.empty((len(X), k), dtype=np.int64)
+    distances = np.empty((len(X), k))
+    for start in range(0, len(X), block_rows):
+        rows = np.arange(start, min(start + block_rows, len(X)))
+        d2 = np.maximum(sq[rows, None] + sq[None, :] - 2 * X[rows] @ X.T, 0)
+        d2[np.arange(len(rows)), rows] = np.inf
+        part = np.argpartition(d2, k, axis=1)[:, :k]
+        order = np.take_along_axis(d2, part, axis=1).argsort(axis=1)
+        neighbours[rows] = np.take_along_axis(part, order, axis=1)
+        distances[rows] = np.sqrt(np.take_along_axis(d2, neighbours[rows], axis=1))
+    shared = X[:, None, :] * X[neighbours]
+    drivers = np.argsort(-shared, axis=2)[:, :, :n_drivers]
+    return neighbours.astype(np.int32), distances.astype(np.float32), drivers.astype(np.int16)
+
+def build_index(path=INDEX_FILE, k=MAX_K):
+    """Builds the feature matrix and the neighbour table and saves them as one .npz."""
+    geo = read_csv_with_encoding('data/m_district_geo.csv')
+    geo = geo[geo['district_number'] > 0].copy()
+    geo['key'] = geo['province'] + "_" + geo['district_number'].astype(str)
+    geo = geo.sort_values(['province', 'district_number']).reset_index(drop=True)
+
+    X, names, raw = build_features(load_counts(), load_turnout(), geo)
+    neighbours, distances, drivers = nearest_neighbours(X, k)
+    np.savez_compressed(
+        path,
+        district_id=geo['district_id'].to_numpy(dtype=str),
+        key=geo['key'].to_numpy(dtype=str),
+        label=geo['district_label'].to_numpy(dtype=str),
+        features=X,
+        raw=raw.to_numpy(dtype=np.float32),
+        feature_names=np.array(names, dtype=str),
+        neighbours=neighbours,
+        distances=distances,
+        drivers=drivers,
+    )
+    return DistrictSimilarity(path)
+
+class DistrictSimilarity:
+    """
+    Read side of the similarity index: lookups are array slices of the
+    precomputed neighbour table, so no distances are computed per query.
+    Districts can be given as district_id ('PLG_1') or key ('พัทลุง_1').
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        data = np.load(path)
+        self.district_id = data['district_id']
+        self.key = data['key']
+        self.label = data['label']
+        self.features = data['features']
+        self.raw = data['raw']
+        self.feature_names = data['feature_names']
+        self.neighbour_table = data['neighbours']
+        self.distance_table = data['distances']
+        self.driver_table = data['drivers']
+        self.row = {d: i for i, d in enumerate(self.district_id)}
+        self.row.update({k: i for i, k in enumerate(self.key)})
+
+    def neighbours(self, district, k=10):
+        """
+        The k most similar districts (k <= MAX_K), closest first, each with
+        its distance and the features driving the match (name, own value,
+        neighbour value). Returns [] for an unknown district.
+        """
+        i = self.row.get(district)
+        if i is None:
+            return []
+        results = []
+        for j, dist, drivers in zip(self.neighbour_table[i, :k], self.distance_table[i, :k], self.driver_table[i, :k]):
+            results.append({
+                'district_id': str(self.district_id[j]),
+                'district_label': str(self.label[j]),
+                'distance': float(dist),
+                'drivers': [(str(self.feature_names[f]), float(self.raw[i, f]), float(self.raw[j, f])) for f in drivers],
+            })
+        return results
+
+    def frame(self, district, k=10):
+        """neighbours() as a DataFrame with the drivers joined into one column."""
+        rows = self.neighbours(district, k)
+        return pd.DataFrame([{**r, 'drivers': ", ".join(name for name, _, _ in r['drivers'])} for r in rows])
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the district similarity index and list neighbours.")
+    parser.add_argument('districts', nargs='*', help="district_id or key to look up")
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_index()
+    print(f"Indexed {len(index.district_id)} districts x {index.features.shape[1]} features "
+          f"in {time.perf_counter() - start:.2f} s -> {INDEX_FILE}")
+
+    rows = []
+    for i, district in enumerate(index.district_id):
+        for rank, r in enumerate(index.neighbours(district, MAX_K), 1):
+            rows.append({'district_id': district, 'district_label': index.label[i], 'rank': rank,
+                         'neighbour_id': r['district_id'], 'neighbour_label': r['district_label'],
+                         'distance': r['distance'], 'drivers': ", ".join(d[0] for d in r['drivers'])})
+    pd.DataFrame(rows).to_csv('q14_district_neighbours.csv', index=False, encoding='utf-8-sig')
+
+    for district in args.districts:
+        start = time.perf_counter()
+        result = index.frame(district, args.k)
+        elapsed = (time.perf_counter() - start) * 1e6
+        print(f"\n{district}: {len(result)} neighbours in {elapsed:.0f} us")
+        if not result.empty:
+            print(result[['district_id', 'district_label', 'distance', 'drivers']].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# orjson parses the same documents 2-4x faster; it is optional
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+class SchemaError(ValueError):
+    """Raised when a payload does not match its schema."""
+
+class Field(NamedTuple):
+    name: str              # output column
+    key: str               # key in the JSON object
+    kind: str              # 'int', 'float', 'str' or 'bool'
+    nullable: bool = False # JSON null allowed
+    optional: bool = False # key may be missing (decoded as null)
+
+class Carry(NamedTuple):
+    name: str   # output column
+    level: int  # ancestor depth along the path (0 = document root object)
+    key: str    # key in that ancestor
+
+class Table(NamedTuple):
+    name: str
+    # Keys walked from the document root to the rows. None means the
+    # document itself is the list; a key starting with '*' walks the values
+    # of an object and exposes its keys as that column name.
+    path: tuple
+    fields: tuple
+    carry: tuple = ()
+
+ALLOWED_TYPES = {
+    'int': {int},
+    'float': {int, float},
+    'str': {str},
+    'bool': {bool},
+}
+
+def F(name, kind, key=None, nullable=False, optional=False):
+    return Field(name, key or name, kind, nullable, optional)
+
+# --- Schemas of the ECT payloads (one or more tables per file) ---
+
+SCHEMAS = {
+    'info_constituency': (
+        Table('constituency', (None,), (
+            F('cons_id', 'str'), F('cons_no', 'int'), F('prov_id', 'str'),
+            F('total_vote_stations', 'int'), F('registered_vote', 'int', nullable=True),
+        )),
+    ),
+    'info_province': (
+        Table('province', ('province',), (
+            F('province_id', 'str'), F('prov_id', 'str'), F('province', 'str'), F('abbre_thai', 'str'),
+            F('eng', 'str'), F('total_vote_stations', 'int'), F('total_registered_vote', 'int'),
+        )),
+    ),
+    'info_party_overview': (
+        Table('party', (None,), (
+            F('id', 'str'), F('party_no', 'str'), F('name', 'str'), F('abbr', 'str', nullable=True),
+            F('color', 'str', nullable=True), F('logo_url', 'str', nullable=True),
+        )),
+    ),
+    'info_mp_candidate': (
+        Table('candidate', (None,), (
+            F('mp_app_id', 'str'), F('mp_app_no', 'int'), F('mp_app_party_id', 'int', nullable=True),
+            F('mp_app_name', 'str'), F('image_url', 'str', nullable=True),
+        )),
+    ),
+    'stats_party': (
+        Table('party', ('result_party',), (
+            F('party_id', 'int'), F('party_vote', 'int'), F('party_vote_percent', 'float'),
+            F('mp_app_vote', 'int'), F('mp_app_vote_percent', 'float'), F('first_mp_app_count', 'int'),
+        )),
+        Table('candidate', ('result_party', 'candidates'), (
+            F('mp_app_id', 'str'), F('party_id', 'int'), F('mp_app_vote', 'int'),
+            F('mp_app_vote_percent', 'float'), F('mp_app_rank', 'int'),
+        )),
+    ),
+    'stats_cons': (
+        Table('constituency', ('result_province', 'constituencies'), (
+            F('cons_id', 'str'), F('turn_out', 'int'), F('valid_votes', 'int'), F('invalid_votes', 'int'),
+            F('blank_votes', 'int'), F('party_list_turn_out', 'int'), F('party_list_valid_votes', 'int'),
+            F('party_list_invalid_votes', 'int'), F('party_list_blank_votes', 'int'),
+        ), (Carry('prov_id', 1, 'prov_id'),)),
+        Table('candidate', ('result_province', 'constituencies', 'candidates'), (
+            F('mp_app_id', 'str', optional=True, nullable=True), F('party_id', 'int'),
+            F('mp_app_vote', 'int'), F('mp_app_rank', 'int'),
+        ), (Carry('cons_id', 2, 'cons_id'),)),
+        Table('party_list', ('result_province', 'constituencies', 'result_party'), (
+            F('party_id', 'int'), F('party_list_vote', 'int'),
+        ), (Carry('cons_id', 2, 'cons_id'),)),
+    ),
+    'stat_referendum': (
+        Table('constituency', ('result_province', 'constituencies'), (
+            F('cons_id', 'str'), F('referendum_turn_out', 'int'), F('referendum_valid_votes', 'int'),
+            F('referendum_invalid_votes', 'int'), F('referendum_counted_vote_stations', 'int'),
+            F('referendum_percent_count', 'float'), F('pause_report', 'bool'),
+        ), (Carry('prov_id', 1, 'prov_id'),)),
+        Table('result', ('result_province', 'constituencies', '*referendum_id'), (
+            F('yes', 'int'), F('no', 'int'), F('abstained', 'int'),
+        ), (Carry('cons_id', 2, 'cons_id'),)),
+    ),
+}
+
+# The '*referendum_id' step walks referendum_results of each constituency
+MAP_KEYS = {'*referendum_id': 'referendum_results'}
+
+def _walk(doc, path):
+    """
+    Returns (records, parents, map_keys): the row objects at the end of
+    path, the tuple of ancestor objects of each row and, for '*' steps,
+    the object key each row came from.
+    """
+    rows, parents, keys = [doc], [()], None
+    for step in path:
+        if step is None:
+            if not isinstance(doc, list):
+                raise SchemaError(f"expected a list at the document root, got {type(doc).__name__}")
+            rows, parents = doc, [()] * len(doc)
+            continue
+        new_rows, new_parents, new_keys = [], [], []
+        if step.startswith('*'):
+            source = MAP_KEYS[step]
+            for node, anc in zip(rows, parents):
+                children = node.get(source) or {}
+                anc = anc + (node,)
+                for k, child in children.items():
+                    new_rows.append(child)
+                    new_parents.append(anc)
+                    new_keys.append(k)
+            keys = new_keys
+        else:
+            for i, (node, anc) in enumerate(zip(rows, parents)):
+                children = node.get(step) if isinstance(node, dict) else None
+                if not isinstance(children, list):
+                    raise SchemaError(f"'{step}' of row {i} is {type(children).__name__}, expected list")
+                new_rows.extend(children)
+                new_parents.extend([anc + (node,)] * len(children))
+        rows, parents = new_rows, new_parents
+    return rows, parents, keys
+
+def _column(values, kind, nullable, where):
+    """Validates the Python types of one column and converts it to a numpy array."""
+    allowed = ALLOWED_TYPES[kind] | ({type(None)} if nullable else set())
+    types = set(map(type, values))
+    if types - allowed:
+        i = next(i for i, v in enumerate(values) if type(v) not in allowed)
+        raise SchemaError(f"{where}[{i}]: expected {kind}{' or null' if nullable else ''}, "
+                          f"got {type(values[i]).__name__} {values[i]!r:.40}")
+    has_null = type(None) in types
+    if kind == 'str':
+        return np.array(values, dtype=object)
+    if kind == 'bool':
+        return np.array(values, dtype=object if has_null else bool)
+    if kind == 'int' and not has_null:
+        return np.array(values, dtype=np.int64)
+    # float, or int with nulls: NaN marks null
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+def decode_table(doc, table, source=''):
+    """Decodes one table of a parsed document into a dict of numpy columns."""
+    rows, parents, keys = _walk(doc, table.path)
+    columns = {}
+    for field in table.fields:
+        where = f"{source}.{table.name}.{field.key}"
+        try:
+            if field.optional:
+                values = [r.get(field.key) for r in rows]
+            else:
+                values = [r[field.key] for r in rows]
+        except KeyError:
+            i = next(i for i, r in enumerate(rows) if field.key not in r)
+            raise SchemaError(f"{where}[{i}]: missing key") from None
+        except TypeError:
+            raise SchemaError(f"{where}: rows are not objects") from None
+        columns[field.name] = _column(values, field.kind, field.nullable or field.optional, where)
+    for carry in table.carry:
+        columns[carry.name] = np.array([p[carry.level][carry.key] for p in parents], dtype=object)
+    if keys is not None:
+        step = next(s for s in table.path if s and s.startswith('*'))
+        columns[step[1:]] = np.array(keys, dtype=object)
+    return columns
+
+def decode(payload, schema):
+    """
+    Decodes a payload (bytes, str or already-parsed JSON) of a known schema
+    into {table name: {column: numpy array}} (struct of arrays).
+    Raises SchemaError on a missing key or a value of the wrong type.
+    """
+    if isinstance(payload, (bytes, bytearray, str)):
+        payload = _loads(payload)
+    return {t.name: decode_table(payload, t, schema) for t in SCHEMAS[schema]}
+
+def read_json(path):
+    """Parses one raw file as a plain JSON tree (orjson when installed)."""
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+def decode_file(path, schema=None):
+    """Reads and decodes one raw file; the schema defaults to the file name."""
+    schema = schema or os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'rb') as f:
+        return decode(f.read(), schema)
+
+def to_frame(columns):
+    """One decoded table as a DataFrame (columns are used without copying)."""
+    return pd.DataFrame(columns, copy=False)
+
+# --- Benchmark against the dict-per-row path used by the ETL ---
+
+def decode_rows(path, schema=None):
+    """
+    Reference decoder: json.load, then one dict per output row and
+    pd.DataFrame(list_of_dicts), the way scripts/etl.py builds its frames.
+    """
+    schema = schema or os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'r', encoding='utf-8') as f:
+        doc = json.load(f)
+    frames = {}
+    for table in SCHEMAS[schema]:
+        rows, parents, keys = _walk(doc, table.path)
+        records = []
+        for i, (r, p) in enumerate(zip(rows, parents)):
+            rec = {f.name: r.get(f.key) for f in table.fields}
+            for c in table.carry:
+                rec[c.name] = p[c.level][c.key]
+            if keys is not None:
+                rec['key'] = keys[i]
+            records.append(rec)
+        frames[table.name] = pd.DataFrame(records)
+    return frames
+
+def _measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+def benchmark(raw_dir=os.path.join('data', 'raw'), repeat=5):
+    """
+    Times both decoders on every raw file present and reports best-of-N
+    seconds and tracemalloc peak bytes.
+    Returns DataFrame with: file, bytes, rows, rows_s, typed_s, rows_peak_kb, typed_peak_kb, speedup
+    """
+    results = []
+    for schema in SCHEMAS:
+        path = os.path.join(raw_dir, f"{schema}.txt")
+        if not os.path.exists(path):
+            print(f"Skipping {schema}: {path} not found")
+            continue
+        n_rows = sum(len(next(iter(cols.values()), [])) for cols in decode_file(path).values())
+        rows_s, rows_peak = _measure(lambda: decode_rows(path), repeat)
+        typed_s, typed_peak = _measure(lambda: {k: to_frame(v) for k, v in decode_file(path).items()}, repeat)
+        results.append({
+            'file': schema,
+            'bytes': os.path.getsize(path),
+            'rows': n_rows,
+            'rows_s': rows_s,
+            'typed_s': typed_s,
+            'rows_peak_kb': rows_peak / 1024,
+            'typed_peak_kb': typed_peak / 1024,
+            'speedup': rows_s / typed_s if typed_s else np.nan,
+        })
+    return pd.DataFrame(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the typed ECT decoders against the dict-per-row path.")
+    parser.add_argument('--raw-dir', default=os.path.join('data', 'raw'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"JSON parser: {'orjson' if orjson else 'json'}")
+    report = benchmark(args.raw_dir, args.repeat)
+    with pd.option_context('display.width', 200, 'display.float_format', '{:,.4f}'.format):
+        print(report.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,109 @@
-import json
+import os
+
+import numpy as np
 import pandas as pd
 
-def load_data():
-    """Loads all the raw data files into pandas DataFrames."""
-    
-    # Load constituency info
-    with open('info_constituency.txt', 'r', encoding='utf-8') as f:
-        info_constituency_json = json.load(f)
-    df_constituency_info = pd.DataFrame(info_constituency_json)
-    
-    # Load province info
-    with open('info_province.txt', 'r', encoding='utf-8') as f:
-        info_province_json = json.load(f)
-    df_province_info = pd.DataFrame(info_province_json['province'])
-
-    # Load main election stats
-    with open('stats_cons.txt', 'r', encoding='utf-8') as f:
-        stats_cons_json = json.load(f)
-    
-    # Load referendum stats
-    with open('stat_referendum.txt', 'r', encoding='utf-8') as f:
-        stat_referendum_json = json.load(f)
+try:
+    from scripts.build_cube import build_cubes
+    from scripts.candidates import (load_candidate_sources, build_candidate_dim,
+                                    build_candidate_results, write_candidate_store)
+    from scripts.ect_decoders import decode_file, to_frame
+    from scripts.snapshot_store import SnapshotStore
+except ImportError:
+    from build_cube import build_cubes
+    from candidates import (load_candidate_sources, build_candidate_dim,
+                            build_candidate_results, write_candidate_store)
+    from ect_decoders import decode_file, to_frame
+    from snapshot_store import SnapshotStore
 
-    # Load party info
-    with open('info_party_overview.txt', 'r', encoding='utf-8') as f:
-        info_party_overview_json = json.load(f)
-    df_party_info = pd.DataFrame(info_party_overview_json)
+def load_data():
+    """
+    Loads all the raw data files with the typed decoders (see ect_decoders.py).
+    stats_cons and stat_referendum are returned as {table name: DataFrame}.
+    """
+    df_constituency_info = to_frame(decode_file('info_constituency.txt')['constituency'])
+    df_province_info = to_frame(decode_file('info_province.txt')['province'])
+    stats_cons = {name: to_frame(cols) for name, cols in decode_file('stats_cons.txt').items()}
+    stat_referendum = {name: to_frame(cols) for name, cols in decode_file('stat_referendum.txt').items()}
+    df_party_info = to_frame(decode_file('info_party_overview.txt')['party'])
 
     print("Data loaded successfully")
-    return df_constituency_info, df_province_info, stats_cons_json, stat_referendum_json, df_party_info
+    return df_constituency_info, df_province_info, stats_cons, stat_referendum, df_party_info
+
+def _in_feed_order(frames, cons_ids, order_ids):
+    """
+    Concatenates frames and orders the rows by constituency the way the feed
+    lists them; within a constituency the frames keep the order given.
+    """
+    df = pd.concat(frames, ignore_index=True)
+    position = pd.Series(np.arange(len(order_ids)), index=order_ids)
+    order = np.argsort(position.loc[cons_ids].to_numpy(), kind='stable')
+    return df.iloc[order].reset_index(drop=True)
+
+def build_turnout(stats_cons):
+    """
+    One CONS and one PARTY row per constituency from stats_cons.
+    Returns DataFrame with: district_id, ballot_code, voters_used, valid_votes, invalid_votes, no_vote
+    """
+    cons = stats_cons['constituency']
+    frames = []
+    for ballot_code, prefix in (('CONS', ''), ('PARTY', 'party_list_')):
+        frames.append(pd.DataFrame({
+            'district_id': cons['cons_id'],
+            'ballot_code': ballot_code,
+            'voters_used': cons[f'{prefix}turn_out'],
+            'valid_votes': cons[f'{prefix}valid_votes'],
+            'invalid_votes': cons[f'{prefix}invalid_votes'],
+            'no_vote': cons[f'{prefix}blank_votes'],
+        }))
+    cons_ids = pd.concat([cons['cons_id'], cons['cons_id']], ignore_index=True)
+    return _in_feed_order(frames, cons_ids, cons['cons_id'])
+
+def build_votes(stats_cons, party_rank=None):
+    """
+    Candidate (CONS) and party-list (PARTY) votes per constituency from
+    stats_cons; party-list rows get party_rank as rank.
+    Returns DataFrame with: district_id, ballot_code, actor_type, party_id, votes, rank
+    """
+    candidates = stats_cons['candidate']
+    parties = stats_cons['party_list']
+    frames = [
+        pd.DataFrame({
+            'district_id': candidates['cons_id'],
+            'ballot_code': 'CONS',
+            'actor_type': 'candidate',
+            'party_id': candidates['party_id'],
+            'votes': candidates['mp_app_vote'],
+            'rank': candidates['mp_app_rank'],
+        }),
+        pd.DataFrame({
+            'district_id': parties['cons_id'],
+            'ballot_code': 'PARTY',
+            'actor_type': 'party',
+            'party_id': parties['party_id'],
+            'votes': parties['party_list_vote'],
+            'rank': party_rank,
+        }),
+    ]
+    cons_ids = pd.concat([candidates['cons_id'], parties['cons_id']], ignore_index=True)
+    return _in_feed_order(frames, cons_ids, stats_cons['constituency']['cons_id'])
+
+def build_referendum(stat_referendum):
+    """
+    Yes/no votes of the first referendum question per constituency;
+    constituencies without results are left out.
+    Returns DataFrame with: district_id, ballot_code, yes_votes, no_votes, voters_used
+    """
+    results = stat_referendum['result'].drop_duplicates('cons_id')
+    turnout = stat_referendum['constituency'][['cons_id', 'referendum_turn_out']]
+    merged = results.merge(turnout, on='cons_id', how='left')
+    return pd.DataFrame({
+        'district_id': merged['cons_id'],
+        'ballot_code': 'RFD',
+        'yes_votes': merged['yes'],
+        'no_votes': merged['no'],
+        'voters_used': merged['referendum_turn_out'],
+    })
 
 def create_region_mapping():
     """Creates a mapping of provinces to regions."""
@@ -68,7 +143,7 @@ def create_region_mapping():
     return region_mapping
 
 if __name__ == '__main__':
-    df_constituency_info, df_province_info, stats_cons_json, stat_referendum_json, df_party_info = load_data()
+    df_constituency_info, df_province_info, stats_cons, stat_referendum, df_party_info = load_data()
     
     region_mapping = create_region_mapping()
     df_province_info['region'] = df_province_info['province'].map(region_mapping)
@@ -86,26 +161,7 @@ if __name__ == '__main__':
     print(df_district_dim.head())
 
     # Build turnout DataFrame
-    turnout_data = []
-    for province in stats_cons_json['result_province']:
-        for cons in province['constituencies']:
-            turnout_data.append({
-                'district_id': cons['cons_id'],
-                'ballot_code': 'CONS',
-                'voters_used': cons['turn_out'],
-                'valid_votes': cons['valid_votes'],
-                'invalid_votes': cons['invalid_votes'],
-                'no_vote': cons['blank_votes']
-            })
-            turnout_data.append({
-                'district_id': cons['cons_id'],
-                'ballot_code': 'PARTY',
-                'voters_used': cons['party_list_turn_out'],
-                'valid_votes': cons['party_list_valid_votes'],
-                'invalid_votes': cons['party_list_invalid_votes'],
-                'no_vote': cons['party_list_blank_votes']
-            })
-    df_turnout = pd.DataFrame(turnout_data)
+    df_turnout = build_turnout(stats_cons)
     
     # Merge with constituency info to get eligible_voters
     df_turnout = pd.merge(df_turnout, df_constituency_info[['cons_id', 'registered_vote']], left_on='district_id', right_on='cons_id', how='left')
@@ -117,31 +173,8 @@ if __name__ == '__main__':
     print("\nturnout DataFrame:")
     print(df_turnout.head())
 
-    # Build votes DataFrame
-    votes_data = []
-    for province in stats_cons_json['result_province']:
-        for cons in province['constituencies']:
-            # Candidate votes
-            for candidate in cons['candidates']:
-                votes_data.append({
-                    'district_id': cons['cons_id'],
-                    'ballot_code': 'CONS',
-                    'actor_type': 'candidate',
-                    'party_id': candidate['party_id'],
-                    'votes': candidate['mp_app_vote'],
-                    'rank': candidate['mp_app_rank']
-                })
-            # Party-list votes
-            for party in cons['result_party']:
-                votes_data.append({
-                    'district_id': cons['cons_id'],
-                    'ballot_code': 'PARTY',
-                    'actor_type': 'party',
-                    'party_id': party['party_id'],
-                    'votes': party['party_list_vote'],
-                    'rank': None  # Rank is not available for party-list votes in the source
-                })
-    df_votes = pd.DataFrame(votes_data)
+    # Build votes DataFrame (party-list rank is not in the source, calculated below)
+    df_votes = build_votes(stats_cons, party_rank=None)
     
     # Calculate rank for party-list votes
     df_votes['rank'] = df_votes[df_votes['actor_type'] == 'party'].groupby(['district_id', 'ballot_code'])['votes'].rank(method='min', ascending=False)
@@ -158,19 +191,7 @@ if __name__ == '__main__':
     print(df_votes.head())
     
     # Build referendum_results DataFrame
-    referendum_data = []
-    for province in stat_referendum_json['result_province']:
-        for cons in province['constituencies']:
-            # The key for the results is a UUID, so we get it dynamically
-            result_key = list(cons['referendum_results'].keys())[0]
-            referendum_data.append({
-                'district_id': cons['cons_id'],
-                'ballot_code': 'RFD',
-                'yes_votes': cons['referendum_results'][result_key]['yes'],
-                'no_votes': cons['referendum_results'][result_key]['no'],
-                'voters_used': cons['referendum_turn_out']
-            })
-    df_referendum = pd.DataFrame(referendum_data)
+    df_referendum = build_referendum(stat_referendum)
     df_referendum['year'] = 2569
     
     print("\nreferendum_results DataFrame:")
@@ -258,7 +279,7 @@ def validate_schema(df_district_dim, df_turnout, df_votes, df_referendum):
 
 if __name__ == '__main__':
     # ... (previous code) ...
-    df_constituency_info, df_province_info, stats_cons_json, stat_referendum_json, df_party_info = load_data()
+    df_constituency_info, df_province_info, stats_cons, stat_referendum, df_party_info = load_data()
     
     region_mapping = create_region_mapping()
     df_province_info['region'] = df_province_info['province'].map(region_mapping)
@@ -273,26 +294,7 @@ if __name__ == '__main__':
     df_district_dim['year'] = 2569
 
     # Build turnout DataFrame
-    turnout_data = []
-    for province in stats_cons_json['result_province']:
-        for cons in province['constituencies']:
-            turnout_data.append({
-                'district_id': cons['cons_id'],
-                'ballot_code': 'CONS',
-                'voters_used': cons['turn_out'],
-                'valid_votes': cons['valid_votes'],
-                'invalid_votes': cons['invalid_votes'],
-                'no_vote': cons['blank_votes']
-            })
-            turnout_data.append({
-                'district_id': cons['cons_id'],
-                'ballot_code': 'PARTY',
-                'voters_used': cons['party_list_turn_out'],
-                'valid_votes': cons['party_list_valid_votes'],
-                'invalid_votes': cons['party_list_invalid_votes'],
-                'no_vote': cons['party_list_blank_votes']
-            })
-    df_turnout = pd.DataFrame(turnout_data)
+    df_turnout = build_turnout(stats_cons)
     
     # Merge with constituency info to get eligible_voters
     df_turnout = pd.merge(df_turnout, df_constituency_info[['cons_id', 'registered_vote']], left_on='district_id', right_on='cons_id', how='left')
@@ -300,31 +302,8 @@ if __name__ == '__main__':
     df_turnout['year'] = 2569
     df_turnout = df_turnout.drop(columns=['cons_id'])
 
-    # Build votes DataFrame
-    votes_data = []
-    for province in stats_cons_json['result_province']:
-        for cons in province['constituencies']:
-            # Candidate votes
-            for candidate in cons['candidates']:
-                votes_data.append({
-                    'district_id': cons['cons_id'],
-                    'ballot_code': 'CONS',
-                    'actor_type': 'candidate',
-                    'party_id': candidate['party_id'],
-                    'votes': candidate['mp_app_vote'],
-                    'rank': candidate['mp_app_rank']
-                })
-            # Party-list votes
-            for party in cons['result_party']:
-                votes_data.append({
-                    'district_id': cons['cons_id'],
-                    'ballot_code': 'PARTY',
-                    'actor_type': 'party',
-                    'party_id': party['party_id'],
-                    'votes': party['party_list_vote'],
-                    'rank': 0 # Rank is not available for party-list votes in the source, will calculate later
-                })
-    df_votes = pd.DataFrame(votes_data)
+    # Build votes DataFrame (party-list rank is not in the source, calculated below)
+    df_votes = build_votes(stats_cons, party_rank=0)
     
     # Calculate rank for party-list votes
     df_votes.loc[df_votes['actor_type'] == 'party', 'rank'] = df_votes[df_votes['actor_type'] == 'party'].groupby(['district_id', 'ballot_code'])['votes'].rank(method='min', ascending=False)
@@ -338,20 +317,7 @@ if __name__ == '__main__':
     df_votes = df_votes.drop(columns=['id'])
 
     # Build referendum_results DataFrame
-    referendum_data = []
-    for province in stat_referendum_json['result_province']:
-        for cons in province['constituencies']:
-            # The key for the results is a UUID, so we get it dynamically
-            if cons['referendum_results']:
-                result_key = list(cons['referendum_results'].keys())[0]
-                referendum_data.append({
-                    'district_id': cons['cons_id'],
-                    'ballot_code': 'RFD',
-                    'yes_votes': cons['referendum_results'][result_key]['yes'],
-                    'no_votes': cons['referendum_results'][result_key]['no'],
-                    'voters_used': cons['referendum_turn_out']
-                })
-    df_referendum = pd.DataFrame(referendum_data)
+    df_referendum = build_referendum(stat_referendum)
     df_referendum['year'] = 2569
 
     validate_schema(df_district_dim, df_turnout, df_votes, df_referendum)
@@ -409,6 +375,30 @@ if __name__ == '__main__':
     m_referendum_master.to_csv('m_referendum_master.csv', index=False)
     print("m_referendum_master created and saved.")
 
+    # E) Aggregate cubes (national/region/province/district KPIs for the dashboard)
+    print("\nBuilding aggregate cubes...")
+    m_turnout_cube, m_party_cube = build_cubes(m_turnout_master, m_votes_master, m_referendum_master)
+    m_turnout_cube.to_csv('m_turnout_cube.csv', index=False)
+    m_party_cube.to_csv('m_party_cube.csv', index=False)
+    print("m_turnout_cube and m_party_cube created and saved.")
+
+    # F) Candidate dimension and candidate results (columnar store in candidates/)
+    print("\nBuilding candidate store...")
+    df_candidate_info, df_candidate_votes, _ = load_candidate_sources('.')
+    candidate_dim = build_candidate_dim(df_candidate_info, df_party_info)
+    candidate_results = build_candidate_results(df_candidate_votes, candidate_dim)
+    write_candidate_store(candidate_dim, candidate_results)
+    print(f"Candidate store created and saved: {len(candidate_dim)} candidates, {len(candidate_results)} results.")
+
+    # G) Snapshot history (append-only; unchanged constituencies are not stored again)
+    print("\nArchiving feed snapshot...")
+    # The ETL runs in data/raw; the store is data/snapshots, where the nowcast reads it
+    snapshot = SnapshotStore(os.path.join('..', 'snapshots')).ingest_raw('.')
+    if snapshot is None:
+        print("Feed unchanged since the last archived snapshot.")
+    else:
+        print(f"Snapshot {snapshot['seq']} archived: {snapshot['new_blocks']} new blocks, {snapshot['bytes_written']:,} bytes.")
+
 def generate_readiness_report(m_district_geo, m_turnout_master, m_votes_master, m_referendum_master, tied_ranks, consecutive_ranks):
     """Generates and prints the readiness report."""
     
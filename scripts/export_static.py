@@ -0,0 +1,428 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+try:
+    import scripts.build_cube as bc
+    import scripts.data_cache as dc
+    import scripts.preprocess_svg as psvg
+except ImportError:
+    import build_cube as bc
+    import data_cache as dc
+    import preprocess_svg as psvg
+
+OUTPUT_DIR = 'static/site'
+MANIFEST_NAME = 'manifest.json'
+# Bump when the page layout or builders change, so every page is re-exported
+EXPORT_VERSION = 2
+
+CUBE_FILES = ['m_turnout_cube.csv', 'm_party_cube.csv']
+SVG_INDEX = 'svg_min/2569/index.json'
+
+# Q1 ballot labels -> ballot_code in the cube (same as the turnout page)
+BALLOT_CODES = {'CON': 'CONS', 'PL': 'PARTY', 'RFD': 'RFD'}
+
+TERRITORY_COMPARISONS = {
+    'q2': ("MFP (2566) vs People's (2569)", 'q2_'),
+    'p034': ("Pheu Thai", 'q3_p034_'),
+    'p063': ("Bhumjaithai", 'q4_p063_'),
+    'p001': ("Democrat", 'q5_p001_'),
+}
+
+# Pages that only show q*_ result tables: slug -> (title, [(heading, file)])
+TABLE_PAGES = {
+    'concentration': ("Concentration Screening (Q6)", [
+        ("Flagged Districts List", 'q6_combined_flags.csv'),
+        ("Effective Number of Candidates (ENC)", 'q6_enc_stats.csv'),
+        ("Criteria 6.1", 'q6_criteria_6_1.csv'),
+        ("Criteria 6.2", 'q6_criteria_6_2_lists.csv'),
+        ("Criteria 6.3", 'q6_criteria_6_3.csv'),
+        ("Low ENC Districts", 'q6_enc_low_lists.csv'),
+    ]),
+    'gap': ("Gap Analysis: People's Party (2569)", [
+        ("Votes Gap in Lost Districts", 'q7_p000_gap_list.csv'),
+        ("Win Margin in Won Districts", 'q7_p000_margin_list.csv'),
+    ]),
+    'no_vote': ("No Vote Analysis (Q8)", [
+        ("National Comparison", 'q8_no_vote_national_comparison.csv'),
+        ("Regional Comparison", 'q8_no_vote_region_comparison.csv'),
+        ("District-level Changes (2569 - 2566)", 'q8_no_vote_district_changes.csv'),
+    ]),
+    'typology': ("District Typology (Q9)", [
+        ("Typology 9.1 (P000 + P034)", 'q9_typology_91.csv'),
+        ("Typology 9.2 (P000 + P034 + P001)", 'q9_typology_92.csv'),
+        ("Typology 9.3: Rank 2 + Rank 3 > Rank 1", 'q9_rank23_gt_rank1.csv'),
+    ]),
+    'referendum': ("Referendum Correlation (Q10)", [
+        ("Correlation with CON Vote Shares", 'q10_ref_con_party_corr_summary.csv'),
+        ("Correlation with PL Vote Shares", 'q10_ref_pl_party_corr_summary.csv'),
+    ]),
+}
+
+PAGE_TITLES = {
+    'national': "National Overview",
+    'turnout': "Turnout Analysis (Q1)",
+    'territory': "Territory Comparison (2566 vs 2569)",
+    'parties': "Party Results",
+    **{slug: title for slug, (title, _) in TABLE_PAGES.items()},
+}
+
+# Cube loaded once per worker process
+_cube = None
+
+def get_cube(data_dir):
+    global _cube
+    if _cube is None:
+        _cube = bc.load_cube(data_dir)
+    return _cube
+
+# --- Rendering helpers ---
+
+def _display(df):
+    """Copy of df with whole-number float columns shown as integers."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype.kind == 'f':
+            values = df[col].dropna()
+            if not values.empty and (values == values.round()).all() and values.abs().max() > 1:
+                df[col] = df[col].astype('Int64')
+    return df
+
+def table_html(df):
+    return _display(df).to_html(index=False, na_rep='', classes='data', border=0,
+                                float_format=lambda x: f"{x:,.4f}")
+
+def bar_chart_svg(labels, values, width=640, bar_height=22):
+    """
+    Horizontal bar chart as a standalone SVG. Text is left to the browser,
+    so Thai labels render without any font setup on the export machine.
+    """
+    label_w, pad = 160, 4
+    vmax = max([v for v in values if pd.notna(v)] or [1]) or 1
+    height = len(labels) * (bar_height + pad) + pad
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'font-family="sans-serif" font-size="12">']
+    for i, (label, value) in enumerate(zip(labels, values)):
+        y = pad + i * (bar_height + pad)
+        w = 0 if pd.isna(value) else (width - label_w - 90) * value / vmax
+        parts.append(f'<text x="{label_w - 6}" y="{y + bar_height * 0.7:.0f}" text-anchor="end">'
+                     f'{html.escape(str(label))}</text>')
+        parts.append(f'<rect x="{label_w}" y="{y}" width="{w:.1f}" height="{bar_height}" fill="#1f77b4"/>')
+        parts.append(f'<text x="{label_w + w + 4:.1f}" y="{y + bar_height * 0.7:.0f}">'
+                     f'{"" if pd.isna(value) else f"{value:,.0f}"}</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+def render_html(title, sections, version, depth):
+    """
+    Full HTML document for one page. depth is the number of directories
+    below the site root; version is the page's own input fingerprint (the
+    site index gets the global data version), so a page skipped by an
+    incremental export still shows the version it was built from.
+    """
+    root = '../' * depth
+    body = [f'<p class="nav"><a href="{root}index.html">All pages</a> · version {version}</p>',
+            f'<h1>{html.escape(title)}</h1>']
+    for section in sections:
+        if section.get('heading'):
+            body.append(f"<h2>{html.escape(section['heading'])}</h2>")
+        if 'metrics' in section:
+            body.append('<dl class="metrics">' + ''.join(
+                f'<div><dt>{html.escape(k)}</dt><dd>{html.escape(v)}</dd></div>'
+                for k, v in section['metrics'].items()) + '</dl>')
+        if 'text' in section:
+            body.append(f"<p>{html.escape(section['text'])}</p>")
+        if 'links' in section:
+            body.append('<ul class="links">' + ''.join(
+                f'<li><a href="{html.escape(href)}">{html.escape(label)}</a></li>'
+                for label, href in section['links']) + '</ul>')
+        if 'asset' in section:
+            body.append(f'<img src="{html.escape(section["asset"])}" alt="{html.escape(section.get("heading", ""))}">')
+        if 'table' in section:
+            body.append(table_html(section['table']))
+    return (
+        '<!DOCTYPE html>\n<html lang="th"><head><meta charset="utf-8">'
+        f'<meta name="viewport" content="width=device-width, initial-scale=1"><title>{html.escape(title)}</title>'
+        '<style>body{font-family:sans-serif;margin:2em;max-width:1100px}'
+        'table.data{border-collapse:collapse;font-size:13px}'
+        'table.data td,table.data th{padding:2px 8px;border-bottom:1px solid #ddd;text-align:right}'
+        '.metrics{display:flex;flex-wrap:wrap;gap:2em}.metrics dd{font-size:1.6em;margin:0}'
+        'img{max-width:100%}.nav{color:#666}</style></head><body>\n'
+        + '\n'.join(body) + '\n</body></html>\n'
+    )
+
+# --- Page builders ---
+# Each takes (data_dir, output_dir, args) and returns (title, sections, assets),
+# where assets is a dict of file name -> text content written next to the page.
+
+def build_national(data_dir, output_dir, args):
+    cube = get_cube(data_dir)
+    kpis = bc.get_kpis(cube, 'national', 2569, 'CONS')
+    metrics = {
+        "Eligible Voters": f"{kpis['eligible_voters']:,.0f}",
+        "Total Turnout": f"{kpis['voters_used']:,.0f} ({kpis['turnout_rate']:.2%})",
+        "Valid Votes": f"{kpis['valid_votes']:,.0f}",
+        "Invalid Votes": f"{kpis['invalid_votes']:,.0f}",
+        "No-Votes": f"{kpis['no_vote']:,.0f}",
+    }
+    top_parties = bc.get_parties(cube, 'national', 2569, 'PARTY', k=10)[['party_name', 'votes']]
+    regional = bc.get_level(cube, 'region', 2569, 'CONS')[['region', 'eligible_voters', 'voters_used', 'turnout_rate']]
+    provinces = sorted(bc.get_level(cube, 'province', 2569, 'CONS')['province'])
+    sections = [
+        {'heading': "National KPIs", 'metrics': metrics},
+        {'heading': "Top 10 Parties by Party-List Votes", 'asset': 'top_parties.svg', 'table': top_parties},
+        {'heading': "Regional Summary", 'table': regional},
+        {'heading': "Province Drill-down", 'links': [(p, f"{p}/index.html") for p in provinces]},
+    ]
+    assets = {'top_parties.svg': bar_chart_svg(top_parties['party_name'], top_parties['votes'])}
+    return "Thailand Election 2569 - National Overview", sections, assets
+
+def build_national_province(data_dir, output_dir, args):
+    province = args['province']
+    cube = get_cube(data_dir)
+    districts = bc.get_children(cube, 'district', 2569, 'CONS', province)
+    sections = [{'heading': "Province KPIs", 'metrics': {}}]
+    kpis = bc.get_kpis(cube, 'province', 2569, 'CONS', province)
+    if kpis is not None:
+        sections[0]['metrics'] = {
+            "Eligible Voters": f"{kpis['eligible_voters']:,.0f}",
+            "Turnout": f"{kpis['turnout_rate']:.2%}",
+            "Rank": f"{kpis['turnout_rank']:.0f}",
+        }
+    assets = {}
+    svg = psvg.load_province_svg(province)
+    if svg:
+        rates = dict(zip(districts['district_number'].astype(int), districts['turnout_rate']))
+        titles = {no: f"{province} เขต {no}: {rate:.2%}" for no, rate in rates.items() if pd.notna(rate)}
+        assets['map.svg'] = psvg.recolor_svg(svg, psvg.color_scale(rates), titles)
+        sections.append({'heading': "CONS turnout rate by constituency (darker = higher)", 'asset': 'map.svg'})
+    sections.append({'heading': "Constituencies", 'table': districts[
+        ['district_label', 'eligible_voters', 'voters_used', 'turnout_rate', 'no_vote_rate', 'turnout_rank']]})
+    leaders = []
+    for key in districts['district_id']:
+        top = bc.get_parties(cube, 'district', 2569, 'CONS', key, k=1)
+        if not top.empty:
+            leaders.append(top[['district_label', 'party_name', 'votes', 'vote_share']])
+    if leaders:
+        sections.append({'heading': "Constituency Winners", 'table': pd.concat(leaders, ignore_index=True)})
+    return f"{province} - Constituency Results 2569", sections, assets
+
+def build_turnout(data_dir, output_dir, args):
+    ballot_type = args['ballot']
+    ballot_code = BALLOT_CODES[ballot_type]
+    cube = get_cube(data_dir)
+    sections = [{'links': [(b, f"../{b}/index.html") for b in BALLOT_CODES]}]
+    for level, cols in (('district', ['region', 'province', 'district_label', 'turnout_rate']),
+                        ('province', ['region', 'province', 'turnout_rate'])):
+        top, bottom = bc.get_top_bottom(cube, level, 2569, ballot_code, 10)
+        if top.empty:
+            continue
+        sections.append({'heading': f"Top 10 {level.title()}s by Turnout", 'table': top[cols]})
+        sections.append({'heading': f"Bottom 10 {level.title()}s by Turnout", 'table': bottom[cols]})
+    regions = bc.get_level(cube, 'region', 2569, ballot_code)
+    if not regions.empty:
+        sections.append({'heading': "Regional Ranking",
+                         'table': regions[['region', 'eligible_voters', 'voters_used', 'turnout_rate']]})
+    return f"Turnout Analysis: {ballot_type}", sections, {}
+
+def build_territory(data_dir, output_dir, args):
+    label, prefix = TERRITORY_COMPARISONS[args['comparison']]
+    sections = [{'links': [(l, f"../{slug}/index.html") for slug, (l, _) in TERRITORY_COMPARISONS.items()]}]
+    gained = 'q2_new_districts.csv' if prefix == 'q2_' else f'{prefix}gained.csv'
+    for heading, name in (("Summary", f'{prefix}summary_counts.csv'), ("Held Districts", f'{prefix}held.csv'),
+                          ("Lost Districts", f'{prefix}lost.csv'), ("Gained Districts", gained),
+                          ("Province Seat Changes", f'{prefix}province_seat_changes.csv')):
+        path = os.path.join(output_dir, name)
+        if os.path.exists(path):
+            sections.append({'heading': heading, 'table': dc.load_table(path)})
+    return f"Territory Comparison: {label}", sections, {}
+
+def build_table_page(data_dir, output_dir, args):
+    title, tables = TABLE_PAGES[args['page']]
+    sections = []
+    for heading, name in tables:
+        path = os.path.join(output_dir, name)
+        if os.path.exists(path):
+            sections.append({'heading': heading, 'table': dc.load_table(path)})
+        else:
+            sections.append({'heading': heading, 'text': "Data not found. Please run the analysis script."})
+    return title, sections, {}
+
+def build_party(data_dir, output_dir, args):
+    cube = get_cube(data_dir)
+    party = cube['party']
+    rows = party[(party['party_id'] == args['party_id']) & (party['year'] == 2569)]
+    name = rows['party_name'].iloc[0] if not rows.empty else str(args['party_id'])
+    sections = []
+    national = rows[rows['level'] == 'national'][['ballot_code', 'votes', 'vote_share', 'party_rank']]
+    sections.append({'heading': "National", 'table': national})
+    regions = rows[(rows['level'] == 'region') & (rows['ballot_code'] == 'PARTY')]
+    sections.append({'heading': "Party-List Votes by Region",
+                     'table': regions[['region', 'votes', 'vote_share', 'party_rank']].sort_values('votes', ascending=False)})
+    districts = rows[(rows['level'] == 'district') & (rows['ballot_code'] == 'CONS')].sort_values('votes', ascending=False)
+    sections.append({'heading': f"Constituency Seats Won: {int((districts['party_rank'] == 1).sum())}",
+                     'table': districts[['province', 'district_label', 'votes', 'vote_share', 'party_rank']]})
+    return f"{name} - Results 2569", sections, {}
+
+BUILDERS = {
+    'national': build_national,
+    'national_province': build_national_province,
+    'turnout': build_turnout,
+    'territory': build_territory,
+    'table_page': build_table_page,
+    'party': build_party,
+}
+
+# --- Task planning and export ---
+
+def plan_tasks(data_dir='data', output_dir='.'):
+    """
+    Lists every page variant to export with the input files it reads.
+    Returns a list of dicts: path (relative output dir), builder, args, inputs.
+    """
+    cube_inputs = [os.path.join(data_dir, f) for f in CUBE_FILES]
+    cube = get_cube(data_dir)
+    tasks = [{'path': 'national', 'builder': 'national', 'args': {}, 'inputs': cube_inputs}]
+
+    svg_dir = os.path.join(data_dir, os.path.dirname(SVG_INDEX))
+    for province in sorted(bc.get_level(cube, 'province', 2569, 'CONS')['province']):
+        inputs = cube_inputs + [os.path.join(data_dir, SVG_INDEX), os.path.join(svg_dir, f"{province}.svg")]
+        tasks.append({'path': f'national/{province}', 'builder': 'national_province',
+                      'args': {'province': province}, 'inputs': inputs})
+
+    for ballot in BALLOT_CODES:
+        tasks.append({'path': f'turnout/{ballot}', 'builder': 'turnout', 'args': {'ballot': ballot},
+                      'inputs': cube_inputs})
+
+    for slug, (_, prefix) in TERRITORY_COMPARISONS.items():
+        inputs = sorted(dc.published_files(data_dir, output_dir))
+        inputs = [p for p in inputs if os.path.basename(p).startswith(prefix)]
+        tasks.append({'path': f'territory/{slug}', 'builder': 'territory', 'args': {'comparison': slug},
+                      'inputs': inputs})
+
+    for slug, (_, tables) in TABLE_PAGES.items():
+        tasks.append({'path': slug, 'builder': 'table_page', 'args': {'page': slug},
+                      'inputs': [os.path.join(output_dir, name) for _, name in tables]})
+
+    national_parties = bc.get_parties(cube, 'national', 2569, 'PARTY')
+    for party_id in national_parties.loc[national_parties['votes'] > 0, 'party_id'].dropna():
+        tasks.append({'path': f'parties/{int(party_id)}', 'builder': 'party', 'args': {'party_id': int(party_id)},
+                      'inputs': cube_inputs})
+    return tasks
+
+def task_fingerprint(task):
+    """Hashes the exporter version, the page arguments and the content of every input."""
+    h = hashlib.sha1()
+    h.update(f"{EXPORT_VERSION}:{task['builder']}:{json.dumps(task['args'], sort_keys=True)}".encode('utf-8'))
+    for path in task['inputs']:
+        digest = dc.file_digest(path) if os.path.exists(path) else 'missing'
+        h.update(f"{path}:{digest}".encode('utf-8'))
+    return h.hexdigest()
+
+def export_page(task):
+    """
+    Builds one page variant and writes index.html, index.json and its assets.
+    Runs inside a worker process.
+    """
+    title, sections, assets = BUILDERS[task['builder']](task['data_dir'], task['output_dir'], task['args'])
+    target = os.path.join(task['target_dir'], task['path'])
+    os.makedirs(target, exist_ok=True)
+
+    depth = task['path'].count('/') + 1
+    with open(os.path.join(target, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(render_html(title, sections, task['version'], depth))
+
+    payload = {'title': title, 'version': task['version'], 'sections': []}
+    for section in sections:
+        entry = {k: v for k, v in section.items() if k != 'table'}
+        if 'table' in section:
+            entry['table'] = json.loads(section['table'].to_json(orient='records', force_ascii=False))
+        payload['sections'].append(entry)
+    with open(os.path.join(target, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+
+    for name, content in assets.items():
+        with open(os.path.join(target, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+    return task['path']
+
+def write_site_index(target_dir, tasks, version):
+    """Top-level index.html linking every exported page, plus version.json."""
+    top_level = {}
+    for task in tasks:
+        top_level.setdefault(task['path'].split('/')[0], []).append(task['path'])
+    sections = []
+    for slug, paths in top_level.items():
+        links = [(p.split('/', 1)[-1] if '/' in p else PAGE_TITLES.get(slug, slug), f"{p}/index.html") for p in paths]
+        sections.append({'heading': PAGE_TITLES.get(slug, slug), 'links': links})
+    with open(os.path.join(target_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(render_html("Thailand Election 2569", sections, version, 0))
+    with open(os.path.join(target_dir, 'version.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': version}, f)
+
+def export_all(data_dir='data', output_dir='.', target_dir=OUTPUT_DIR, workers=None, force=False):
+    """
+    Exports every page variant to static HTML/JSON/SVG in a process pool.
+    A page is only rebuilt when its fingerprint (inputs' content digests)
+    changed since the last export, unless force is set.
+    Returns the list of exported page paths.
+    """
+    version = dc.data_version(dc.published_files(data_dir, output_dir))
+    tasks = plan_tasks(data_dir, output_dir)
+
+    manifest_path = os.path.join(target_dir, MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    pending = []
+    for task in tasks:
+        fingerprint = task_fingerprint(task)
+        task.update(fingerprint=fingerprint, data_dir=data_dir, output_dir=output_dir,
+                    target_dir=target_dir, version=fingerprint[:16])
+        if manifest.get(task['path']) == task['fingerprint'] and \
+                os.path.exists(os.path.join(target_dir, task['path'], 'index.html')):
+            continue
+        pending.append(task)
+
+    print(f"{len(pending)} of {len(tasks)} pages need exporting (data version {version})")
+    exported = []
+    if pending:
+        fingerprints = {t['path']: t['fingerprint'] for t in pending}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(export_page, t): t['path'] for t in pending}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    future.result()
+                    manifest[path] = fingerprints[path]
+                    exported.append(path)
+                except Exception as e:
+                    print(f"Error exporting {path}: {e}")
+
+    os.makedirs(target_dir, exist_ok=True)
+    write_site_index(target_dir, tasks, version)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    print(f"Exported {len(exported)} pages to {target_dir}")
+    return exported
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the dashboard pages as static HTML/JSON/SVG for CDN serving.")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="Re-export every page")
+    args = parser.parse_args()
+
+    export_all(data_dir=args.data_dir, target_dir=args.output_dir, workers=args.workers, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    import scripts.build_cube as bc
+    import scripts.data_cache as dc
+    import scripts.quantile_sketch as qs
+except ImportError:
+    import build_cube as bc
+    import data_cache as dc
+    import quantile_sketch as qs
+
+KEYS = ['level', 'key', 'year', 'ballot_code']
+TURNOUT_COLS = bc.MEASURES + ['turnout_rate', 'no_vote_rate']
+DISTRICT_INFO = ['region', 'province', 'district_label']
+
+def _changed_rows(old_df, new_df, keys, cols):
+    """Rows of new_df that are new or differ from old_df in any of cols."""
+    merged = new_df[keys + cols].merge(old_df[keys + cols], on=keys, how='left',
+                                       suffixes=('', '_old'), indicator=True)
+    changed = merged['_merge'] == 'left_only'
+    for col in cols:
+        a, b = merged[col], merged[f"{col}_old"]
+        changed |= ~((a == b) | (a.isna() & b.isna()))
+    return merged.loc[changed.values, keys + cols]
+
+def _records(df):
+    """JSON-safe list of dicts (NaN -> None)."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def compute_delta(old_cube, new_cube, old_version=None, new_version=None):
+    """
+    Compares two loaded cubes (see build_cube.load_cube).
+    Returns a dict with the changed district rows (turnout plus the current
+    leading party), the changed region/province/national KPI rows and the
+    changed national party totals.
+    """
+    turnout_changed = _changed_rows(old_cube['turnout'], new_cube['turnout'], KEYS, TURNOUT_COLS)
+
+    old_party = old_cube['party'][old_cube['party']['level'] == 'district']
+    new_party = new_cube['party'][new_cube['party']['level'] == 'district']
+    party_changed = _changed_rows(old_party, new_party, KEYS + ['party_id'], ['votes'])
+
+    district_keys = set(zip(turnout_changed.loc[turnout_changed['level'] == 'district', 'key'],
+                            turnout_changed.loc[turnout_changed['level'] == 'district', 'year'],
+                            turnout_changed.loc[turnout_changed['level'] == 'district', 'ballot_code']))
+    district_keys |= set(zip(party_changed['key'], party_changed['year'], party_changed['ballot_code']))
+
+    districts = []
+    for key, year, ballot_code in sorted(district_keys):
+        row = bc.get_kpis(new_cube, 'district', year, ballot_code, key) or {}
+        leader = bc.get_parties(new_cube, 'district', year, ballot_code, key, k=1)
+        districts.append({
+            'district_id': key,
+            'year': year,
+            'ballot_code': ballot_code,
+            **{c: row.get(c) for c in DISTRICT_INFO + TURNOUT_COLS},
+            'leader_party': leader['party_name'].iloc[0] if not leader.empty else None,
+            'leader_votes': leader['votes'].iloc[0] if not leader.empty else None,
+        })
+
+    national_parties = _changed_rows(
+        old_cube['party'][old_cube['party']['level'] == 'national'],
+        new_cube['party'][new_cube['party']['level'] == 'national'],
+        KEYS + ['party_id'], ['votes', 'vote_share'])
+
+    return {
+        'type': 'delta',
+        'from_version': old_version,
+        'version': new_version,
+        'published_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'kpis': _records(turnout_changed[turnout_changed['level'] != 'district']),
+        'districts': _records(pd.DataFrame(districts)) if districts else [],
+        'parties': _records(national_parties),
+    }
+
+class LiveFeed:
+    """
+    Watches the published files and, when the data version changes, loads
+    the new cube, computes a delta against the previous one and pushes it
+    to every subscriber queue. Keeps the last few deltas so a client that
+    knows its version can catch up without a full reload, and keeps the
+    district quantile sketches current from the changed districts only.
+    """
+
+    def __init__(self, data_dir='data', output_dir='.', interval=2.0, history=20):
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.interval = interval
+        self.version = None
+        self.cube = None
+        self.history = deque(maxlen=history)
+        self.sketches = qs.DistrictSketches()
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def poll(self):
+        """Checks the data version once. Returns the delta if it changed, else None."""
+        with self._lock:
+            version = dc.data_version(dc.published_files(self.data_dir, self.output_dir))
+            if version == self.version:
+                return None
+            cube = bc.load_cube(self.data_dir)
+            delta = None
+            if self.cube is not None:
+                delta = compute_delta(self.cube, cube, self.version, version)
+                self.history.append(delta)
+                changed = {(d['district_id'], d['year'], d['ballot_code']) for d in delta['districts']}
+                if changed:
+                    self.sketches.update(qs.district_metrics(cube, changed))
+            else:
+                self.sketches.update(qs.district_metrics(cube))
+            self.cube, self.version = cube, version
+            subscribers = list(self._subscribers)
+
+        if delta is not None:
+            for q in subscribers:
+                try:
+                    q.put_nowait(delta)
+                except queue.Full:
+                    # Slow client; it will resync from its version on reconnect
+                    pass
+        return delta
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Live feed poll failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Loads the current version and starts the background watcher."""
+        if self._thread is None:
+            self.poll()
+            self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self, maxsize=16):
+        """Returns a queue that receives every future delta."""
+        q = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def percentiles(self, metric, qs, threshold=None, **scope):
+        """
+        Sketch percentiles {q: value} of a district metric over a scope
+        (year, ballot_code, region or province); with a threshold, also the
+        approximate share of districts at or below it.
+        """
+        with self._lock:
+            result = {'percentiles': self.sketches.percentiles(metric, qs, **scope)}
+            if threshold is not None:
+                result['share_below'] = self.sketches.share_below(metric, threshold, **scope)
+            result['districts'] = len(self.sketches.sketch(metric, **scope))
+        return result
+
+    def deltas_since(self, version):
+        """
+        Deltas published after the given version, oldest first.
+        Returns None if the version is too old to be covered by the history.
+        """
+        if version == self.version:
+            return []
+        deltas = list(self.history)
+        for i, delta in enumerate(deltas):
+            if delta['from_version'] == version:
+                return deltas[i:]
+        return None
+
+def wait_for_delta(q, timeout):
+    """Blocks on a subscriber queue for up to timeout seconds (None on timeout)."""
+    try:
+        return q.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+def summarize_delta(deltas):
+    """Merges consecutive deltas into (changed_district_rows, national_kpi_rows)."""
+    districts = {}
+    national = {}
+    for delta in deltas:
+        for row in delta['districts']:
+            districts[(row['district_id'], row['year'], row['ballot_code'])] = row
+        for row in delta['kpis']:
+            if row['level'] == 'national':
+                national[(row['year'], row['ballot_code'])] = row
+    return list(districts.values()), list(national.values())
+
+if __name__ == "__main__":
+    feed = LiveFeed().start()
+    print(f"Watching data version {feed.version}")
+    sub = feed.subscribe()
+    try:
+        while True:
+            delta = wait_for_delta(sub, 60)
+            if delta:
+                print(f"{delta['published_at']} {delta['from_version']} -> {delta['version']}: "
+                      f"{len(delta['districts'])} districts, {len(delta['kpis'])} KPI rows changed")
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,428 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.ect_decoders import read_json
+    from scripts.snapshot_store import SnapshotStore, STORE_DIR
+except ImportError:
+    from ect_decoders import read_json
+    from snapshot_store import SnapshotStore, STORE_DIR
+
+WORKBOOK_2566 = os.path.join('data', 'คะแนนเลือกตั้ง2566.xlsx')
+OUTPUT_DIR = os.path.join('data', 'nowcast')
+
+# 2566 party-list columns -> 2569 party name (Move Forward became People's Party)
+PRIOR_PARTIES = {
+    'ก้าวไกล': 'ประชาชน',
+    'เพื่อไทย': 'เพื่อไทย',
+    'ประชาธิปัตย์': 'ประชาธิปัตย์',
+    'ภูมิใจไทย': 'ภูมิใจไทย',
+    'พลังประชารัฐ': 'พลังประชารัฐ',
+    'รวมไทยสร้างชาติ': 'รวมไทยสร้างชาติ',
+}
+OTHER = 'อื่นๆ'
+INVALID = 'บัตรเสีย'
+NO_VOTE = 'ไม่เลือกผู้ใด'
+# Shares are of voters_used, so the groups of a constituency sum to 1
+GROUPS = list(PRIOR_PARTIES.values()) + [OTHER, INVALID, NO_VOTE]
+
+# Model constants (shares and rates are fractions)
+PRIOR_SD_SHARE = 0.06     # error of the swing-adjusted 2566 share
+PRIOR_SD_TURNOUT = 0.05   # error of the swing-adjusted 2566 turnout rate
+HETERO_SD_SHARE = 0.03    # uncounted stations differ from counted ones
+HETERO_SD_TURNOUT = 0.03
+STATION_DEFF = 50.0       # design effect of counting whole stations, not voters
+Z = 1.96                  # 95% intervals
+# Re-estimate every constituency when the national swing moves more than this
+SWING_TOLERANCE = 0.002
+
+def load_prior_2566(path=WORKBOOK_2566):
+    """
+    Loads the 2566 party-list results by constituency as the prior.
+    Returns DataFrame indexed by key ('<province>_<district_number>') with
+    turnout_rate and one share column per group in GROUPS.
+    """
+    df = pd.read_excel(path, sheet_name='partylist_by_constituency_2566')
+    df['key'] = df['จังหวัด'] + "_" + df['เขต'].astype(str)
+    voters = df['ผู้มาใช้สิทธิ']
+    prior = pd.DataFrame({'key': df['key'], 'turnout_rate': voters / df['ผู้มีสิทธิ']})
+    for col_2566, party in PRIOR_PARTIES.items():
+        prior[party] = df[col_2566] / voters
+    prior[OTHER] = df['อื่นๆ'] / voters
+    prior[INVALID] = df['บัตรเสีย'] / voters
+    prior[NO_VOTE] = df['ไม่เลือกผู้ใด'] / voters
+    return prior.set_index('key')
+
+def load_constituency_info(raw_dir=os.path.join('data', 'raw')):
+    """
+    Returns DataFrame indexed by cons_id with: key, province, district_number,
+    registered, total_stations.
+    """
+    cons = pd.DataFrame(read_json(os.path.join(raw_dir, 'info_constituency.txt')))
+    prov = pd.DataFrame(read_json(os.path.join(raw_dir, 'info_province.txt'))['province'])
+    cons = cons.merge(prov[['prov_id', 'province']], on='prov_id', how='left')
+    cons = cons[cons['cons_no'] > 0]
+    info = pd.DataFrame({
+        'key': cons['province'] + "_" + cons['cons_no'].astype(str),
+        'province': cons['province'],
+        'district_number': cons['cons_no'],
+        'registered': cons['registered_vote'].astype(float),
+        'total_stations': cons['total_vote_stations'].astype(float),
+    })
+    info.index = cons['cons_id'].values
+    return info
+
+def party_groups(raw_dir=os.path.join('data', 'raw')):
+    """party_id -> group name (prior parties by name, everything else OTHER)."""
+    parties = read_json(os.path.join(raw_dir, 'info_party_overview.txt'))
+    known = set(PRIOR_PARTIES.values())
+    return {int(p['id']): (p['name'] if p['name'] in known else OTHER) for p in parties}
+
+def constituency_input(cons, info_row, groups):
+    """
+    Extracts the nowcast input from one stats_cons constituency object:
+    (counted fraction p, party-list voters_used, votes per group).
+    """
+    total = info_row['total_stations']
+    counted = cons.get('counted_vote_stations', cons.get('party_list_counted_vote_stations'))
+    if counted is not None and total > 0:
+        p = counted / total
+    else:
+        p = (cons.get('percent_count') or 0) / 100
+    votes = np.zeros(len(GROUPS))
+    index = {g: i for i, g in enumerate(GROUPS)}
+    for party in cons.get('result_party', []):
+        votes[index[groups.get(party['party_id'], OTHER)]] += party.get('party_list_vote') or 0
+    votes[index[INVALID]] = cons.get('party_list_invalid_votes') or 0
+    votes[index[NO_VOTE]] = cons.get('party_list_blank_votes') or 0
+    voters = cons.get('party_list_turn_out') or votes.sum()
+    return min(max(p, 0.0), 1.0), float(voters), votes
+
+def _combine(obs, var_obs, prior, var_prior):
+    """Precision-weighted combination; obs may be NaN (no information)."""
+    obs_ok = np.isfinite(obs) & np.isfinite(var_obs)
+    w_obs = np.where(obs_ok, 1 / np.where(obs_ok, var_obs, 1), 0.0)
+    w_prior = 1 / var_prior
+    mean = (w_obs * np.where(obs_ok, obs, 0) + w_prior * prior) / (w_obs + w_prior)
+    return mean, 1 / (w_obs + w_prior)
+
+class Nowcaster:
+    """
+    Projects each constituency's final party-list shares and turnout from
+    its partial count.
+
+    The counted part of a constituency is known; only the uncounted part is
+    estimated, as a precision-weighted mix of the shares counted so far and
+    a prior: its 2566 result shifted by the national swing among reporting
+    constituencies. So a late-reporting area leans on its 2566 pattern and
+    the interval shrinks to zero as the count reaches 100%.
+
+    State is kept per constituency and the national totals are running sums,
+    so update() costs time proportional to the changed constituencies. The
+    swing itself is a running sum too; when it drifts by more than
+    SWING_TOLERANCE every constituency is re-estimated once.
+    """
+
+    def __init__(self, info, prior, groups):
+        self.info = info
+        self.groups = groups
+        prior = prior.reindex(info['key'])
+        # Plain arrays by constituency position: row access stays cheap
+        self.position = {cons_id: i for i, cons_id in enumerate(info.index)}
+        self.registered = info['registered'].fillna(0).to_numpy(dtype=float)
+        self.prior_shares = prior[GROUPS].to_numpy(dtype=float)
+        self.prior_rate = prior['turnout_rate'].to_numpy(dtype=float)
+        self.has_prior = ~np.isnan(self.prior_rate)
+        self.inputs = {}
+        self.estimates = {}
+        n = len(GROUPS)
+        # Running sums over reporting constituencies for the swing
+        self._obs_votes = np.zeros(n)
+        self._prior_votes = np.zeros(n)
+        self._obs_voters = 0.0
+        self._counted_electorate = 0.0
+        self._prior_voters = 0.0
+        self._reset_totals()
+        self._swing_used = (np.zeros(n), 0.0)
+        self.stats = {'updates': 0, 'constituencies_estimated': 0, 'full_refreshes': 0}
+
+    # --- swing ---
+
+    def swing(self):
+        """(share swing per group, turnout swing) among reporting constituencies."""
+        if self._obs_voters <= 0:
+            return np.zeros(len(GROUPS)), 0.0
+        share_swing = (self._obs_votes - self._prior_votes) / self._obs_voters
+        turnout_swing = (self._obs_voters - self._prior_voters) / self._counted_electorate \
+            if self._counted_electorate > 0 else 0.0
+        return share_swing, turnout_swing
+
+    def _swing_terms(self, cons_id, inp, sign):
+        """Adds (sign=1) or removes (sign=-1) a constituency from the swing sums."""
+        i = self.position[cons_id]
+        if not self.has_prior[i] or inp is None:
+            return
+        p, voters, votes = inp
+        electorate = self.registered[i] * p
+        self._obs_votes += sign * votes
+        self._prior_votes += sign * self.prior_shares[i] * voters
+        self._obs_voters += sign * voters
+        self._counted_electorate += sign * electorate
+        self._prior_voters += sign * self.prior_rate[i] * electorate
+
+    # --- per constituency ---
+
+    def _estimate(self, cons_id):
+        i = self.position[cons_id]
+        registered = self.registered[i]
+        p, voters, votes = self.inputs.get(cons_id, (0.0, 0.0, np.zeros(len(GROUPS))))
+        share_swing, turnout_swing = self._swing_used
+
+        if self.has_prior[i]:
+            prior_shares = np.clip(self.prior_shares[i] + share_swing, 0, None)
+            prior_rate = min(max(self.prior_rate[i] + turnout_swing, 0.0), 1.0)
+        else:
+            # No 2566 match: fall back to the national picture so far
+            prior_shares = self._obs_votes / self._obs_voters if self._obs_voters > 0 else np.full(len(GROUPS), 1 / len(GROUPS))
+            prior_rate = self._obs_voters / self._counted_electorate if self._counted_electorate > 0 else 0.7
+        prior_shares = prior_shares / prior_shares.sum()
+
+        electorate_counted = registered * p
+        electorate_rest = registered * (1 - p)
+
+        # Turnout of the uncounted electorate
+        if electorate_counted > 0 and voters > 0:
+            rate_obs = min(voters / electorate_counted, 1.0)
+            var_rate_obs = rate_obs * (1 - rate_obs) * STATION_DEFF / electorate_counted + HETERO_SD_TURNOUT ** 2
+        else:
+            rate_obs, var_rate_obs = np.nan, np.nan
+        rate_rest, var_rate = _combine(rate_obs, var_rate_obs, prior_rate, PRIOR_SD_TURNOUT ** 2)
+        voters_rest = float(rate_rest) * electorate_rest
+        var_voters_rest = float(var_rate) * electorate_rest ** 2
+
+        # Shares of the uncounted ballots
+        if voters > 0:
+            shares_obs = votes / voters
+            var_obs = shares_obs * (1 - shares_obs) * STATION_DEFF / voters + HETERO_SD_SHARE ** 2
+        else:
+            shares_obs = np.full(len(GROUPS), np.nan)
+            var_obs = np.full(len(GROUPS), np.nan)
+        shares_rest, var_shares = _combine(shares_obs, var_obs, prior_shares, PRIOR_SD_SHARE ** 2)
+        shares_rest = shares_rest / shares_rest.sum()
+
+        final_votes = votes + shares_rest * voters_rest
+        var_votes = voters_rest ** 2 * var_shares + shares_rest ** 2 * var_voters_rest
+        final_voters = voters + voters_rest
+        return {
+            'p': p,
+            'votes': final_votes,
+            'var_votes': var_votes,
+            'voters': final_voters,
+            'var_voters': var_voters_rest,
+        }
+
+    def _reset_totals(self):
+        """Running national totals of projected votes and their variances."""
+        n = len(GROUPS)
+        self._proj_votes = np.zeros(n)
+        self._proj_var = np.zeros(n)
+        self._proj_voters = 0.0
+        self._proj_voters_var = 0.0
+
+    def _apply(self, cons_id, estimate, sign):
+        self._proj_votes += sign * estimate['votes']
+        self._proj_var += sign * estimate['var_votes']
+        self._proj_voters += sign * estimate['voters']
+        self._proj_voters_var += sign * estimate['var_voters']
+
+    def _reestimate_all(self):
+        """Re-estimates every constituency, summing the totals afresh."""
+        self._reset_totals()
+        self.estimates = {}
+        self._reestimate(list(self.info.index))
+
+    def _reestimate(self, cons_ids):
+        for cons_id in cons_ids:
+            old = self.estimates.get(cons_id)
+            if old is not None:
+                self._apply(cons_id, old, -1)
+            new = self._estimate(cons_id)
+            self._apply(cons_id, new, 1)
+            self.estimates[cons_id] = new
+        self.stats['constituencies_estimated'] += len(cons_ids)
+
+    def update(self, inputs):
+        """
+        Applies new inputs {cons_id: (p, voters_used, votes per group)} for
+        the constituencies that changed. Returns the number re-estimated.
+        """
+        changed = []
+        for cons_id, inp in inputs.items():
+            if cons_id not in self.position:
+                continue
+            old = self.inputs.get(cons_id)
+            if old is not None and old[0] == inp[0] and old[1] == inp[1] and np.array_equal(old[2], inp[2]):
+                continue
+            self._swing_terms(cons_id, old, -1)
+            self.inputs[cons_id] = inp
+            self._swing_terms(cons_id, inp, 1)
+            changed.append(cons_id)
+
+        if not self.estimates:
+            # First call: every constituency needs an estimate, reported or not
+            self._swing_used = self.swing()
+            self._reestimate_all()
+        else:
+            share_swing, turnout_swing = self.swing()
+            drift = max(np.abs(share_swing - self._swing_used[0]).max(), abs(turnout_swing - self._swing_used[1]))
+            if drift > SWING_TOLERANCE:
+                self._swing_used = (share_swing, turnout_swing)
+                self._reestimate_all()
+                self.stats['full_refreshes'] += 1
+            else:
+                self._reestimate(changed)
+        self.stats['updates'] += 1
+        return len(changed)
+
+    # --- results ---
+
+    def constituencies(self):
+        """
+        Projected final results per constituency.
+        Returns DataFrame with: cons_id, key, percent_count, projected_turnout_rate,
+        and <group>_share / _lo / _hi for every group.
+        """
+        rows = []
+        for cons_id, est in self.estimates.items():
+            registered = self.registered[self.position[cons_id]]
+            row = {
+                'cons_id': cons_id,
+                'key': self.info.at[cons_id, 'key'],
+                'percent_count': est['p'] * 100,
+                'projected_voters': est['voters'],
+                'projected_turnout_rate': est['voters'] / registered if registered else np.nan,
+            }
+            sd = np.sqrt(est['var_votes'])
+            for g, v, s in zip(GROUPS, est['votes'], sd):
+                share = v / est['voters'] if est['voters'] else np.nan
+                row[f"{g}_share"] = share
+                row[f"{g}_lo"] = max(0.0, (v - Z * s) / est['voters']) if est['voters'] else np.nan
+                row[f"{g}_hi"] = min(1.0, (v + Z * s) / est['voters']) if est['voters'] else np.nan
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def national(self):
+        """
+        Projected national party-list votes and shares with intervals
+        (constituency errors treated as independent).
+        Returns DataFrame with: group, projected_votes, votes_lo, votes_hi, share, share_lo, share_hi
+        """
+        # Subtracting replaced estimates leaves rounding error in the running
+        # sums, which can dip below zero once the remaining variance is ~0
+        sd = np.sqrt(np.maximum(self._proj_var, 0))
+        voters = self._proj_voters
+        df = pd.DataFrame({
+            'group': GROUPS,
+            'projected_votes': self._proj_votes,
+            'votes_lo': np.maximum(self._proj_votes - Z * sd, 0),
+            'votes_hi': self._proj_votes + Z * sd,
+        })
+        df['share'] = df['projected_votes'] / voters
+        df['share_lo'] = df['votes_lo'] / voters
+        df['share_hi'] = df['votes_hi'] / voters
+        return df
+
+    def turnout(self):
+        """Projected national turnout (voters, rate, 95% interval of the rate)."""
+        registered = self.registered.sum()
+        sd = np.sqrt(max(self._proj_voters_var, 0.0))
+        return {
+            'projected_voters': self._proj_voters,
+            'turnout_rate': self._proj_voters / registered,
+            'turnout_lo': (self._proj_voters - Z * sd) / registered,
+            'turnout_hi': (self._proj_voters + Z * sd) / registered,
+            'percent_counted_voters': self._obs_voters_total() / self._proj_voters * 100 if self._proj_voters else 0.0,
+        }
+
+    def _obs_voters_total(self):
+        return sum(inp[1] for inp in self.inputs.values())
+
+    def publish(self, output_dir=OUTPUT_DIR, meta=None):
+        """Writes nowcast_national.csv, nowcast_constituency.csv and nowcast_meta.json."""
+        os.makedirs(output_dir, exist_ok=True)
+        self.national().to_csv(os.path.join(output_dir, 'nowcast_national.csv'), index=False, encoding='utf-8-sig')
+        self.constituencies().to_csv(os.path.join(output_dir, 'nowcast_constituency.csv'), index=False, encoding='utf-8-sig')
+        payload = {'turnout': self.turnout(), 'stats': self.stats, **(meta or {})}
+        with open(os.path.join(output_dir, 'nowcast_meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=1, default=float)
+
+def inputs_from_units(units, info, groups):
+    """{'cons:<id>': stats_cons constituency object} -> Nowcaster inputs."""
+    inputs = {}
+    for unit, cons in units.items():
+        cons_id = unit.split(':', 1)[1]
+        if cons_id in info.index:
+            inputs[cons_id] = constituency_input(cons, info.loc[cons_id], groups)
+    return inputs
+
+def nowcast_store(store, nowcaster, source='stats_cons', verbose=True):
+    """
+    Replays the snapshot history through a Nowcaster. Each snapshot only
+    passes the constituencies whose block changed (manifest diff).
+    Returns the last snapshot row processed, or None.
+    """
+    snapshots = store.snapshots()
+    column = f"{source}.manifest"
+    if snapshots.empty or column not in snapshots.columns:
+        return None
+    previous = {}
+    last = None
+    for _, snap in snapshots[snapshots[column].notna()].iterrows():
+        manifest = store.get_block(snap[column])
+        changed = {u: store.get_block(h) for u, h in manifest.items()
+                   if u.startswith('cons:') and previous.get(u) != h}
+        start = time.perf_counter()
+        n = nowcaster.update(inputs_from_units(changed, nowcaster.info, nowcaster.groups))
+        if verbose:
+            print(f"Snapshot {snap['seq']}: {n} constituencies changed, "
+                  f"updated in {(time.perf_counter() - start) * 1000:.1f} ms")
+        previous = manifest
+        last = snap
+    return last
+
+def main():
+    parser = argparse.ArgumentParser(description="Nowcast final party-list shares and turnout from partial counts.")
+    parser.add_argument('--store', default=STORE_DIR, help="Snapshot store to replay")
+    parser.add_argument('--raw-dir', default=os.path.join('data', 'raw'))
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    print("Loading constituency info and 2566 prior...")
+    info = load_constituency_info(args.raw_dir)
+    nowcaster = Nowcaster(info, load_prior_2566(), party_groups(args.raw_dir))
+
+    last = nowcast_store(SnapshotStore(args.store), nowcaster)
+    meta = {}
+    if last is not None:
+        meta = {'snapshot_seq': int(last['seq']), 'taken_at': str(last['taken_at'])}
+    else:
+        path = os.path.join(args.raw_dir, 'stats_cons.txt')
+        if not os.path.exists(path):
+            print(f"No snapshots in {args.store} and no {path}; nothing to nowcast")
+            return
+        doc = read_json(path)
+        units = {f"cons:{c['cons_id']}": c for p in doc['result_province'] for c in p['constituencies']}
+        nowcaster.update(inputs_from_units(units, info, nowcaster.groups))
+        meta = {'taken_at': doc.get('last_update')}
+
+    nowcaster.publish(args.output_dir, meta)
+    print(nowcaster.national().to_string(index=False))
+    print(f"Nowcast written to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import argparse
+import glob
+import json
+import os
+import re
+import struct
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+SVG_DIR = 'data/ECT Constituencies/{year}/Province_constituencies_SVG'
+SHAPEFILE_DIR = 'data/ECT Constituencies/{year}/Province_constituencies_ShapeFile'
+OUTPUT_DIR = 'data/svg_min'
+INDEX_NAME = 'index.json'
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+NUMBER_RE = re.compile(r'-?\d*\.?\d+(?:[eE][-+]?\d+)?')
+SUBPATH_RE = re.compile(r'[Mm][^Mm]*')
+PATH_RE = re.compile(r'<path id="c(\d+)"( d="[^"]*")/>')
+
+def read_dbf_records(path, encoding='utf-8'):
+    """
+    Reads the attribute rows of a .dbf file with the standard library only,
+    so the SVG stage does not need geopandas.
+    Returns a list of dicts, in file order.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    n_records, header_len, record_len = struct.unpack('<IHH', data[4:12])
+
+    fields = []
+    pos = 32
+    while data[pos] != 0x0D:
+        name = data[pos:pos + 11].split(b'\x00')[0].decode('ascii')
+        ftype = chr(data[pos + 11])
+        flen = data[pos + 16]
+        fields.append((name, ftype, flen))
+        pos += 32
+
+    records = []
+    for i in range(n_records):
+        start = header_len + i * record_len
+        rec = data[start:start + record_len]
+        if rec[:1] == b'*':  # deleted
+            continue
+        row = {}
+        offset = 1
+        for name, ftype, flen in fields:
+            raw = rec[offset:offset + flen].decode(encoding, errors='replace').strip()
+            offset += flen
+            if ftype in ('N', 'F'):
+                row[name] = float(raw) if '.' in raw else (int(raw) if raw else None)
+            else:
+                row[name] = raw
+        records.append(row)
+    return records
+
+def simplify_ring(points, tolerance):
+    """
+    Douglas-Peucker simplification of one ring (N x 2 array).
+    Iterative, with the point-to-segment distances computed per segment in numpy.
+    """
+    n = len(points)
+    if n <= 4:
+        return points
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = points[end] - points[start]
+        rel = points[start + 1:end] - points[start]
+        seg_len = np.hypot(seg[0], seg[1])
+        if seg_len == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        idx = int(np.argmax(dist))
+        if dist[idx] > tolerance:
+            mid = start + 1 + idx
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    simplified = points[keep]
+    # Keep rings closable
+    if len(simplified) < 4:
+        return points
+    return simplified
+
+def minify_path(d, tolerance=0.5, precision=1):
+    """
+    Simplifies and minifies an SVG path made of 'M x y x y ... Z' rings.
+    Output uses one absolute moveto per ring followed by relative linetos,
+    rounded to the given number of decimals.
+    """
+    scale = 10 ** precision
+    parts = []
+    for sub in SUBPATH_RE.findall(d):
+        nums = np.array([float(x) for x in NUMBER_RE.findall(sub)])
+        if len(nums) < 4:
+            continue
+        pts = nums[:len(nums) // 2 * 2].reshape(-1, 2)
+        pts = simplify_ring(pts, tolerance)
+        # Integer grid so the relative deltas add up exactly
+        grid = np.round(pts * scale).astype(np.int64)
+        keep = np.ones(len(grid), dtype=bool)
+        keep[1:] = np.any(grid[1:] != grid[:-1], axis=1)
+        grid = grid[keep]
+        if len(grid) < 3:
+            continue
+        deltas = np.diff(grid, axis=0)
+        ring = f"M{_fmt(grid[0][0], precision)} {_fmt(grid[0][1], precision)}"
+        ring += 'l' + ' '.join(f"{_fmt(dx, precision)} {_fmt(dy, precision)}" for dx, dy in deltas)
+        parts.append(ring + 'z')
+    return ''.join(parts)
+
+def _fmt(value, precision):
+    """Formats a scaled integer coordinate with as few characters as possible."""
+    if precision == 0:
+        return str(int(value))
+    s = f"{value / 10 ** precision:.{precision}f}".rstrip('0').rstrip('.')
+    if s.startswith('0.'):
+        s = s[1:]
+    elif s.startswith('-0.'):
+        s = '-' + s[2:]
+    return s if s not in ('', '-') else '0'
+
+def path_bbox(d):
+    """Returns (xmin, ymin, xmax, ymax) for a minified path."""
+    xs, ys = [], []
+    for sub in SUBPATH_RE.findall(d):
+        body = sub[1:].rstrip('z')
+        head, _, rel = body.partition('l')
+        x, y = (float(v) for v in NUMBER_RE.findall(head)[:2])
+        deltas = np.array([float(v) for v in NUMBER_RE.findall(rel)]).reshape(-1, 2)
+        pts = np.vstack([[x, y], np.array([x, y]) + np.cumsum(deltas, axis=0)]) if len(deltas) else np.array([[x, y]])
+        xs.append(pts[:, 0])
+        ys.append(pts[:, 1])
+    xs, ys = np.concatenate(xs), np.concatenate(ys)
+    return xs.min(), ys.min(), xs.max(), ys.max()
+
+def preprocess_province(svg_path, dbf_path=None, tolerance=0.5, precision=1):
+    """
+    Parses one province SVG once and returns the minified SVG text together
+    with its constituency-number -> path-id index.
+    Paths in the ECT SVGs carry no ids; they are in the same order as the rows
+    of the province shapefile, so CONS_no is taken from the matching .dbf.
+    """
+    root = ET.parse(svg_path).getroot()
+    paths = [p.get('d', '') for p in root.iter(f'{SVG_NS}path')]
+
+    cons_numbers = None
+    if dbf_path and os.path.exists(dbf_path):
+        records = read_dbf_records(dbf_path)
+        if len(records) == len(paths):
+            cons_numbers = [int(r['CONS_no']) for r in records]
+        else:
+            print(f"Warning: {os.path.basename(svg_path)} has {len(paths)} paths but {len(records)} shapefile rows")
+    if cons_numbers is None:
+        # No attribute table to go by; fall back to document order
+        cons_numbers = list(range(1, len(paths) + 1))
+
+    minified = [(no, minify_path(d, tolerance, precision)) for no, d in zip(cons_numbers, paths)]
+    minified = [(no, d) for no, d in minified if d]
+
+    boxes = np.array([path_bbox(d) for _, d in minified])
+    pad = 4
+    xmin, ymin = boxes[:, 0].min() - pad, boxes[:, 1].min() - pad
+    width, height = boxes[:, 2].max() - xmin + pad, boxes[:, 3].max() - ymin + pad
+    view_box = f"{xmin:.0f} {ymin:.0f} {width:.0f} {height:.0f}"
+
+    body = ''.join(f'<path id="c{no}" d="{d}"/>' for no, d in sorted(minified))
+    svg = (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{view_box}" '
+           f'stroke="#fff" stroke-width="1" stroke-linejoin="round" fill="#ddd">{body}</svg>')
+    index = {str(no): f"c{no}" for no, _ in sorted(minified)}
+    return svg, index, view_box
+
+def preprocess_year(year=2569, output_dir=OUTPUT_DIR, tolerance=0.5, precision=1, force=False):
+    """
+    Preprocesses every province SVG of a year into output_dir/<year>/ and
+    writes index.json with, per province, the path index, viewBox and sizes.
+    Provinces whose source SVG is older than the cached copy are skipped.
+    """
+    target_dir = os.path.join(output_dir, str(year))
+    os.makedirs(target_dir, exist_ok=True)
+    index_path = os.path.join(target_dir, INDEX_NAME)
+    index = {}
+    if os.path.exists(index_path) and not force:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+    dbf_dir = SHAPEFILE_DIR.format(year=year)
+    svg_files = sorted(glob.glob(os.path.join(SVG_DIR.format(year=year), '*.svg')))
+    total_in = total_out = 0
+    for svg_path in svg_files:
+        province = os.path.splitext(os.path.basename(svg_path))[0].replace('P_name_', '')
+        out_path = os.path.join(target_dir, f"{province}.svg")
+        src_size = os.path.getsize(svg_path)
+        total_in += src_size
+
+        if (not force and province in index and os.path.exists(out_path)
+                and os.path.getmtime(out_path) >= os.path.getmtime(svg_path)):
+            total_out += os.path.getsize(out_path)
+            continue
+
+        dbf_candidates = glob.glob(os.path.join(dbf_dir, f"*{province}.dbf"))
+        dbf_path = next((p for p in dbf_candidates
+                         if os.path.basename(p).replace('P_name_', '') == f"{province}.dbf"), None)
+        try:
+            svg, path_index, view_box = preprocess_province(svg_path, dbf_path, tolerance, precision)
+        except Exception as e:
+            print(f"Error preprocessing {province}: {e}")
+            continue
+
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write(svg)
+        out_size = len(svg.encode('utf-8'))
+        total_out += out_size
+        index[province] = {
+            'paths': path_index,
+            'viewBox': view_box,
+            'source_bytes': src_size,
+            'bytes': out_size,
+        }
+
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    print(f"{year}: {len(svg_files)} SVGs, {total_in / 1e6:.1f} MB -> {total_out / 1e6:.2f} MB in {target_dir}")
+    return index
+
+def load_svg_index(year=2569, output_dir=OUTPUT_DIR):
+    """Loads index.json for a preprocessed year (empty dict if not built yet)."""
+    index_path = os.path.join(output_dir, str(year), INDEX_NAME)
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_province_svg(province, year=2569, output_dir=OUTPUT_DIR):
+    """Returns the cached, minified SVG text for a province (None if missing)."""
+    path = os.path.join(output_dir, str(year), f"{province}.svg")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def recolor_svg(svg, fills, titles=None):
+    """
+    Recolours a cached province SVG.
+    fills: dict of constituency number -> CSS colour. Paths not in fills keep
+    the default grey. titles (optional) adds a hover tooltip per constituency.
+    Only the path tags are rewritten; the path data is reused as-is.
+    """
+    titles = titles or {}
+
+    def _sub(match):
+        no = int(match.group(1))
+        fill = f' fill="{fills[no]}"' if no in fills else ''
+        if no in titles:
+            return f'<path id="c{no}"{fill}{match.group(2)}><title>{titles[no]}</title></path>'
+        return f'<path id="c{no}"{fill}{match.group(2)}/>'
+
+    return PATH_RE.sub(_sub, svg)
+
+def color_scale(values, colors=('#f7fbff', '#08306b'), vmin=None, vmax=None):
+    """
+    Maps a dict of constituency number -> value onto a two-colour linear
+    gradient. Returns a dict of constituency number -> hex colour.
+    """
+    if not values:
+        return {}
+    arr = np.array(list(values.values()), dtype=float)
+    lo = np.nanmin(arr) if vmin is None else vmin
+    hi = np.nanmax(arr) if vmax is None else vmax
+    span = hi - lo if hi > lo else 1.0
+    c0 = np.array([int(colors[0][i:i + 2], 16) for i in (1, 3, 5)])
+    c1 = np.array([int(colors[1][i:i + 2], 16) for i in (1, 3, 5)])
+    out = {}
+    for key, value in values.items():
+        if value is None or np.isnan(value):
+            continue
+        t = min(max((value - lo) / span, 0.0), 1.0)
+        rgb = np.round(c0 + (c1 - c0) * t).astype(int)
+        out[key] = '#%02x%02x%02x' % tuple(rgb)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description="Simplify and minify the province constituency SVGs.")
+    parser.add_argument('--year', type=int, nargs='*', default=[2569, 2566])
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Simplification tolerance in SVG units")
+    parser.add_argument('--precision', type=int, default=1, help="Decimals kept in coordinates")
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+
+    for year in args.year:
+        preprocess_year(year, tolerance=args.tolerance, precision=args.precision, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import scripts.build_cube as bc
+except ImportError:
+    import build_cube as bc
+
+# Items kept by the top compactor; the rank error is roughly 1.7 / SKETCH_K
+SKETCH_K = 200
+# Capacity ratio between a compactor and the one above it
+DECAY = 2 / 3
+MIN_CAPACITY = 2
+
+METRICS = ['enc', 'winner_share', 'turnout_rate', 'no_vote_rate']
+
+class KLLSketch:
+    """
+    KLL quantile sketch: a stack of compactors where level h holds items of
+    weight 2**h. A full compactor sorts its items and promotes every other
+    one (random offset) to the next level, so memory stays O(k) however
+    many values are added, and two sketches merge by concatenating levels.
+    Deletion is not supported; DistrictSketches rebuilds a leaf instead.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=None):
+        self.k = k
+        self.levels = [[]]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = random.Random(seed)
+        self._sorted = None
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(MIN_CAPACITY, int(np.ceil(self.k * DECAY ** depth)))
+
+    def update(self, value):
+        if value is None or value != value:
+            return self
+        self.levels[0].append(float(value))
+        self.n += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self._sorted = None
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+        return self
+
+    def update_many(self, values):
+        for v in values:
+            self.update(v)
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items = sorted(self.levels[level])
+                offset = self._rng.randint(0, 1)
+                # An odd item out stays behind at this level
+                keep = [items.pop()] if len(items) % 2 else []
+                self.levels[level + 1].extend(items[offset::2])
+                self.levels[level] = keep
+            level += 1
+
+    def merge(self, other):
+        """Adds another sketch into this one (in place) and returns self."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._sorted = None
+        self._compress()
+        return self
+
+    def _weighted(self):
+        """(sorted values, cumulative weights) over all retained items."""
+        if self._sorted is None:
+            values = np.concatenate([np.asarray(items, dtype=float) for items in self.levels])
+            weights = np.concatenate([np.full(len(items), 2 ** h, dtype=np.int64)
+                                      for h, items in enumerate(self.levels)])
+            order = np.argsort(values, kind='stable')
+            self._sorted = (values[order], np.cumsum(weights[order]))
+        return self._sorted
+
+    def quantile(self, q):
+        """Approximate value at quantile q in [0, 1] (NaN if empty)."""
+        if self.n == 0:
+            return np.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        values, cum = self._weighted()
+        i = int(np.searchsorted(cum, q * cum[-1], side='left'))
+        return float(values[min(i, len(values) - 1)])
+
+    def quantiles(self, qs):
+        return [self.quantile(q) for q in qs]
+
+    def rank(self, value):
+        """Approximate fraction of values <= value."""
+        if self.n == 0:
+            return np.nan
+        values, cum = self._weighted()
+        i = int(np.searchsorted(values, value, side='right'))
+        return float(cum[i - 1] / cum[-1]) if i else 0.0
+
+    def __len__(self):
+        return self.n
+
+    def retained(self):
+        return sum(len(items) for items in self.levels)
+
+def district_metrics(cube, keys=None):
+    """
+    Per-district concentration and participation metrics from a loaded cube.
+    enc is 1 / sum of squared vote proportions (over party votes, as in
+    analyze_concentration) and winner_share the leading vote_share.
+    keys restricts the result to a set of (district_id, year, ballot_code).
+    Returns DataFrame with: district_id, year, ballot_code, region, province + METRICS
+    """
+    turnout = cube['turnout']
+    turnout = turnout[turnout['level'] == 'district']
+    party = cube['party']
+    party = party[party['level'] == 'district']
+    if keys is not None:
+        keys = set(keys)
+        turnout = turnout[[k in keys for k in zip(turnout['key'], turnout['year'], turnout['ballot_code'])]]
+        party = party[[k in keys for k in zip(party['key'], party['year'], party['ballot_code'])]]
+
+    grouped = party.assign(votes_sq=party['votes'].astype(float) ** 2).groupby(['key', 'year', 'ballot_code'])
+    conc = pd.DataFrame({
+        'votes': grouped['votes'].sum(),
+        'votes_sq': grouped['votes_sq'].sum(),
+        'winner_share': grouped['vote_share'].max(),
+    })
+    conc['enc'] = np.where(conc['votes_sq'] > 0, conc['votes'].astype(float) ** 2 / conc['votes_sq'].where(conc['votes_sq'] > 0, 1), np.nan)
+    conc = conc.reset_index()
+
+    df = turnout[['key', 'year', 'ballot_code', 'region', 'province', 'turnout_rate', 'no_vote_rate']].merge(
+        conc[['key', 'year', 'ballot_code', 'enc', 'winner_share']], on=['key', 'year', 'ballot_code'], how='left')
+    df = df.rename(columns={'key': 'district_id'})
+    return df[['district_id', 'year', 'ballot_code', 'region', 'province'] + METRICS]
+
+class DistrictSketches:
+    """
+    One KLL sketch per (metric, year, ballot_code, province), merged on
+    demand into region and national rollups.
+
+    A changed district only marks its province leaf dirty; the leaf is
+    rebuilt from that province's current values (a few dozen at most) the
+    next time a query touches it, and rollups are cached until one of their
+    leaves changes. Queries therefore never scan the district table.
+    """
+
+    def __init__(self, k=SKETCH_K):
+        self.k = k
+        self.values = {}        # (year, ballot_code, province) -> {district_id: {metric: value}}
+        self.region_of = {}     # province -> region
+        self._leaves = {}       # (metric, year, ballot_code, province) -> KLLSketch
+        self._rollups = {}      # (metric, year, ballot_code, region or None) -> KLLSketch
+        self._dirty = set()     # (year, ballot_code, province)
+
+    def update(self, metrics):
+        """Applies rows of district_metrics(); returns the number of districts changed."""
+        changed = 0
+        for row in metrics.to_dict('records'):
+            leaf = (row['year'], row['ballot_code'], row['province'])
+            self.region_of[row['province']] = row['region']
+            values = {m: (None if pd.isna(row[m]) else row[m]) for m in METRICS}
+            districts = self.values.setdefault(leaf, {})
+            if districts.get(row['district_id']) != values:
+                districts[row['district_id']] = values
+                self._dirty.add(leaf)
+                changed += 1
+        return changed
+
+    def _refresh(self):
+        if not self._dirty:
+            return
+        for year, ballot_code, province in self._dirty:
+            districts = self.values[(year, ballot_code, province)].values()
+            for metric in METRICS:
+                sketch = KLLSketch(self.k, seed=0)
+                sketch.update_many(d[metric] for d in districts)
+                self._leaves[(metric, year, ballot_code, province)] = sketch
+            region = self.region_of[province]
+            for metric in METRICS:
+                self._rollups.pop((metric, year, ballot_code, region), None)
+                self._rollups.pop((metric, year, ballot_code, None), None)
+        self._dirty.clear()
+
+    def sketch(self, metric, year=2569, ballot_code='CONS', region=None, province=None):
+        """The sketch of a province, a region or (neither given) the whole country."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}' (expected one of {METRICS})")
+        self._refresh()
+        if province is not None:
+            return self._leaves.get((metric, year, ballot_code, province), KLLSketch(self.k))
+        key = (metric, year, ballot_code, region)
+        if key not in self._rollups:
+            merged = KLLSketch(self.k, seed=0)
+            for (m, y, b, p), leaf in sorted(self._leaves.items(), key=lambda kv: kv[0]):
+                if (m, y, b) == (metric, year, ballot_code) and (region is None or self.region_of.get(p) == region):
+                    merged.merge(leaf)
+            self._rollups[key] = merged
+        return self._rollups[key]
+
+    def percentiles(self, metric, qs=(0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95), **scope):
+        """{q: value} for one metric over a scope (year, ballot_code, region, province)."""
+        sketch = self.sketch(metric, **scope)
+        return {q: sketch.quantile(q) for q in qs}
+
+    def share_below(self, metric, threshold, **scope):
+        """Approximate fraction of districts with metric <= threshold."""
+        return self.sketch(metric, **scope).rank(threshold)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare KLL sketch percentiles with exact district percentiles.")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--year', type=int, default=2569)
+    parser.add_argument('--ballot', default='CONS')
+    args = parser.parse_args()
+
+    cube = bc.load_cube(args.data_dir)
+    metrics = district_metrics(cube)
+    sketches = DistrictSketches()
+    start = time.perf_counter()
+    sketches.update(metrics)
+    sketches.sketch('enc', args.year, args.ballot)
+    print(f"Built sketches for {len(metrics)} district rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    subset = metrics[(metrics['year'] == args.year) & (metrics['ballot_code'] == args.ballot)]
+    qs = [0.05, 0.1, 0.25, 0.5, 0.75, 0.9]
+    rows = []
+    for metric in METRICS:
+        exact = subset[metric].quantile(qs, interpolation='lower')
+        approx = sketches.percentiles(metric, qs, year=args.year, ballot_code=args.ballot)
+        for q in qs:
+            rows.append({'metric': metric, 'q': q, 'exact': exact[q], 'sketch': approx[q]})
+    print(pd.DataFrame(rows).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
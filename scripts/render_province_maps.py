@@ -0,0 +1,225 @@
+import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+try:
+    from scripts.data_cache import read_csv_with_encoding
+except ImportError:
+    from data_cache import read_csv_with_encoding
+
+SHAPEFILE_DIR = 'data/ECT Constituencies/{year}/Province_constituencies_ShapeFile'
+OUTPUT_DIR = 'static/maps'
+MANIFEST_NAME = 'manifest.json'
+
+# Metrics available on m_turnout_master (one row per district and ballot)
+TURNOUT_METRICS = ['turnout_rate', 'eligible_voters', 'voters_used', 'valid_votes', 'invalid_votes', 'no_vote']
+# Metrics available on m_votes_master (one row per district, ballot and party)
+VOTE_METRICS = ['vote_share', 'votes']
+
+def list_province_layers(year=2569):
+    """
+    Lists the per-province constituency shapefiles for a year.
+    2569 files are named '<province>.shp', 2566 files 'P_name_<province>.shp'.
+    Returns a dict of province -> shapefile path.
+    """
+    layers = {}
+    for path in sorted(glob.glob(os.path.join(SHAPEFILE_DIR.format(year=year), '*.shp'))):
+        province = os.path.splitext(os.path.basename(path))[0].replace('P_name_', '')
+        layers[province] = path
+    return layers
+
+def load_district_metric(metric='turnout_rate', ballot_code='CONS', party_id=None, year=2569, data_dir='data'):
+    """
+    Loads one metric per district from the master tables.
+    Turnout metrics come from m_turnout_master, vote metrics from m_votes_master
+    and require a party_id.
+    Returns DataFrame with: province, district_number, value
+    """
+    if metric in TURNOUT_METRICS:
+        df = read_csv_with_encoding(os.path.join(data_dir, 'm_turnout_master.csv'))
+        df = df[(df['year'] == year) & (df['ballot_code'] == ballot_code)]
+    elif metric in VOTE_METRICS:
+        if party_id is None:
+            raise ValueError(f"Metric '{metric}' needs a party_id")
+        df = read_csv_with_encoding(os.path.join(data_dir, 'm_votes_master.csv'))
+        df = df[(df['year'] == year) & (df['ballot_code'] == ballot_code) & (df['party_id'] == party_id)]
+        # A party has at most one candidate per district, but sum to be safe
+        df = df.groupby(['province', 'district_number'], as_index=False)[metric].sum()
+    else:
+        raise ValueError(f"Unknown metric '{metric}'")
+
+    df = df.rename(columns={metric: 'value'})
+    return df[['province', 'district_number', 'value']]
+
+def nice_bounds(values):
+    """
+    Rounds the colour scale outward to two significant digits so that small
+    data refreshes do not move the scale (and invalidate every province map).
+    """
+    values = values.dropna()
+    if values.empty:
+        return 0.0, 1.0
+    lo, hi = float(values.min()), float(values.max())
+    if lo == hi:
+        return lo, hi + 1.0
+    step = 10 ** (math.floor(math.log10(hi - lo)) - 1)
+    return math.floor(lo / step) * step, math.ceil(hi / step) * step
+
+def province_fingerprint(shapefile, rows, metric_key, bounds):
+    """
+    Hashes everything a province map depends on: the metric rows, the colour
+    scale and the shapefile (by size and mtime).
+    """
+    h = hashlib.sha1()
+    h.update(metric_key.encode('utf-8'))
+    h.update(repr(bounds).encode('utf-8'))
+    for ext in ('.shp', '.dbf'):
+        path = os.path.splitext(shapefile)[0] + ext
+        if os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{ext}:{st.st_size}:{st.st_mtime_ns}".encode('utf-8'))
+    h.update(repr(rows).encode('utf-8'))
+    return h.hexdigest()
+
+def render_province(task):
+    """
+    Renders one province map to PNG. Runs inside a worker process, so the
+    heavy geo/plot imports happen here rather than in the parent.
+    """
+    import geopandas as gpd
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    gdf = gpd.read_file(task['shapefile'], encoding='utf-8')
+    values = pd.DataFrame(task['rows'], columns=['district_number', 'value'])
+    gdf['CONS_no'] = pd.to_numeric(gdf['CONS_no'], errors='coerce')
+    gdf = gdf.merge(values, left_on='CONS_no', right_on='district_number', how='left')
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    vmin, vmax = task['bounds']
+    gdf.plot(column='value', ax=ax, cmap=task['cmap'], vmin=vmin, vmax=vmax, legend=True,
+             edgecolor='white', linewidth=0.5,
+             missing_kwds={'color': 'lightgrey', 'label': 'No data'})
+    for _, row in gdf.iterrows():
+        if row.geometry is None or row.geometry.is_empty:
+            continue
+        point = row.geometry.representative_point()
+        ax.annotate(str(int(row['CONS_no'])) if pd.notna(row['CONS_no']) else '',
+                    xy=(point.x, point.y), ha='center', va='center', fontsize=7)
+    ax.set_title(f"{task['province']} - {task['title']}")
+    ax.set_axis_off()
+
+    os.makedirs(os.path.dirname(task['output']), exist_ok=True)
+    fig.savefig(task['output'], dpi=task['dpi'], bbox_inches='tight')
+    plt.close(fig)
+    return task['province']
+
+def render_all(metric='turnout_rate', ballot_code='CONS', party_id=None, year=2569,
+               data_dir='data', output_dir=OUTPUT_DIR, workers=None, force=False,
+               cmap='viridis', dpi=110):
+    """
+    Renders one map per province for the chosen metric in a process pool.
+    Only provinces whose fingerprint changed since the last run are rebuilt,
+    unless force is set.
+    Returns a list of the provinces that were rendered.
+    """
+    layers = list_province_layers(year)
+    if not layers:
+        print(f"No province shapefiles found for {year}")
+        return []
+
+    df_metric = load_district_metric(metric, ballot_code, party_id, year, data_dir)
+    if df_metric['value'].notna().sum() == 0:
+        raise ValueError(f"No {ballot_code} {metric} data for {year} in {data_dir}")
+    bounds = nice_bounds(df_metric['value'])
+
+    metric_key = f"{ballot_code}_{metric}" + (f"_{int(party_id)}" if party_id is not None else '')
+    target_dir = os.path.join(output_dir, str(year), metric_key)
+    manifest_path = os.path.join(target_dir, MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    rows_by_province = {
+        prov: sorted(zip(grp['district_number'].astype(int), grp['value'].astype(float)))
+        for prov, grp in df_metric.groupby('province')
+    }
+
+    # Provinces with results but no shapefile (e.g. อุดรธานี) cannot be drawn
+    unmapped = sorted(set(rows_by_province) - set(layers))
+    if unmapped:
+        print(f"Skipping {len(unmapped)} provinces without a shapefile: {', '.join(unmapped)}")
+    no_data = sorted(set(layers) - set(rows_by_province))
+    if no_data:
+        print(f"Warning: {len(no_data)} provinces have no {year} data and render grey: {', '.join(no_data)}")
+
+    tasks = []
+    for province, shapefile in layers.items():
+        rows = rows_by_province.get(province, [])
+        fingerprint = province_fingerprint(shapefile, rows, metric_key, bounds)
+        output = os.path.join(target_dir, f"{province}.png")
+        if manifest.get(province) == fingerprint and os.path.exists(output):
+            continue
+        tasks.append({
+            'province': province,
+            'shapefile': shapefile,
+            'rows': rows,
+            'fingerprint': fingerprint,
+            'output': output,
+            'bounds': bounds,
+            'title': metric_key,
+            'cmap': cmap,
+            'dpi': dpi,
+        })
+
+    print(f"{len(tasks)} of {len(layers)} province maps need rendering ({metric_key}, {year})")
+    if not tasks:
+        return []
+
+    rendered = []
+    fingerprints = {t['province']: t['fingerprint'] for t in tasks}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_province, t): t['province'] for t in tasks}
+        for future in as_completed(futures):
+            province = futures[future]
+            try:
+                future.result()
+                manifest[province] = fingerprints[province]
+                rendered.append(province)
+            except Exception as e:
+                print(f"Error rendering {province}: {e}")
+
+    os.makedirs(target_dir, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    print(f"Rendered {len(rendered)} province maps to {target_dir}")
+    return rendered
+
+def main():
+    parser = argparse.ArgumentParser(description="Render per-province constituency maps for a district metric.")
+    parser.add_argument('--metric', default='turnout_rate', choices=TURNOUT_METRICS + VOTE_METRICS)
+    parser.add_argument('--ballot', default='CONS', choices=['CONS', 'PARTY'])
+    parser.add_argument('--party-id', type=int, default=None, help="Required for vote_share / votes")
+    parser.add_argument('--year', type=int, default=2569)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="Re-render every province")
+    args = parser.parse_args()
+
+    try:
+        render_all(metric=args.metric, ballot_code=args.ballot, party_id=args.party_id, year=args.year,
+                   output_dir=args.output_dir, workers=args.workers, force=args.force)
+    except ValueError as e:
+        parser.exit(1, f"Error: {e}\n")
+
+if __name__ == "__main__":
+    main()
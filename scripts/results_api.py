@@ -0,0 +1,429 @@
+import argparse
+import gzip
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+try:
+    import scripts.build_cube as bc
+    import scripts.candidates as cand
+    import scripts.data_cache as dc
+    import scripts.district_similarity as sim
+    import scripts.live_updates as live
+except ImportError:
+    import build_cube as bc
+    import candidates as cand
+    import data_cache as dc
+    import district_similarity as sim
+    import live_updates as live
+
+DATA_DIR = 'data'
+OUTPUT_DIR = '.'
+# Seconds between data-version checks (each check is one stat() per file)
+VERSION_CHECK_INTERVAL = 1.0
+# Serialized responses kept per data version
+RESPONSE_CACHE_SIZE = 2048
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+# Seconds between SSE keep-alive comments on an idle event stream
+SSE_HEARTBEAT = 15.0
+Q_OUTPUT_RE = re.compile(r'^q\d+_[\w]+$')
+
+def _clean(value):
+    """Makes numpy/pandas scalars JSON-safe (NaN -> None)."""
+    if value is None:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _records(df, columns=None):
+    """DataFrame -> list of JSON-safe dicts."""
+    if df is None or df.empty:
+        return []
+    if columns:
+        df = df[[c for c in columns if c in df.columns]]
+    return json.loads(df.to_json(orient='records', force_ascii=False))
+
+class ResultsStore:
+    """
+    Holds the aggregate cube and the q*_ outputs for the current data version
+    and memoizes serialized (raw, gzipped) response bodies for that version.
+    The cube itself is owned by a LiveFeed, which also pushes deltas to the
+    /api/events subscribers when a new version lands.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, output_dir=OUTPUT_DIR):
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.feed = live.LiveFeed(data_dir, output_dir, interval=VERSION_CHECK_INTERVAL)
+        self.version = None
+        self.cube = None
+        self.candidates = None
+        self._similarity = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+
+    def refresh(self):
+        """Picks up a new data version if the published files changed. Returns the version."""
+        now = time.monotonic()
+        if self.version is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return self.version
+        self._checked_at = now
+        self.feed.poll()
+        with self._lock:
+            if self.feed.version != self.version:
+                self.cube = self.feed.cube
+                # The ETL rewrites the candidate store together with the masters
+                self.candidates = cand.CandidateStore(os.path.join(self.data_dir, cand.STORE_DIR))
+                self._similarity = None
+                self._responses.clear()
+                self.version = self.feed.version
+        return self.version
+
+    @property
+    def similarity(self):
+        """The district similarity index, loaded on first use (None if not built)."""
+        if self._similarity is None:
+            path = os.path.join(self.data_dir, os.path.basename(sim.INDEX_FILE))
+            if os.path.exists(path):
+                self._similarity = sim.DistrictSimilarity(path)
+        return self._similarity
+
+    def response(self, key, build):
+        """
+        Returns (version, raw_bytes, gzip_bytes) for a request key, building
+        and serializing it only once per data version. A body built while
+        refresh() swapped in a new version is returned but not cached.
+        """
+        with self._lock:
+            version = self.version
+            cached = self._responses.get((version, key))
+        if cached is not None:
+            return (version,) + cached
+        payload = build()
+        if payload is None:
+            return None
+        body = json.dumps({'version': version, 'data': payload},
+                          ensure_ascii=False, default=_clean).encode('utf-8')
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        with self._lock:
+            if self.version == version:
+                self._responses[(version, key)] = (body, compressed)
+                while len(self._responses) > RESPONSE_CACHE_SIZE:
+                    self._responses.popitem(last=False)
+        return version, body, compressed
+
+    def q_output(self, name):
+        """Rows of a q*_ result table, or None if it does not exist."""
+        if not Q_OUTPUT_RE.match(name):
+            return None
+        path = os.path.join(self.output_dir, f"{name}.csv")
+        if not os.path.exists(path):
+            return None
+        return _records(dc.load_table(path))
+
+# --- Endpoints ---
+# Each takes (store, path_parts, params) and returns a JSON-able payload or None (404).
+
+def _year_ballot(params, default_ballot='CONS'):
+    year = int(params.get('year', ['2569'])[0])
+    ballot_code = params.get('ballot', [default_ballot])[0].upper()
+    return year, ballot_code
+
+def _party_records(parties):
+    """Party rows with party_id as an integer (the cube CSV reads it back as float)."""
+    if parties is not None and not parties.empty:
+        parties = parties.assign(party_id=parties['party_id'].astype('Int64'))
+    return _records(parties, ['party_id', 'party_name', 'votes', 'vote_share', 'party_rank'])
+
+def _unit(store, level, key, params):
+    year, ballot_code = _year_ballot(params)
+    kpis = bc.get_kpis(store.cube, level, year, ballot_code, key)
+    if kpis is None:
+        return None
+    party_ballot = 'PARTY' if ballot_code == 'RFD' else ballot_code
+    k = int(params.get('k', ['10'])[0])
+    parties = bc.get_parties(store.cube, level, year, party_ballot, key, k=k)
+    return {
+        'level': level,
+        'key': key,
+        'year': year,
+        'ballot_code': ballot_code,
+        'kpis': {c: _clean(kpis[c]) for c in bc.MEASURES + ['turnout_rate', 'valid_rate', 'invalid_rate',
+                                                            'no_vote_rate', 'turnout_rank']},
+        'parties': _party_records(parties),
+    }
+
+def endpoint_national(store, parts, params):
+    return _unit(store, 'national', '', params)
+
+def endpoint_region(store, parts, params):
+    if not parts:
+        year, ballot_code = _year_ballot(params)
+        return _records(bc.get_level(store.cube, 'region', year, ballot_code),
+                        ['region', 'eligible_voters', 'voters_used', 'turnout_rate', 'turnout_rank'])
+    payload = _unit(store, 'region', parts[0], params)
+    if payload is not None:
+        year, ballot_code = _year_ballot(params)
+        payload['provinces'] = _records(bc.get_children(store.cube, 'province', year, ballot_code, parts[0]),
+                                        ['province', 'eligible_voters', 'voters_used', 'turnout_rate', 'turnout_rank'])
+    return payload
+
+def endpoint_province(store, parts, params):
+    if not parts:
+        year, ballot_code = _year_ballot(params)
+        return _records(bc.get_level(store.cube, 'province', year, ballot_code),
+                        ['region', 'province', 'eligible_voters', 'voters_used', 'turnout_rate', 'turnout_rank'])
+    payload = _unit(store, 'province', parts[0], params)
+    if payload is not None:
+        year, ballot_code = _year_ballot(params)
+        payload['districts'] = _records(bc.get_children(store.cube, 'district', year, ballot_code, parts[0]),
+                                        ['district_id', 'district_number', 'district_label', 'eligible_voters',
+                                         'voters_used', 'turnout_rate', 'no_vote_rate', 'turnout_rank'])
+    return payload
+
+def endpoint_district(store, parts, params):
+    if not parts:
+        return None
+    params = dict(params)
+    params.setdefault('k', ['100'])
+    return _unit(store, 'district', parts[0], params)
+
+def endpoint_parties(store, parts, params):
+    year, ballot_code = _year_ballot(params, default_ballot='PARTY')
+    level = params.get('level', ['national'])[0]
+    key = params.get('key', [''])[0]
+    k = params.get('k', [None])[0]
+    parties = bc.get_parties(store.cube, level, year, ballot_code, key, k=int(k) if k else None)
+    return _party_records(parties)
+
+def endpoint_typology(store, parts, params):
+    payload = {}
+    for name in ('q9_typology_91', 'q9_typology_92', 'q9_rank23_gt_rank1'):
+        rows = store.q_output(name)
+        if rows is not None:
+            payload[name] = rows
+    return payload or None
+
+def endpoint_outputs(store, parts, params):
+    if not parts:
+        names = sorted(os.path.splitext(os.path.basename(p))[0]
+                       for p in dc.published_files(store.data_dir, store.output_dir)
+                       if os.path.basename(p).startswith('q'))
+        return names
+    return store.q_output(parts[0])
+
+def endpoint_candidates(store, parts, params):
+    """/candidates/<district_id>, /candidates?party=<party_id> or /candidate/<mp_app_id>."""
+    if not os.path.isdir(store.candidates.store_dir):
+        return None
+    if 'party' in params:
+        return _records(store.candidates.by_party(int(params['party'][0])))
+    if not parts:
+        return None
+    if '_' in parts[0] and parts[0].count('_') == 2:
+        return store.candidates.candidate(parts[0])
+    return _records(store.candidates.by_district(parts[0])) or None
+
+def endpoint_quantiles(store, parts, params):
+    """/quantiles/<metric>?year=&ballot=&region=&province=&q=0.1,0.5&threshold="""
+    if not parts:
+        return None
+    year, ballot_code = _year_ballot(params)
+    qs = [float(q) for q in params.get('q', ['0.05,0.1,0.25,0.5,0.75,0.9,0.95'])[0].split(',')]
+    threshold = params.get('threshold', [None])[0]
+    result = store.feed.percentiles(parts[0], qs, threshold=float(threshold) if threshold else None,
+                                    year=year, ballot_code=ballot_code,
+                                    region=params.get('region', [None])[0],
+                                    province=params.get('province', [None])[0])
+    result['percentiles'] = [{'q': q, 'value': _clean(v)} for q, v in result['percentiles'].items()]
+    result['share_below'] = _clean(result.get('share_below'))
+    return {'metric': parts[0], 'year': year, 'ballot_code': ballot_code, **result}
+
+def endpoint_similar(store, parts, params):
+    """/similar/<district_id>?k= : the k most similar districts with their driving features."""
+    if not parts or store.similarity is None:
+        return None
+    k = min(int(params.get('k', ['10'])[0]), sim.MAX_K)
+    neighbours = store.similarity.neighbours(parts[0], k)
+    for n in neighbours:
+        n['drivers'] = [{'feature': f, 'value': a, 'neighbour_value': b} for f, a, b in n['drivers']]
+    return neighbours or None
+
+def endpoint_version(store, parts, params):
+    return {'version': store.version}
+
+ENDPOINTS = {
+    'version': endpoint_version,
+    'national': endpoint_national,
+    'regions': endpoint_region,
+    'region': endpoint_region,
+    'provinces': endpoint_province,
+    'province': endpoint_province,
+    'district': endpoint_district,
+    'parties': endpoint_parties,
+    'candidates': endpoint_candidates,
+    'candidate': endpoint_candidates,
+    'quantiles': endpoint_quantiles,
+    'similar': endpoint_similar,
+    'typology': endpoint_typology,
+    'outputs': endpoint_outputs,
+}
+
+class ResultsHandler(BaseHTTPRequestHandler):
+    """GET-only handler for /api/<endpoint>/<key>?year=&ballot=&k= and /api/events (SSE)."""
+
+    store = None
+    server_version = 'election69-api/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+        if parts[:2] == ['api', 'events']:
+            return self._stream_events(parse_qs(url.query))
+        if len(parts) < 2 or parts[0] != 'api' or parts[1] not in ENDPOINTS:
+            return self._send_error(404, 'Unknown endpoint')
+
+        try:
+            self.store.refresh()
+        except Exception as e:
+            return self._send_error(503, f'Data not available: {e}')
+
+        params = parse_qs(url.query)
+        key = (url.path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        handler = ENDPOINTS[parts[1]]
+        try:
+            result = self.store.response(key, lambda: handler(self.store, parts[2:], params))
+        except (ValueError, KeyError) as e:
+            return self._send_error(400, f'Bad request: {e}')
+        if result is None:
+            return self._send_error(404, 'Not found')
+
+        # The version the body was built for, which a concurrent refresh() may have moved past
+        version, body, compressed = result
+        # Weak: the gzip and identity bodies of a version are equivalent, not byte-identical
+        etag = f'W/"{version}"'
+        if version in [t.strip().removeprefix('W/').strip('"') for t in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'public, max-age=15')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        use_gzip = compressed is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        payload = compressed if use_gzip else body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'public, max-age=15')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream_events(self, params):
+        """
+        Server-sent events: one 'delta' event per new data version, carrying
+        only the changed districts and KPIs. A client reconnecting with
+        Last-Event-ID (or ?since=<version>) first receives the deltas it
+        missed, or a 'reload' event if its version is no longer in the history.
+        """
+        feed = self.store.feed
+        sub = feed.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            # No Content-Length: the stream ends when the connection closes
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+
+            since = self.headers.get('Last-Event-ID') or params.get('since', [None])[0]
+            self._send_event('hello', {'version': feed.version}, feed.version)
+            if since and since != feed.version:
+                missed = feed.deltas_since(since)
+                if missed is None:
+                    self._send_event('reload', {'version': feed.version}, feed.version)
+                for delta in missed or []:
+                    self._send_event('delta', delta, delta['version'])
+
+            while True:
+                delta = live.wait_for_delta(sub, SSE_HEARTBEAT)
+                if delta is None:
+                    self.wfile.write(b': keep-alive\n\n')
+                    self.wfile.flush()
+                else:
+                    self._send_event('delta', delta, delta['version'])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            feed.unsubscribe(sub)
+
+    def _send_event(self, event, payload, event_id=None):
+        data = json.dumps(payload, ensure_ascii=False, default=_clean)
+        message = f"event: {event}\n"
+        if event_id:
+            message += f"id: {event_id}\n"
+        message += f"data: {data}\n\n"
+        self.wfile.write(message.encode('utf-8'))
+        self.wfile.flush()
+
+    def _send_error(self, status, message):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Polling clients would flood stderr; errors still go through send_error
+        pass
+
+def make_server(host='0.0.0.0', port=8502, data_dir=DATA_DIR, output_dir=OUTPUT_DIR):
+    """
+    Creates the threaded API server with a fresh ResultsStore and starts its
+    live feed, so event streams get deltas even when no GET arrives.
+    """
+    ResultsHandler.store = ResultsStore(data_dir, output_dir)
+    ResultsHandler.store.feed.start()
+    ResultsHandler.store.refresh()
+    server = ThreadingHTTPServer((host, port), ResultsHandler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only JSON API over the election master tables and q-outputs.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port)
+    print(f"Serving results API on http://{args.host}:{args.port}/api/ (data version {ResultsHandler.store.version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
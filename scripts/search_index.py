@@ -0,0 +1,241 @@
+import bisect
+import os
+import pickle
+import re
+import unicodedata
+
+import pandas as pd
+
+try:
+    import scripts.data_cache as dc
+    from scripts.ect_decoders import read_json
+except ImportError:
+    import data_cache as dc
+    from ect_decoders import read_json
+
+INDEX_FILE = 'search_index.pkl'
+INDEX_FORMAT = 3
+NGRAM = 3
+
+# Files the index is built from, relative to data_dir
+SOURCES = {
+    'districts': 'm_district_geo.csv',
+    'parties': 'raw/info_party_overview.txt',
+    'candidates': 'raw/info_mp_candidate.txt',
+}
+
+# Short names people type for provinces whose official name is longer
+PROVINCE_ALIASES = {
+    'กรุงเทพมหานคร': ['กรุงเทพ', 'กทม', 'Bangkok'],
+}
+
+# Result ordering when match quality ties
+KIND_ORDER = {'province': 0, 'district': 1, 'party': 2, 'candidate': 3}
+
+# Thai tone marks (U+0E48-U+0E4B), mai taikhu, thanthakhat, nikhahit, yamakkan
+THAI_MARKS_RE = re.compile('[\u0e47-\u0e4e]')
+SEPARATOR_RE = re.compile(r'[\s\-_.,/()]+')
+
+def normalize(text):
+    """
+    Folds text for matching: NFC, drops Thai tone/diacritic marks, spacing
+    and punctuation, and casefolds Latin letters.
+    'กรุงเทพ เขต 1' and 'กรุงเทพเขต1' normalize to the same key.
+    """
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return ''
+    text = unicodedata.normalize('NFC', str(text))
+    text = THAI_MARKS_RE.sub('', text)
+    return SEPARATOR_RE.sub('', text).casefold()
+
+def ngrams(key, n=NGRAM):
+    return {key[i:i + n] for i in range(len(key) - n + 1)}
+
+def load_entities(data_dir='data'):
+    """
+    Collects the searchable entities from the master geography and the ECT
+    roster files. Each entity is a dict with kind, id, label and the keys it
+    can be found under, plus province / district / party context.
+    """
+    entities = []
+    geo = dc.read_csv_with_encoding(os.path.join(data_dir, SOURCES['districts']))
+    geo = geo[geo['district_number'] > 0]
+
+    for province, grp in geo.groupby('province'):
+        entities.append({'kind': 'province', 'id': province, 'label': province,
+                         'region': grp['region'].iloc[0],
+                         'keys': [province] + PROVINCE_ALIASES.get(province, [])})
+
+    district_label = {}
+    for row in geo.itertuples(index=False):
+        district_label[row.district_id] = row.district_label
+        entities.append({
+            'kind': 'district', 'id': row.district_id, 'label': row.district_label,
+            'year': int(row.year), 'province': row.province, 'district_number': int(row.district_number),
+            'keys': [row.district_label, row.district_id] + [
+                f"{name} เขต {row.district_number}"
+                for name in [row.province] + PROVINCE_ALIASES.get(row.province, [])],
+        })
+
+    party_name = {}
+    parties_path = os.path.join(data_dir, SOURCES['parties'])
+    if os.path.exists(parties_path):
+        for p in read_json(parties_path):
+            party_id = int(p['id'])
+            party_name[party_id] = p['name']
+            entities.append({'kind': 'party', 'id': party_id, 'label': p['name'],
+                             'party_no': p.get('party_no'), 'keys': [p['name'], p.get('abbr')]})
+
+    candidates_path = os.path.join(data_dir, SOURCES['candidates'])
+    if os.path.exists(candidates_path):
+        for c in read_json(candidates_path):
+            # mp_app_id is '<district_id>_<candidate no>'
+            district_id = c['mp_app_id'].rsplit('_', 1)[0]
+            name = c['mp_app_name']
+            entities.append({
+                'kind': 'candidate', 'id': c['mp_app_id'], 'label': name,
+                'district_id': district_id, 'district_label': district_label.get(district_id),
+                'party_id': c.get('mp_app_party_id'), 'party_name': party_name.get(c.get('mp_app_party_id')),
+                # Whole name plus each word, so a surname alone is a prefix hit
+                'keys': [name] + name.split(),
+            })
+    return entities
+
+class SearchIndex:
+    """
+    Prefix + n-gram index over entity names.
+    Prefix lookups bisect a sorted key list. Substring matches come from the
+    intersection of trigram posting lists; queries shorter than a trigram
+    have a posting list of their own. Posting lists are kept in result
+    order, so a short query stops reading once it has limit results.
+    """
+
+    def __init__(self, entities, sources=None):
+        self.entities = [{k: v for k, v in e.items() if k != 'keys'} for e in entities]
+        self.sources = sources or {}
+        pairs = set()
+        grams = {}
+        self.entity_keys = []
+        for i, entity in enumerate(entities):
+            keys = sorted({normalize(k) for k in entity['keys'] if k} - {''})
+            self.entity_keys.append(keys)
+            for key in keys:
+                pairs.add((key, i))
+                for gram in ngrams(key):
+                    grams.setdefault(gram, set()).add(i)
+        pairs = sorted(pairs)
+        self.keys = [k for k, _ in pairs]
+        self.key_entity = [i for _, i in pairs]
+        # Position of each entity in result order when match quality ties
+        order = sorted(range(len(self.entities)), key=lambda i: (
+            KIND_ORDER[self.entities[i]['kind']], len(self.entities[i]['label']), i))
+        self.rank_of = [0] * len(order)
+        for pos, i in enumerate(order):
+            self.rank_of[i] = pos
+        # Posting lists as tuples: smaller pickle, faster set() construction
+        self.grams = {g: tuple(sorted(ids)) for g, ids in grams.items()}
+        short = {}
+        for i, keys in enumerate(self.entity_keys):
+            for n in range(1, NGRAM):
+                for gram in set().union(*(ngrams(key, n) for key in keys)):
+                    short.setdefault(gram, []).append(i)
+        self.short_grams = {g: tuple(sorted(ids, key=self.rank_of.__getitem__)) for g, ids in short.items()}
+
+    def _prefix(self, q):
+        lo = bisect.bisect_left(self.keys, q)
+        hits = {}
+        for j in range(lo, len(self.keys)):
+            key = self.keys[j]
+            if not key.startswith(q):
+                break
+            i = self.key_entity[j]
+            rank = 0 if key == q else 1
+            hits[i] = min(rank, hits.get(i, rank))
+        return hits
+
+    def _substring(self, q):
+        """Entities with q anywhere in one of their keys, in result order."""
+        if len(q) < NGRAM:
+            return self.short_grams.get(q, ())
+        postings = [self.grams.get(g) for g in ngrams(q)]
+        if any(p is None for p in postings):
+            return ()
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+            if not candidates:
+                break
+        return sorted((i for i in candidates if any(q in key for key in self.entity_keys[i])),
+                      key=self.rank_of.__getitem__)
+
+    def search(self, query, kinds=None, limit=20):
+        """
+        Returns matching entities, best first: exact key, then prefix, then
+        substring matches.
+        kinds restricts the entity kinds ('province', 'district', 'party', 'candidate').
+        """
+        q = normalize(query)
+        if not q:
+            return []
+        prefix = self._prefix(q)
+        wanted = lambda i: not kinds or self.entities[i]['kind'] in kinds
+        results = sorted((i for i in prefix if wanted(i)), key=lambda i: (prefix[i], self.rank_of[i]))
+        for i in self._substring(q):
+            if limit and len(results) >= limit:
+                break
+            if i not in prefix and wanted(i):
+                results.append(i)
+        if limit:
+            results = results[:limit]
+        return [self.entities[i] for i in results]
+
+    def ids(self, query, kind):
+        """Set of entity ids of one kind matching the query."""
+        return {e['id'] for e in self.search(query, kinds=(kind,), limit=None)}
+
+def source_digests(data_dir='data'):
+    paths = [os.path.join(data_dir, p) for p in SOURCES.values()]
+    return {p: dc.file_digest(p) for p in paths if os.path.exists(p)}
+
+def build_index(data_dir='data'):
+    return SearchIndex(load_entities(data_dir), source_digests(data_dir))
+
+def load_index(data_dir='data', rebuild=False):
+    """
+    Loads the pickled index from data_dir, rebuilding and saving it when it
+    is missing or any source file changed.
+    """
+    path = os.path.join(data_dir, INDEX_FILE)
+    sources = source_digests(data_dir)
+    if os.path.exists(path) and not rebuild:
+        try:
+            with open(path, 'rb') as f:
+                stored = pickle.load(f)
+            if stored.get('format') == INDEX_FORMAT and stored['index'].sources == sources:
+                return stored['index']
+        except Exception as e:
+            print(f"Search index unreadable, rebuilding: {e}")
+
+    index = build_index(data_dir)
+    with open(path, 'wb') as f:
+        pickle.dump({'format': INDEX_FORMAT, 'index': index}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return index
+
+def main():
+    import sys
+    import time
+    index = load_index(rebuild=True)
+    counts = pd.Series([e['kind'] for e in index.entities]).value_counts()
+    print(f"Indexed {len(index.entities)} entities, {len(index.keys)} keys, {len(index.grams)} trigrams")
+    print(counts.to_string())
+    for query in sys.argv[1:]:
+        start = time.perf_counter()
+        results = index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n'{query}' -> {len(results)} results in {elapsed:.3f} ms")
+        for e in results[:10]:
+            print(f"  {e['kind']:<10} {e['id']:<12} {e['label']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    from scripts.ect_decoders import read_json
+except ImportError:
+    from ect_decoders import read_json
+
+# zstd compresses these payloads ~30% smaller and faster than zlib; optional
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+STORE_DIR = os.path.join('data', 'snapshots')
+INDEX_FILE = 'index.jsonl'
+BLOCKS_FILE = 'blocks.jsonl'
+PACK_DIR = 'packs'
+# Decompressed blocks kept in memory by a store (blocks are immutable)
+BLOCK_CACHE_SIZE = 4096
+
+# Raw feed files archived per snapshot
+SOURCES = ['stats_cons', 'stats_party', 'stat_referendum']
+# Top-level fields of each source copied into the index, so count progress
+# can be plotted without opening any block
+PROGRESS_FIELDS = {
+    'stats_cons': ('percent_count', 'counted_vote_stations'),
+    'stats_party': ('percent_count', 'counted_vote_stations'),
+    'stat_referendum': ('referendum_percent_count', 'referendum_counted_vote_stations'),
+}
+
+def split_units(source, doc):
+    """
+    Splits a feed payload into independently stored units:
+      'header'            top-level fields (lists removed)
+      'province:<id>'     province fields (constituencies removed)
+      'cons:<cons_id>'    one constituency
+      'party:<party_id>'  one party of stats_party, with its candidates
+    Returns a dict of unit key -> JSON object.
+    """
+    units = {'header': {k: v for k, v in doc.items() if not isinstance(v, list)}}
+    for province in doc.get('result_province', []):
+        units[f"province:{province['prov_id']}"] = {k: v for k, v in province.items() if k != 'constituencies'}
+        for cons in province.get('constituencies', []):
+            units[f"cons:{cons['cons_id']}"] = cons
+    for party in doc.get('result_party', []):
+        units[f"party:{party['party_id']}"] = party
+    return units
+
+def encode_block(obj):
+    """Canonical JSON bytes, so equal content always hashes the same."""
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+class SnapshotStore:
+    """
+    Append-only history of feed snapshots.
+
+    Each unit (see split_units) is stored once per distinct content as a
+    compressed block addressed by its sha1. A snapshot writes only the
+    blocks that are new, plus one manifest block per source mapping unit
+    keys to block hashes, into a single pack file. blocks.jsonl locates each
+    block (pack, offset, length) and index.jsonl gets one line per snapshot
+    with the manifest hashes and the count progress, so trajectories read
+    only the blocks of the units they ask for.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.pack_dir = os.path.join(root, PACK_DIR)
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self.blocks_path = os.path.join(root, BLOCKS_FILE)
+        self._locator = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if zstandard is not None:
+            self._compress = zstandard.ZstdCompressor(level=10).compress
+            self._decompress = zstandard.ZstdDecompressor().decompress
+            self.codec = 'zst'
+        else:
+            self._compress = lambda b: zlib.compress(b, 6)
+            self._decompress = zlib.decompress
+            self.codec = 'zz'
+
+    # --- blocks ---
+
+    @property
+    def locator(self):
+        """sha1 -> [pack, offset, length, codec] for every stored block."""
+        if self._locator is None:
+            self._locator = {}
+            if os.path.exists(self.blocks_path):
+                with open(self.blocks_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            digest, *loc = json.loads(line)
+                            self._locator[digest] = loc
+        return self._locator
+
+    def get_block(self, digest):
+        """Returns the decoded object of a block (cached)."""
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+        loc = self.locator.get(digest)
+        if loc is None:
+            raise KeyError(f"Block {digest} not found")
+        pack, offset, length, codec = loc
+        with open(os.path.join(self.pack_dir, pack), 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        if codec == 'zz':
+            raw = zlib.decompress(data)
+        elif zstandard is None:
+            raise RuntimeError("Block is zstd-compressed but the zstandard package is not installed")
+        else:
+            raw = self._decompress(data)
+        obj = json.loads(raw)
+        with self._lock:
+            self._cache[digest] = obj
+            while len(self._cache) > BLOCK_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return obj
+
+    # --- snapshots ---
+
+    def snapshots(self):
+        """
+        Returns the index as a DataFrame: seq, taken_at, ingested_at and per
+        source the manifest hash and progress fields ('<source>.<field>').
+        """
+        if not os.path.exists(self.index_path):
+            return pd.DataFrame(columns=['seq', 'taken_at', 'ingested_at'])
+        rows = []
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                row = {'seq': entry['seq'], 'taken_at': entry['taken_at'], 'ingested_at': entry['ingested_at']}
+                for source, info in entry['sources'].items():
+                    for k, v in info.items():
+                        row[f"{source}.{k}"] = v
+                rows.append(row)
+        df = pd.DataFrame(rows)
+        df['taken_at'] = pd.to_datetime(df['taken_at'], utc=True, format='ISO8601', errors='coerce')
+        return df
+
+    def _last_entry(self):
+        if not os.path.exists(self.index_path):
+            return None
+        last = None
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    last = line
+        return json.loads(last) if last else None
+
+    def append(self, payloads, taken_at=None):
+        """
+        Archives one snapshot of the given {source: parsed JSON} payloads.
+        Unchanged units reuse their existing blocks; a snapshot identical to
+        the previous one is not recorded.
+        Returns the index entry, or None if nothing changed.
+        """
+        last = self._last_entry()
+        seq = (last['seq'] + 1) if last else 1
+        # Unique per attempt: a retry after a crash reuses seq but never a pack
+        # that blocks.jsonl may already point into
+        pack = f"{seq:08d}-{uuid.uuid4().hex[:12]}.pack"
+        new_blocks = OrderedDict()
+
+        def put(obj):
+            raw = encode_block(obj)
+            digest = hashlib.sha1(raw).hexdigest()
+            if digest not in self.locator and digest not in new_blocks:
+                new_blocks[digest] = self._compress(raw)
+            return digest
+
+        entry_sources = {}
+        for source, doc in payloads.items():
+            manifest = {unit: put(obj) for unit, obj in split_units(source, doc).items()}
+            info = {'manifest': put(manifest), 'last_update': doc.get('last_update')}
+            pct_field, stations_field = PROGRESS_FIELDS.get(source, (None, None))
+            info['percent_count'] = doc.get(pct_field) if pct_field else None
+            info['counted_vote_stations'] = doc.get(stations_field) if stations_field else None
+            entry_sources[source] = info
+
+        if last is not None and {s: i['manifest'] for s, i in last['sources'].items()} == \
+                {s: i['manifest'] for s, i in entry_sources.items()}:
+            return None
+
+        # Pack first, then the block locations, then the index line: a crash
+        # part-way leaves at most an orphaned pack or locations of blocks no
+        # snapshot uses yet, which the next append reuses as they are.
+        os.makedirs(self.pack_dir, exist_ok=True)
+        locations = []
+        offset = 0
+        with open(os.path.join(self.pack_dir, pack), 'xb') as f:
+            for digest, data in new_blocks.items():
+                f.write(data)
+                locations.append([digest, pack, offset, len(data), self.codec])
+                offset += len(data)
+        with open(self.blocks_path, 'a', encoding='utf-8') as f:
+            for loc in locations:
+                f.write(json.dumps(loc) + '\n')
+                self.locator[loc[0]] = loc[1:]
+
+        if taken_at is None:
+            updates = [i['last_update'] for i in entry_sources.values() if i.get('last_update')]
+            taken_at = max(updates) if updates else datetime.now(timezone.utc).isoformat()
+        entry = {
+            'seq': seq,
+            'taken_at': taken_at,
+            'ingested_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'new_blocks': len(new_blocks),
+            'bytes_written': offset,
+            'sources': entry_sources,
+        }
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
+
+    def ingest_raw(self, raw_dir=os.path.join('data', 'raw'), sources=SOURCES):
+        """Archives the feed files currently in raw_dir (missing ones are skipped)."""
+        payloads = {}
+        for source in sources:
+            path = os.path.join(raw_dir, f"{source}.txt")
+            if os.path.exists(path):
+                payloads[source] = read_json(path)
+        if not payloads:
+            print(f"No feed files found in {raw_dir}")
+            return None
+        return self.append(payloads)
+
+    # --- queries ---
+
+    def at(self, when):
+        """The last snapshot taken at or before a time (a row of snapshots()), or None."""
+        df = self.snapshots()
+        df = df[df['taken_at'] <= _utc(when)]
+        return None if df.empty else df.iloc[-1]
+
+    def unit(self, seq, source, unit):
+        """One unit of one snapshot, or None if the unit was not in it."""
+        df = self.snapshots()
+        row = df[df['seq'] == seq]
+        if row.empty:
+            return None
+        manifest = self.get_block(row[f"{source}.manifest"].iloc[0])
+        digest = manifest.get(unit)
+        return self.get_block(digest) if digest else None
+
+    def trajectory(self, source, unit, metric, since=None, until=None):
+        """
+        A metric of one unit across snapshots, with the count progress of
+        each snapshot. metric is a key path ('party_vote_percent',
+        'referendum_results.*.yes' - '*' takes the first value of an object)
+        or a function of the unit object.
+        Only the manifests and the blocks of that unit are read, each
+        distinct block once.
+        Returns DataFrame with: seq, taken_at, percent_count, counted_vote_stations, value
+        """
+        df = self.snapshots()
+        if df.empty or f"{source}.manifest" not in df.columns:
+            return pd.DataFrame(columns=['seq', 'taken_at', 'percent_count', 'counted_vote_stations', 'value'])
+        if since is not None:
+            df = df[df['taken_at'] >= _utc(since)]
+        if until is not None:
+            df = df[df['taken_at'] <= _utc(until)]
+        df = df[df[f"{source}.manifest"].notna()]
+
+        getter = metric if callable(metric) else _path_getter(metric)
+        values = {}
+        out = []
+        for manifest_digest in df[f"{source}.manifest"]:
+            digest = self.get_block(manifest_digest).get(unit)
+            if digest not in values:
+                values[digest] = getter(self.get_block(digest)) if digest else None
+            out.append(values[digest])
+        result = df[['seq', 'taken_at', f"{source}.percent_count", f"{source}.counted_vote_stations"]].copy()
+        result.columns = ['seq', 'taken_at', 'percent_count', 'counted_vote_stations']
+        result['value'] = out
+        return result.reset_index(drop=True)
+
+def _utc(when):
+    ts = pd.Timestamp(when)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts
+
+def _path_getter(path):
+    keys = path.split('.')
+
+    def get(obj):
+        for key in keys:
+            if obj is None:
+                return None
+            if key == '*':
+                obj = next(iter(obj.values()), None) if isinstance(obj, dict) else None
+            else:
+                obj = obj.get(key) if isinstance(obj, dict) else None
+        return obj
+    return get
+
+def main():
+    parser = argparse.ArgumentParser(description="Append-only, deduplicated history of ECT feed snapshots.")
+    parser.add_argument('--store', default=STORE_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest = sub.add_parser('ingest', help="Archive the feed files currently in the raw directory")
+    ingest.add_argument('--raw-dir', default=os.path.join('data', 'raw'))
+    sub.add_parser('list', help="List archived snapshots")
+    traj = sub.add_parser('trajectory', help="Print one metric of one unit across snapshots")
+    traj.add_argument('source', choices=SOURCES)
+    traj.add_argument('unit', help="e.g. party:129, cons:BKK_1, province:BKK, header")
+    traj.add_argument('metric', help="key path, e.g. party_vote_percent or referendum_results.*.yes")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store)
+    if args.command == 'ingest':
+        entry = store.ingest_raw(args.raw_dir)
+        if entry is None:
+            print("No change since the last snapshot")
+        else:
+            print(f"Snapshot {entry['seq']} ({entry['taken_at']}): {entry['new_blocks']} new blocks, "
+                  f"{entry['bytes_written']:,} bytes written")
+    elif args.command == 'list':
+        print(store.snapshots().to_string(index=False))
+    else:
+        print(store.trajectory(args.source, args.unit, args.metric).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts import data_cache as dc
+    from scripts.candidates import RESULT_COLUMNS
+    from scripts.warehouse import MANIFEST_FILE, SOURCE_FILES, SOURCES as WAREHOUSE_SOURCES, WAREHOUSE_DIR, load_table
+except ImportError:
+    import data_cache as dc
+    from candidates import RESULT_COLUMNS
+    from warehouse import MANIFEST_FILE, SOURCE_FILES, SOURCES as WAREHOUSE_SOURCES, WAREHOUSE_DIR, load_table
+
+DB_FILE = os.path.join('data', 'election.sqlite')
+# Query results kept in memory per process (the persistent cache has no cap;
+# it is emptied whenever a table is reloaded)
+QUERY_CACHE_SIZE = 256
+# Seconds between source checks in query() (each check is one stat() per file)
+VERSION_CHECK_INTERVAL = 1.0
+
+# Authorizer actions a user statement may perform; anything else (writes,
+# schema changes, PRAGMA, ATTACH) is refused
+READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+# Indexes created on every table that has all the columns of an entry
+INDEX_COLUMNS = [
+    ('year', 'ballot_code'),
+    ('year', 'ballot_code', 'key'),
+    ('key',),
+    ('district_id',),
+    ('province', 'district_number'),
+    ('party_id',),
+    ('party',),
+    ('party_name',),
+    ('candidate_key',),
+    ('district_key',),
+]
+
+# Convenience views, created when their tables exist
+VIEWS = {
+    'v_vote_share': ("""
+        SELECT v.year, v.ballot_code, v.key, v.province, v.district_number, v.party, v.votes,
+               t.voters_used, CAST(v.votes AS REAL) / NULLIF(t.voters_used, 0) AS share
+        FROM votes v JOIN turnout t
+          ON t.year = v.year AND t.ballot_code = v.ballot_code AND t.key = v.key""", ['votes', 'turnout']),
+}
+# Derived tables, rebuilt whenever one of their tables is reloaded; used for
+# results a view would recompute on every query (window functions)
+DERIVED = {
+    'district_winner': ("""
+        SELECT * FROM (
+            SELECT s.*, ROW_NUMBER() OVER (PARTITION BY year, ballot_code, key ORDER BY votes DESC) AS rank
+            FROM v_vote_share s)
+        WHERE rank = 1""", ['votes', 'turnout']),
+}
+
+def _candidate_results(store_dir):
+    return pd.DataFrame({c: np.load(os.path.join(store_dir, f"results_{c}.npy")) for c in RESULT_COLUMNS})
+
+def discover_sources(data_dir='data', output_dir='.', warehouse_dir=WAREHOUSE_DIR):
+    """
+    Every table the SQL layer exposes: name -> (source files, loader).
+    The master tables and cubes keep their file names (m_votes_master, ...),
+    votes/turnout are the all-years warehouse tables (2566 included), the
+    candidate store is candidate_dim/candidate_results and every q*_ output
+    is a table of the same name.
+    """
+    sources = {}
+    for name in dc.MASTER_TABLES:
+        path = os.path.join(data_dir, name)
+        sources[name[:-4]] = ([path], lambda p=path: dc.read_csv_with_encoding(p))
+
+    for table in sorted({t for t, _ in WAREHOUSE_SOURCES}):
+        # The warehouse rebuilds from these when they change, so they sign the table too
+        paths = [os.path.join(data_dir, name)
+                 for name in sorted({f for (t, _), files in SOURCE_FILES.items() if t == table for f in files})]
+        manifest = os.path.join(warehouse_dir, table, MANIFEST_FILE)
+        if os.path.exists(manifest):
+            paths.append(manifest)
+        sources[table] = (paths, lambda t=table: load_table(t, root=warehouse_dir, data_dir=data_dir))
+
+    store_dir = os.path.join(data_dir, 'candidates')
+    sources['candidate_dim'] = ([os.path.join(store_dir, 'candidate_dim.csv')],
+                                lambda: pd.read_csv(os.path.join(store_dir, 'candidate_dim.csv'), encoding='utf-8'))
+    sources['candidate_results'] = ([os.path.join(store_dir, f"results_{c}.npy") for c in RESULT_COLUMNS],
+                                    lambda: _candidate_results(store_dir))
+
+    for path in sorted(glob.glob(os.path.join(output_dir, 'q*_*.csv'))):
+        sources[os.path.splitext(os.path.basename(path))[0]] = ([path], lambda p=path: dc.read_csv_with_encoding(p))
+    return {name: (paths, loader) for name, (paths, loader) in sources.items() if all(os.path.exists(p) for p in paths)}
+
+def _signature(paths):
+    """Cheap change signature of source files: path, size and mtime of each."""
+    parts = []
+    for path in paths:
+        st = os.stat(path)
+        parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+def _read_only(action, arg1, arg2, db_name, trigger):
+    return sqlite3.SQLITE_OK if action in READ_ACTIONS else sqlite3.SQLITE_DENY
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class ElectionSQL:
+    """
+    SQLite database over the election tables. Each table is loaded once and
+    reloaded only when its source files change (size/mtime), so queries
+    never parse a CSV or workbook. Queries are read-only: they run on a
+    second connection that refuses writes, so the tables always match their
+    sources. Results are cached per data version in memory and in the
+    database file, so a repeated question is answered without running it
+    again, also from a new process.
+    """
+
+    def __init__(self, path=DB_FILE, data_dir='data', output_dir='.', warehouse_dir=WAREHOUSE_DIR):
+        self.path = path
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.warehouse_dir = warehouse_dir
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS _sources (name TEXT PRIMARY KEY, signature TEXT, rows INTEGER, loaded_at REAL);
+            CREATE TABLE IF NOT EXISTS _query_cache (key TEXT PRIMARY KEY, result TEXT);
+        """)
+        # User statements only; refresh() and the result cache write through conn
+        self.reader = sqlite3.connect(path, check_same_thread=False)
+        self.reader.execute("PRAGMA query_only = ON")
+        self.reader.set_authorizer(_read_only)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.version = None
+        self._checked_at = 0.0
+        self.refresh()
+
+    def refresh(self, force=False):
+        """
+        Reloads the tables whose sources changed (all with force), drops
+        tables whose source is gone and rebuilds the views. Returns the
+        names of the reloaded tables.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            sources = discover_sources(self.data_dir, self.output_dir, self.warehouse_dir)
+            known = dict(self.conn.execute("SELECT name, signature FROM _sources").fetchall())
+            signatures = {name: _signature(paths) for name, (paths, _) in sources.items()}
+            reloaded = [name for name in sources if force or known.get(name) != signatures[name]]
+            removed = [name for name in known if name not in sources]
+            if not reloaded and not removed and self.version is not None:
+                return []
+
+            with self.conn:
+                for name in removed:
+                    self.conn.execute(f"DROP TABLE IF EXISTS {_quote(name)}")
+                    self.conn.execute("DELETE FROM _sources WHERE name = ?", (name,))
+                for name in reloaded:
+                    df = sources[name][1]()
+                    self._load(name, df)
+                    self.conn.execute("INSERT OR REPLACE INTO _sources VALUES (?, ?, ?, ?)",
+                                      (name, signatures[name], len(df), time.time()))
+                self._create_views(set(sources))
+                for name, (sql, needs) in DERIVED.items():
+                    if all(t in sources for t in needs) and (set(needs) & set(reloaded) or not self._exists(name)):
+                        self._load(name, pd.read_sql(sql, self.conn))
+                if reloaded or removed:
+                    self.conn.execute("DELETE FROM _query_cache")
+            self.version = hashlib.sha1(json.dumps(sorted(signatures.items())).encode('utf-8')).hexdigest()[:16]
+            self._cache.clear()
+            return reloaded
+
+    def _load(self, name, df):
+        """Replaces one table and creates its key indexes."""
+        df.to_sql(name, self.conn, if_exists='replace', index=False)
+        for cols in INDEX_COLUMNS:
+            if all(c in df.columns for c in cols):
+                index = _quote(f"ix_{name}_{'_'.join(cols)}")
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {_quote(name)} ({', '.join(map(_quote, cols))})")
+
+    def _exists(self, name):
+        return self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+    def _create_views(self, tables):
+        """Drops every view and creates those of VIEWS whose tables exist."""
+        for (name,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'view'").fetchall():
+            self.conn.execute(f"DROP VIEW {_quote(name)}")
+        for name, (sql, needs) in VIEWS.items():
+            if all(t in tables for t in needs):
+                self.conn.execute(f"CREATE VIEW {name} AS {sql}")
+
+    def tables(self):
+        """Tables and views with their row counts (views: None)."""
+        rows = self.conn.execute(
+            "SELECT m.name, m.type, s.rows FROM sqlite_master m LEFT JOIN _sources s ON s.name = m.name "
+            "WHERE m.type IN ('table', 'view') AND m.name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY m.type, m.name").fetchall()
+        return pd.DataFrame(rows, columns=['name', 'type', 'rows']).astype({'rows': 'Int64'})
+
+    def schema(self, name):
+        rows = self.conn.execute(f"PRAGMA table_info({_quote(name)})").fetchall()
+        return pd.DataFrame([(r[1], r[2]) for r in rows], columns=['column', 'type'])
+
+    def query(self, sql, params=(), cache=True):
+        """
+        Runs one read-only SQL statement and returns a DataFrame; a
+        statement that would write raises sqlite3.DatabaseError. Results are
+        cached until a source table changes; sources are checked at most
+        every VERSION_CHECK_INTERVAL seconds. Returns (DataFrame, cached).
+        """
+        if time.monotonic() - self._checked_at >= VERSION_CHECK_INTERVAL:
+            self.refresh()
+        params = tuple(params)
+        key = hashlib.sha1(json.dumps([self.version, sql.strip(), params], default=str).encode('utf-8')).hexdigest()
+        if cache:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key], True
+                row = self.conn.execute("SELECT result FROM _query_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                payload = json.loads(row[0])
+                df = pd.DataFrame(payload['data'], columns=payload['columns'])
+                self._remember(key, df)
+                return df, True
+
+        with self._lock:
+            cursor = self.reader.execute(sql, params)
+            columns = [d[0] for d in cursor.description] if cursor.description else []
+            rows = cursor.fetchall()
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        if cache:
+            self._remember(key, df)
+            with self._lock, self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO _query_cache VALUES (?, ?)",
+                                  (key, json.dumps({'columns': columns, 'data': [list(r) for r in rows]}, default=str)))
+        return df, False
+
+    def _remember(self, key, df):
+        with self._lock:
+            self._cache[key] = df
+            self._cache.move_to_end(key)
+            while len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def close(self):
+        self.reader.close()
+        self.conn.close()
+
+_default = None
+
+def query(sql, params=(), cache=True):
+    """Runs sql against the shared database (built on first use, refreshed as sources change). Returns a DataFrame."""
+    global _default
+    if _default is None:
+        _default = ElectionSQL()
+    return _default.query(sql, params, cache)[0]
+
+def _print_result(df, elapsed, cached, as_csv):
+    if as_csv:
+        df.to_csv(sys.stdout, index=False)
+    else:
+        print(df.to_string(index=False) if not df.empty else "(no rows)")
+    print(f"({len(df)} rows, {elapsed * 1000:.1f} ms{', cached' if cached else ''})", file=sys.stderr)
+
+def _statements(lines):
+    """Splits input lines into complete SQL statements (a ';' inside a string does not end one)."""
+    buffer = ''
+    for line in lines:
+        *pieces, rest = line.split(';')
+        for piece in pieces:
+            buffer += piece + ';'
+            if sqlite3.complete_statement(buffer):
+                yield buffer
+                buffer = ''
+        buffer += rest
+    if buffer.strip():
+        yield buffer
+
+def _run(db, statement, args):
+    start = time.perf_counter()
+    try:
+        df, cached = db.query(statement, cache=not args.no_cache)
+    except sqlite3.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return
+    _print_result(df, time.perf_counter() - start, cached, args.csv)
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the election tables with SQL (SQLite, see --tables).")
+    parser.add_argument('sql', nargs='?', help="Statement to run; without it statements are read from stdin, one per ';'")
+    parser.add_argument('--tables', action='store_true', help="List tables and views")
+    parser.add_argument('--schema', metavar='TABLE', help="Show the columns of a table")
+    parser.add_argument('--rebuild', action='store_true', help="Reload every table")
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--csv', action='store_true', help="Print results as CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    db = ElectionSQL()
+    reloaded = db.refresh(force=True) if args.rebuild else []
+    if reloaded:
+        print(f"Reloaded {len(reloaded)} tables in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+    if args.tables:
+        print(db.tables().to_string(index=False))
+        return
+    if args.schema:
+        print(db.schema(args.schema).to_string(index=False))
+        return
+
+    if args.sql:
+        _run(db, args.sql, args)
+        return
+    if sys.stdin.isatty():
+        print("Enter SQL statements ending with ';' (Ctrl-D to quit).", file=sys.stderr)
+    for statement in _statements(sys.stdin):
+        _run(db, statement, args)
+
+if __name__ == "__main__":
+    main()
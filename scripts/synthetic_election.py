@@ -0,0 +1,389 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.ect_decoders import read_json
+    from scripts.nowcast import PRIOR_PARTIES
+except ImportError:
+    from ect_decoders import read_json
+    from nowcast import PRIOR_PARTIES
+
+RAW_DIR = os.path.join('data', 'raw')
+
+# Preset sizes: the 2569 general election, and a provincial and a local
+# (municipal / subdistrict) election with many more, smaller units
+SCALES = {
+    'national': {'districts': 400, 'parties': 57, 'candidates': 9},
+    'provincial': {'districts': 4000, 'parties': 30, 'candidates': 6},
+    'local': {'districts': 20000, 'parties': 12, 'candidates': 4},
+}
+YEARS = (2566, 2569)
+
+# Name of a party in earlier elections (the workbooks), e.g. ประชาชน -> ก้าวไกล
+PREDECESSORS = {new: old for old, new in PRIOR_PARTIES.items() if old != new}
+OTHER_COLUMN = 'อื่นๆ'
+
+TITLES = ['นาย', 'นาง', 'นางสาว']
+FIRST_NAMES = ['สมชาย', 'สมศักดิ์', 'วิชัย', 'ประเสริฐ', 'สุรชัย', 'อนุชา', 'ธนพล', 'กิตติ', 'ณัฐวุฒิ', 'พรทิพย์',
+               'สุนีย์', 'มาลี', 'วรรณา', 'จิราพร', 'ศิริพร', 'อรุณี', 'ปิยะ', 'ชัยวัฒน์', 'ธีระ', 'รัชนี']
+LAST_NAMES = ['ใจดี', 'ศรีสุข', 'วงศ์ใหญ่', 'บุญมา', 'แก้วมณี', 'ทองคำ', 'สุขสวัสดิ์', 'พรหมมา', 'จันทร์เพ็ญ', 'รัตนพันธ์',
+              'ศักดิ์ดี', 'มีสุข', 'ปัญญาดี', 'เรืองศรี', 'อินทร์แก้ว', 'บุญเรือง', 'สายทอง', 'นาคประเสริฐ', 'ชัยมงคล', 'เพชรรัตน์']
+
+def write_json(path, doc):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(doc, f, ensure_ascii=False)
+
+def load_templates(raw_dir=RAW_DIR):
+    """
+    The real feed files used as templates: provinces (names, ids, size),
+    parties (ids, names and national strength from stats_party) and the
+    referendum question.
+    Returns (provinces, parties, referendum_info).
+    """
+    provinces = pd.DataFrame(read_json(os.path.join(raw_dir, 'info_province.txt'))['province'])
+    provinces = provinces.sort_values('total_registered_vote', ascending=False, kind='stable').reset_index(drop=True)
+    parties = pd.DataFrame(read_json(os.path.join(raw_dir, 'info_party_overview.txt')))
+    votes = {p['party_id']: p['party_vote'] for p in read_json(os.path.join(raw_dir, 'stats_party.txt'))['result_party']}
+    parties['strength'] = parties['id'].astype(int).map(votes).fillna(0).clip(lower=1000).astype(float)
+    parties = parties.sort_values('strength', ascending=False, kind='stable').reset_index(drop=True)
+    return provinces, parties, read_json(os.path.join(raw_dir, 'info_referendum.txt'))
+
+def allocate_districts(weights, n):
+    """
+    Splits n districts over units in proportion to weights (largest
+    remainder), at least one each. With fewer districts than units only the
+    first n units get one.
+    """
+    weights = np.asarray(weights, dtype=float)
+    if n <= len(weights):
+        return np.array([1] * n + [0] * (len(weights) - n))
+    quota = weights / weights.sum() * (n - len(weights))
+    alloc = np.floor(quota).astype(int)
+    order = np.argsort(-(quota - alloc), kind='stable')
+    alloc[order[:n - len(weights) - alloc.sum()]] += 1
+    return alloc + 1
+
+def select_parties(parties, n, rng):
+    """
+    The n strongest template parties; beyond the template, minor parties
+    with new ids and strengths drawn from the template's tail.
+    """
+    if n <= len(parties):
+        return parties.head(n).reset_index(drop=True)
+    extra = n - len(parties)
+    first_id = parties['id'].astype(int).max() + 1
+    tail = parties['strength'].tail(10).to_numpy()
+    added = pd.DataFrame({
+        'id': [str(first_id + i) for i in range(extra)],
+        'party_no': [str(len(parties) + i + 1) for i in range(extra)],
+        'name': [f"พรรคทดสอบ{i + 1}" for i in range(extra)],
+        'abbr': None, 'color': '#888888', 'logo_url': None,
+        'strength': rng.choice(tail, extra) * rng.uniform(0.2, 1.0, extra),
+    })
+    return pd.concat([parties, added], ignore_index=True)
+
+def build_units(provinces, n_districts, rng):
+    """
+    One row per district: cons_id, cons_no, prov_id, province, registered,
+    stations and the amphoes it covers (const_dataset layout).
+    Returns (units, composition).
+    """
+    alloc = allocate_districts(provinces['total_registered_vote'], n_districts)
+    rows, composition = [], []
+    for (_, prov), n in zip(provinces.iterrows(), alloc):
+        if n == 0:
+            continue
+        mean = prov['total_registered_vote'] / n
+        registered = np.maximum(rng.normal(mean, 0.12 * mean, n).round().astype(int), 100)
+        # Amphoes of the province; a district covers one or two of them
+        n_amphoe = max(1, int(round(n * 0.8)))
+        for i in range(n):
+            rows.append({
+                'cons_id': f"{prov['prov_id']}_{i + 1}", 'cons_no': i + 1,
+                'prov_id': prov['prov_id'], 'province': prov['province'],
+                'registered': int(registered[i]), 'stations': max(1, int(registered[i] // 550)),
+            })
+            if n == 1:
+                composition.append({'จังหวัด': prov['province'], 'เขต': 1, 'อำเภอ': None})
+                continue
+            for a in sorted({i % n_amphoe, (i + int(rng.integers(0, 2))) % n_amphoe}):
+                composition.append({'จังหวัด': prov['province'], 'เขต': i + 1, 'อำเภอ': f"อำเภอที่ {a + 1}"})
+    composition = pd.DataFrame(composition, columns=['จังหวัด', 'เขต', 'อำเภอ'])
+    composition['ตำบล'] = None
+    composition['flag'] = None
+    composition['optional'] = None
+    return pd.DataFrame(rows), composition
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    e = np.exp(scores)
+    return e / e.sum(axis=1, keepdims=True)
+
+def _ballots(rng, registered, rate, invalid_rate, blank_rate):
+    """voters_used, invalid, blank and valid ballots per district."""
+    used = rng.binomial(registered, np.clip(rate, 0.05, 0.98))
+    invalid = rng.binomial(used, invalid_rate)
+    blank = rng.binomial(used - invalid, blank_rate)
+    return used, invalid, blank, used - invalid - blank
+
+def _ranks(votes):
+    """1 = most votes per row; ties keep ballot order."""
+    order = np.argsort(-votes, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, votes.shape[1] + 1)[None, :], axis=1)
+    return ranks
+
+def simulate_year(units, parties, n_candidates, effects, rng):
+    """
+    Votes of one election. A party's share in a district mixes its national
+    strength, a persistent province effect, a swing of the year and district
+    noise; candidates add a personal vote on top of their party's.
+    Returns dict of arrays (one row per district).
+    """
+    D, P = len(units), len(parties)
+    registered = units['registered'].to_numpy()
+    prov_idx = effects['prov_idx']
+    scores = (np.log(parties['strength'].to_numpy())[None, :] + effects['province'][prov_idx]
+              + rng.normal(0, 0.3, P)[None, :] + rng.normal(0, 0.35, (D, P)))
+    rate = rng.normal(0.68, 0.05) + effects['turnout'][prov_idx] + rng.normal(0, 0.03, D)
+
+    used, invalid, blank, valid = _ballots(rng, registered, rate, 0.03, 0.02)
+    # Party-list ballots: nearly the same voters, with their own spoiled/blank counts
+    pl_used = np.clip(used + rng.integers(-50, 51, D), 0, registered)
+    pl_invalid = rng.binomial(pl_used, 0.025)
+    pl_blank = rng.binomial(pl_used - pl_invalid, 0.015)
+    pl_valid = pl_used - pl_invalid - pl_blank
+    party_votes = rng.multinomial(pl_valid, _softmax(scores))
+
+    # Parties fielding a candidate: weighted sample without replacement (Gumbel top-k)
+    keys = 0.5 * np.log(parties['strength'].to_numpy())[None, :] + rng.gumbel(size=(D, P))
+    fielded = np.argsort(-keys, axis=1, kind='stable')[:, :n_candidates]
+    cand_scores = np.take_along_axis(scores, fielded, axis=1) + rng.normal(0, 0.3, fielded.shape)
+    cand_votes = rng.multinomial(valid, _softmax(cand_scores))
+
+    rfd_used, rfd_invalid, _, rfd_valid = _ballots(rng, registered, rate - 0.03, 0.025, 0.0)
+    yes_rate = np.clip(rng.normal(0.6, 0.04) + effects['referendum'][prov_idx] + rng.normal(0, 0.04, D), 0.05, 0.95)
+    referendum = rng.multinomial(rfd_valid, np.column_stack([yes_rate * 0.9, (1 - yes_rate) * 0.9, np.full(D, 0.1)]))
+    return {
+        'used': used, 'invalid': invalid, 'blank': blank, 'valid': valid,
+        'pl_used': pl_used, 'pl_invalid': pl_invalid, 'pl_blank': pl_blank, 'pl_valid': pl_valid,
+        'party_votes': party_votes, 'fielded': fielded, 'cand_votes': cand_votes, 'cand_ranks': _ranks(cand_votes),
+        'rfd_used': rfd_used, 'rfd_invalid': rfd_invalid, 'rfd_valid': rfd_valid, 'referendum': referendum,
+    }
+
+def candidate_names(n, rng):
+    return [f"{t}{f} {l}" for t, f, l in zip(rng.choice(TITLES, n), rng.choice(FIRST_NAMES, n), rng.choice(LAST_NAMES, n))]
+
+def _pct(num, den):
+    return round(100.0 * num / den, 5) if den else 0.0
+
+def write_feed(raw_dir, units, provinces, parties, sim, referendum_info, rng):
+    """Writes the ECT feed files (info_*, stats_cons, stats_party, stat_referendum) of one election."""
+    os.makedirs(raw_dir, exist_ok=True)
+    party_ids = parties['id'].astype(int).to_numpy()
+    cons_ids = units['cons_id'].tolist()
+    D, C = sim['fielded'].shape
+    names = candidate_names(D * C, rng)
+    referendum_id = referendum_info['questions_info'][0]['questions'][0]['referendum_id']
+    used_provinces = provinces[provinces['prov_id'].isin(units['prov_id'])]
+
+    write_json(os.path.join(raw_dir, 'info_party_overview.txt'),
+               parties.drop(columns='strength').astype(object).where(parties.notna(), None).to_dict('records'))
+    write_json(os.path.join(raw_dir, 'info_constituency.txt'), [
+        {'cons_id': u.cons_id, 'cons_no': u.cons_no, 'prov_id': u.prov_id,
+         'total_vote_stations': u.stations, 'registered_vote': u.registered}
+        for u in units.itertuples()])
+    by_prov = units.groupby('prov_id', sort=False).agg(stations=('stations', 'sum'), registered=('registered', 'sum'))
+    write_json(os.path.join(raw_dir, 'info_province.txt'), {
+        'total_registered_vote': int(units['registered'].sum()),
+        'total_vote_stations': int(units['stations'].sum()),
+        'province': [dict(p, total_vote_stations=int(by_prov.at[p['prov_id'], 'stations']),
+                          total_registered_vote=int(by_prov.at[p['prov_id'], 'registered']))
+                     for p in used_provinces.to_dict('records')],
+    })
+    write_json(os.path.join(raw_dir, 'info_mp_candidate.txt'), [
+        {'mp_app_id': f"{cons_ids[d]}_{c + 1}", 'mp_app_no': c + 1,
+         'mp_app_party_id': int(party_ids[sim['fielded'][d, c]]), 'mp_app_name': names[d * C + c], 'image_url': None}
+        for d in range(D) for c in range(C)])
+    write_json(os.path.join(raw_dir, 'info_referendum.txt'), referendum_info)
+
+    # stats_cons: ballots, candidates and party-list votes per constituency
+    constituencies = []
+    for d in range(D):
+        constituencies.append({
+            'cons_id': cons_ids[d],
+            'turn_out': int(sim['used'][d]), 'valid_votes': int(sim['valid'][d]),
+            'invalid_votes': int(sim['invalid'][d]), 'blank_votes': int(sim['blank'][d]),
+            'party_list_turn_out': int(sim['pl_used'][d]), 'party_list_valid_votes': int(sim['pl_valid'][d]),
+            'party_list_invalid_votes': int(sim['pl_invalid'][d]), 'party_list_blank_votes': int(sim['pl_blank'][d]),
+            'counted_vote_stations': int(units['stations'].iat[d]), 'percent_count': 100.0,
+            'candidates': [{'mp_app_id': f"{cons_ids[d]}_{c + 1}", 'party_id': int(party_ids[sim['fielded'][d, c]]),
+                            'mp_app_vote': int(sim['cand_votes'][d, c]), 'mp_app_rank': int(sim['cand_ranks'][d, c])}
+                           for c in range(C)],
+            'result_party': [{'party_id': int(pid), 'party_list_vote': int(v)}
+                             for pid, v in zip(party_ids, sim['party_votes'][d])],
+        })
+    prov_of = units['prov_id'].tolist()
+    result_province = {}
+    for d, cons in enumerate(constituencies):
+        result_province.setdefault(prov_of[d], []).append(cons)
+    total_stations = int(units['stations'].sum())
+    write_json(os.path.join(raw_dir, 'stats_cons.txt'), {
+        'counted_vote_stations': total_stations, 'percent_count': 100.0,
+        'result_province': [{'prov_id': p, 'counted_vote_stations': sum(c['counted_vote_stations'] for c in cons),
+                             'percent_count': 100.0, 'constituencies': cons}
+                            for p, cons in result_province.items()],
+    })
+
+    # stats_party: national totals per party with its candidates
+    winners = np.zeros(len(party_ids), dtype=int)
+    np.add.at(winners, sim['fielded'][sim['cand_ranks'] == 1], 1)
+    pl_total = int(sim['pl_valid'].sum())
+    cand_total = int(sim['valid'].sum())
+    candidates = {pid: [] for pid in party_ids}
+    for d in range(D):
+        valid = sim['valid'][d]
+        for c in range(C):
+            pid = int(party_ids[sim['fielded'][d, c]])
+            votes = int(sim['cand_votes'][d, c])
+            candidates[pid].append({'mp_app_id': f"{cons_ids[d]}_{c + 1}", 'mp_app_vote': votes,
+                                    'mp_app_vote_percent': _pct(votes, valid),
+                                    'mp_app_rank': int(sim['cand_ranks'][d, c]), 'party_id': pid})
+    party_totals = sim['party_votes'].sum(axis=0)
+    mp_totals = np.zeros(len(party_ids), dtype=np.int64)
+    np.add.at(mp_totals, sim['fielded'].ravel(), sim['cand_votes'].ravel())
+    write_json(os.path.join(raw_dir, 'stats_party.txt'), {
+        'counted_vote_stations': total_stations, 'percent_count': 100.0,
+        'result_party': [{'party_id': int(pid), 'party_vote': int(party_totals[i]),
+                          'party_vote_percent': _pct(party_totals[i], pl_total), 'party_list_count': None,
+                          'mp_app_vote': int(mp_totals[i]), 'mp_app_vote_percent': _pct(mp_totals[i], cand_total),
+                          'first_mp_app_count': int(winners[i]), 'candidates': candidates[int(pid)]}
+                         for i, pid in enumerate(party_ids)],
+    })
+
+    # stat_referendum: the same three answers per constituency and province
+    def referendum_block(used, valid, invalid, stations, answers):
+        yes, no, abstained = (int(x) for x in answers)
+        return {
+            'referendum_turn_out': int(used), 'referendum_valid_votes': int(valid),
+            'referendum_invalid_votes': int(invalid), 'referendum_counted_vote_stations': int(stations),
+            'referendum_percent_count': 100.0, 'pause_report': False,
+            'referendum_results': {referendum_id: {
+                'yes': yes, 'no': no, 'abstained': abstained,
+                'percent_yes': _pct(yes, valid), 'percent_no': _pct(no, valid), 'percent_abstained': _pct(abstained, valid)}},
+        }
+    blocks = [dict(cons_id=cons_ids[d], **referendum_block(sim['rfd_used'][d], sim['rfd_valid'][d], sim['rfd_invalid'][d],
+                                                           units['stations'].iat[d], sim['referendum'][d]))
+              for d in range(D)]
+    provinces_rfd = []
+    for prov_id, idx in units.groupby('prov_id', sort=False).indices.items():
+        block = referendum_block(sim['rfd_used'][idx].sum(), sim['rfd_valid'][idx].sum(), sim['rfd_invalid'][idx].sum(),
+                                 units['stations'].iloc[idx].sum(), sim['referendum'][idx].sum(axis=0))
+        provinces_rfd.append(dict(prov_id=prov_id, **block, constituencies=[blocks[i] for i in idx]))
+    write_json(os.path.join(raw_dir, 'stat_referendum.txt'), dict(
+        **referendum_block(sim['rfd_used'].sum(), sim['rfd_valid'].sum(), sim['rfd_invalid'].sum(),
+                           total_stations, sim['referendum'].sum(axis=0)),
+        result_province=provinces_rfd))
+
+def write_workbook(path, year, units, parties, sim, rng):
+    """
+    Writes the 2566-style workbook of one election: constituency_<year>,
+    candidate_<year> and partylist_by_constituency_<year>, with party names
+    as they were before later renames.
+    """
+    names = parties['name'].map(lambda n: PREDECESSORS.get(n, n)).to_numpy()
+    D, C = sim['fielded'].shape
+    constituency = pd.DataFrame({
+        'จังหวัด': units['province'], 'เขต': units['cons_no'], 'ผู้มีสิทธิ': units['registered'],
+        'ผู้มาใช้สิทธิ': sim['used'], 'บัตรดี': sim['valid'], 'บัตรเสีย': sim['invalid'],
+        'บัตรไม่เลือกผู้ใด': sim['blank'],
+        'key': units['province'] + "-" + units['cons_no'].astype(str),
+    })
+    # Candidates in district order, best first, as in the published sheet
+    order = np.argsort(sim['cand_ranks'], axis=1, kind='stable')
+    candidate = pd.DataFrame({
+        'province': np.repeat(units['province'].to_numpy(), C),
+        'province_number': np.repeat(units['cons_no'].to_numpy(), C),
+        'name': candidate_names(D * C, rng),
+        'party': names[np.take_along_axis(sim['fielded'], order, axis=1)].ravel(),
+        'scores': np.take_along_axis(sim['cand_votes'], order, axis=1).ravel(),
+    })
+    partylist = pd.DataFrame({
+        'จังหวัด': units['province'], 'เขต': units['cons_no'], 'ผู้มีสิทธิ': units['registered'],
+        'ผู้มาใช้สิทธิ': sim['pl_used'], 'บัตรเสีย': sim['pl_invalid'], 'ไม่เลือกผู้ใด': sim['pl_blank'],
+    })
+    listed = np.zeros(len(names), dtype=bool)
+    for col in PRIOR_PARTIES:
+        match = names == col
+        listed |= match
+        partylist[col] = sim['party_votes'][:, match].sum(axis=1)
+    partylist[OTHER_COLUMN] = sim['party_votes'][:, ~listed].sum(axis=1)
+    with pd.ExcelWriter(path) as writer:
+        constituency.to_excel(writer, sheet_name=f'constituency_{year}', index=False)
+        candidate.to_excel(writer, sheet_name=f'candidate_{year}', index=False)
+        partylist.to_excel(writer, sheet_name=f'partylist_by_constituency_{year}', index=False)
+
+def generate(out_dir, districts=400, parties=57, candidates=9, years=YEARS, seed=0, raw_dir=RAW_DIR):
+    """
+    Writes a synthetic election history under out_dir/data in the layout of
+    the real data directory: the ECT feed (data/raw/*.txt) of the latest
+    year, a workbook per earlier year (data/คะแนนเลือกตั้ง<year>.xlsx) and
+    the district -> amphoe composition of every year. Districts and party
+    effects are the same across years, so results of different years are
+    correlated like real ones. Returns dict with the sizes written.
+    """
+    rng = np.random.default_rng(seed)
+    provinces, party_template, referendum_info = load_templates(raw_dir)
+    party_table = select_parties(party_template, parties, rng)
+    candidates = min(candidates, len(party_table))
+    units, composition = build_units(provinces, districts, rng)
+    prov_idx = units['prov_id'].map({p: i for i, p in enumerate(provinces['prov_id'])}).to_numpy()
+    effects = {
+        'prov_idx': prov_idx,
+        'province': rng.normal(0, 0.5, (len(provinces), len(party_table))),
+        'turnout': rng.normal(0, 0.04, len(provinces)),
+        'referendum': rng.normal(0, 0.06, len(provinces)),
+    }
+
+    data_dir = os.path.join(out_dir, 'data')
+    years = sorted(years)
+    for year in years:
+        sim = simulate_year(units, party_table, candidates, effects, rng)
+        comp_dir = os.path.join(data_dir, 'ECT Constituencies', str(year))
+        os.makedirs(comp_dir, exist_ok=True)
+        composition.to_csv(os.path.join(comp_dir, 'const_dataset.csv'), index=False)
+        if year == years[-1]:
+            write_feed(os.path.join(data_dir, 'raw'), units, provinces, party_table, sim, referendum_info, rng)
+        else:
+            write_workbook(os.path.join(data_dir, f'คะแนนเลือกตั้ง{year}.xlsx'), year, units, party_table, sim, rng)
+    return {
+        'districts': len(units), 'provinces': units['prov_id'].nunique(), 'parties': len(party_table),
+        'candidates': len(units) * candidates, 'years': years,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic election in the layout of the data directory.")
+    parser.add_argument('out_dir')
+    parser.add_argument('--scale', choices=list(SCALES), default='national')
+    parser.add_argument('--districts', type=int, help="Overrides the scale preset")
+    parser.add_argument('--parties', type=int, help="Overrides the scale preset")
+    parser.add_argument('--candidates', type=int, help="Candidates per district; overrides the scale preset")
+    parser.add_argument('--years', type=int, nargs='+', default=list(YEARS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--raw-dir', default=RAW_DIR, help="Real feed files used as templates")
+    args = parser.parse_args()
+
+    size = dict(SCALES[args.scale])
+    for name in size:
+        if getattr(args, name) is not None:
+            size[name] = getattr(args, name)
+    info = generate(args.out_dir, years=args.years, seed=args.seed, raw_dir=args.raw_dir, **size)
+    print(f"Generated {info['districts']} districts in {info['provinces']} provinces, {info['parties']} parties, "
+          f"{info['candidates']} candidates per year, years {info['years']} in {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
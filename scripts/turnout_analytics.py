@@ -0,0 +1,170 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.build_cube import TURNOUT_CUBE
+    from scripts.data_cache import read_csv_with_encoding
+except ImportError:
+    from build_cube import TURNOUT_CUBE
+    from data_cache import read_csv_with_encoding
+
+MEASURES = ['eligible_voters', 'voters_used']
+
+# Level -> columns that identify a unit at that level
+LEVELS = {
+    'region': ['region'],
+    'province': ['region', 'province'],
+    'amphoe': ['region', 'province', 'amphoe'],
+    'district': ['region', 'province', 'district_id', 'district_number', 'district_label'],
+}
+# Amphoe label of single-district provinces, whose composition lists no amphoe
+WHOLE_PROVINCE = 'ทั้งจังหวัด'
+
+def safe_rate(num, den):
+    """num / den, NaN where den is missing or zero."""
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    out = np.full(num.shape, np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+def top_k_indices(values, k, largest=True):
+    """
+    Positions of the k largest (or smallest) values, best first. NaNs are
+    never selected. np.partition finds the k-th value in linear time, so
+    only the k selected are sorted; ties keep their original order, as in
+    a stable full sort.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    k = min(k, len(valid))
+    if k <= 0:
+        return np.array([], dtype=int)
+    v = -values[valid] if largest else values[valid]
+    if k < len(valid):
+        # The k-th value; of the values tied with it, the first ones are kept
+        cut = np.partition(v, k - 1)[k - 1]
+        below = np.flatnonzero(v < cut)
+        part = np.concatenate([below, np.flatnonzero(v == cut)[:k - len(below)]])
+    else:
+        part = np.arange(len(valid))
+    return valid[part[np.argsort(v[part], kind='stable')]]
+
+def rollup(df, keys, weights=None):
+    """
+    Sums eligible_voters/voters_used per unit of keys (optionally weighted
+    per row) and adds turnout_rate. Returns DataFrame with: keys, measures,
+    turnout_rate.
+    """
+    codes, uniques = pd.MultiIndex.from_frame(df[keys]).factorize()
+    w = np.ones(len(df)) if weights is None else np.asarray(weights, dtype=float)
+    out = pd.DataFrame(list(uniques), columns=keys)
+    for col in MEASURES:
+        sums = np.bincount(codes, weights=np.nan_to_num(df[col].to_numpy(dtype=float)) * w, minlength=len(uniques))
+        # Unweighted sums of integer counts stay integers
+        out[col] = sums.astype(df[col].dtype) if weights is None else sums
+    out['turnout_rate'] = safe_rate(out['voters_used'], out['eligible_voters'])
+    return out
+
+def load_amphoe_composition(year=2569, data_dir='data'):
+    """
+    District -> amphoe pieces from the ECT const_dataset.csv of a year.
+    A district can hold whole amphoes or only some tambons of one (flags
+    เฉพาะ/ยกเว้น), and votes are only counted per district, so each district's
+    counts are split equally over the amphoes it touches; an amphoe rate is
+    then the weighted mix of its districts.
+    Returns DataFrame with: province, district_number, amphoe, weight.
+    """
+    path = os.path.join(data_dir, 'ECT Constituencies', str(year), 'const_dataset.csv')
+    comp = read_csv_with_encoding(path).rename(columns={'จังหวัด': 'province', 'เขต': 'district_number', 'อำเภอ': 'amphoe'})
+    comp['amphoe'] = comp['amphoe'].fillna(WHOLE_PROVINCE).str.strip()
+    comp = comp.drop_duplicates(['province', 'district_number', 'amphoe'])[['province', 'district_number', 'amphoe']]
+    comp['weight'] = 1.0 / comp.groupby(['province', 'district_number'])['amphoe'].transform('size')
+    return comp.reset_index(drop=True)
+
+class TurnoutRanking:
+    """
+    Turnout of one year and ballot at every level. Rates are computed once
+    per level at construction; top_bottom() then selects with a partition,
+    so any k or level costs a linear pass and a sort of k rows, with no
+    re-sorting of the full table.
+    """
+
+    def __init__(self, districts, composition=None):
+        """
+        districts: one row per district with LEVELS['district'] columns and
+        the measures. composition: load_amphoe_composition() output, needed
+        for the amphoe level.
+        """
+        districts = districts.copy()
+        districts['turnout_rate'] = safe_rate(districts['voters_used'], districts['eligible_voters'])
+        self.units = {'district': districts.reset_index(drop=True)}
+        for level in ('region', 'province'):
+            self.units[level] = rollup(districts, LEVELS[level])
+        if composition is not None:
+            pieces = districts.assign(district_number=districts['district_number'].astype(float)).merge(
+                composition.assign(district_number=composition['district_number'].astype(float)),
+                on=['province', 'district_number'])
+            self.units['amphoe'] = rollup(pieces, LEVELS['amphoe'], pieces['weight'])
+        self.rates = {level: units['turnout_rate'].to_numpy() for level, units in self.units.items()}
+
+    @property
+    def levels(self):
+        return list(self.units)
+
+    def level(self, level):
+        """Every unit of a level with its measures and rate, in source order."""
+        return self.units.get(level, pd.DataFrame())
+
+    def top_bottom(self, level='district', k=10):
+        """Returns (top_k, bottom_k) units by turnout_rate; bottom_k is lowest first."""
+        units = self.units.get(level)
+        if units is None:
+            return pd.DataFrame(), pd.DataFrame()
+        rates = self.rates[level]
+        return (units.iloc[top_k_indices(rates, k, largest=True)],
+                units.iloc[top_k_indices(rates, k, largest=False)])
+
+    def ranked(self, level='region'):
+        """Every unit of a level, highest turnout first."""
+        return self.top_bottom(level, len(self.rates.get(level, [])))[0]
+
+def load_rankings(data_dir='data'):
+    """
+    TurnoutRanking per (year, ballot_code) from the district rows of the
+    aggregate cube (CONS, PARTY and RFD). Amphoe levels use the const_dataset
+    of the same year where present.
+    """
+    cube = read_csv_with_encoding(os.path.join(data_dir, TURNOUT_CUBE))
+    districts = cube[cube['level'] == 'district']
+    rankings = {}
+    for year, by_year in districts.groupby('year'):
+        try:
+            composition = load_amphoe_composition(year, data_dir)
+        except FileNotFoundError:
+            composition = None
+        for ballot_code, grp in by_year.groupby('ballot_code'):
+            rankings[(year, ballot_code)] = TurnoutRanking(grp[LEVELS['district'] + MEASURES], composition)
+    return rankings
+
+def main():
+    parser = argparse.ArgumentParser(description="Top/bottom turnout units at any level.")
+    parser.add_argument('--level', default='amphoe', choices=list(LEVELS))
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--year', type=int, default=2569)
+    parser.add_argument('--ballot', default='CONS')
+    args = parser.parse_args()
+
+    ranking = load_rankings()[(args.year, args.ballot)]
+    top, bottom = ranking.top_bottom(args.level, args.k)
+    cols = LEVELS[args.level] + ['turnout_rate']
+    print(f"Top {args.k} {args.level} ({args.year} {args.ballot}):")
+    print(top[cols].to_string(index=False))
+    print(f"\nBottom {args.k} {args.level}:")
+    print(bottom[cols].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
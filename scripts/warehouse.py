@@ -0,0 +1,428 @@
+import argparse
+import json
+import operator
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.data_cache import read_csv_with_encoding
+except ImportError:
+    from data_cache import read_csv_with_encoding
+
+WAREHOUSE_DIR = os.path.join('data', 'warehouse')
+MANIFEST_FILE = '_manifest.json'
+WORKBOOK_2566 = os.path.join('data', 'คะแนนเลือกตั้ง2566.xlsx')
+# Party columns of partylist_by_constituency_2566 (อื่นๆ is an aggregate and left out)
+PARTY_COLUMNS_2566 = ['ก้าวไกล', 'เพื่อไทย', 'ประชาธิปัตย์', 'ภูมิใจไทย', 'พลังประชารัฐ', 'รวมไทยสร้างชาติ']
+
+# Every table is partitioned by these columns: <table>/year=<y>/ballot_code=<b>/
+PARTITION_BY = ['year', 'ballot_code']
+# Rows per part file; parts are the unit skipped by min/max statistics
+ROWS_PER_PART = 2048
+
+# Table -> column dtypes; rows inside a partition are sorted by SORT_BY so
+# the per-part province ranges are narrow and prune well
+TABLES = {
+    'votes': {
+        'year': 'int64', 'ballot_code': 'str', 'key': 'str', 'province': 'str',
+        'district_number': 'int64', 'party': 'str', 'votes': 'int64',
+    },
+    'turnout': {
+        'year': 'int64', 'ballot_code': 'str', 'key': 'str', 'province': 'str',
+        'district_number': 'int64', 'eligible_voters': 'float64', 'voters_used': 'int64',
+        'invalid_votes': 'int64', 'no_vote': 'int64',
+    },
+}
+SORT_BY = ['province', 'district_number']
+
+OPS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt,
+    '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+# --- Source readers (one per table and election) ---
+
+def votes_2569(data_dir='data'):
+    """Candidate and party votes of the 2569 masters (district rows only)."""
+    votes = read_csv_with_encoding(os.path.join(data_dir, 'm_votes_master.csv'))
+    votes = votes[votes['district_number'] > 0]
+    return pd.DataFrame({
+        'year': votes['year'],
+        'ballot_code': votes['ballot_code'],
+        'key': votes['province'] + "_" + votes['district_number'].astype(str),
+        'province': votes['province'],
+        'district_number': votes['district_number'],
+        'party': votes['party_name'],
+        'votes': votes['votes'],
+    })
+
+def votes_2566(data_dir='data'):
+    """Candidate votes and the party-list votes of the main parties from the 2566 workbook."""
+    workbook = os.path.join(data_dir, os.path.basename(WORKBOOK_2566))
+    cand = pd.read_excel(workbook, sheet_name='candidate_2566')
+    cons = pd.DataFrame({
+        'year': 2566,
+        'ballot_code': 'CONS',
+        'key': cand['province'] + "_" + cand['province_number'].astype(str),
+        'province': cand['province'],
+        'district_number': cand['province_number'],
+        'party': cand['party'],
+        'votes': cand['scores'],
+    })
+
+    pl = pd.read_excel(workbook, sheet_name='partylist_by_constituency_2566')
+    pl = pl.melt(id_vars=['จังหวัด', 'เขต'], value_vars=PARTY_COLUMNS_2566, var_name='party', value_name='votes')
+    party = pd.DataFrame({
+        'year': 2566,
+        'ballot_code': 'PARTY',
+        'key': pl['จังหวัด'] + "_" + pl['เขต'].astype(str),
+        'province': pl['จังหวัด'],
+        'district_number': pl['เขต'],
+        'party': pl['party'],
+        'votes': pl['votes'],
+    })
+    return pd.concat([cons, party], ignore_index=True)
+
+def turnout_2569(data_dir='data'):
+    """Turnout rows of the 2569 masters (district rows only)."""
+    turnout = read_csv_with_encoding(os.path.join(data_dir, 'm_turnout_master.csv'))
+    turnout = turnout[turnout['district_number'] > 0].copy()
+    turnout['key'] = turnout['province'] + "_" + turnout['district_number'].astype(str)
+    return turnout[list(TABLES['turnout'])]
+
+def turnout_2566(data_dir='data'):
+    """Turnout rows of both ballots from the 2566 workbook."""
+    workbook = os.path.join(data_dir, os.path.basename(WORKBOOK_2566))
+    cons = pd.read_excel(workbook, sheet_name='constituency_2566')
+    pl = pd.read_excel(workbook, sheet_name='partylist_by_constituency_2566')
+    frames = []
+    for ballot_code, sheet, no_vote in (('CONS', cons, 'บัตรไม่เลือกผู้ใด'), ('PARTY', pl, 'ไม่เลือกผู้ใด')):
+        frames.append(pd.DataFrame({
+            'year': 2566,
+            'ballot_code': ballot_code,
+            'key': sheet['จังหวัด'] + "_" + sheet['เขต'].astype(str),
+            'province': sheet['จังหวัด'],
+            'district_number': sheet['เขต'],
+            'eligible_voters': sheet['ผู้มีสิทธิ'],
+            'voters_used': sheet['ผู้มาใช้สิทธิ'],
+            'invalid_votes': sheet['บัตรเสีย'],
+            'no_vote': sheet[no_vote],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+# (table, year) -> source reader; a new election is one more reader here
+SOURCES = {
+    ('votes', 2569): votes_2569,
+    ('votes', 2566): votes_2566,
+    ('turnout', 2569): turnout_2569,
+    ('turnout', 2566): turnout_2566,
+}
+
+# Files each source reader reads (relative to data_dir); their size and
+# mtime are recorded in the manifest to tell when a partition is stale
+SOURCE_FILES = {
+    ('votes', 2569): ['m_votes_master.csv'],
+    ('votes', 2566): [os.path.basename(WORKBOOK_2566)],
+    ('turnout', 2569): ['m_turnout_master.csv'],
+    ('turnout', 2566): [os.path.basename(WORKBOOK_2566)],
+}
+
+def source_signature(table, year, data_dir='data'):
+    """{file: [size, mtime_ns]} of a reader's source files, or None if one is missing."""
+    signature = {}
+    for name in SOURCE_FILES[(table, year)]:
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        signature[name] = [st.st_size, st.st_mtime_ns]
+    return signature
+
+def _source_years(table, year=None):
+    """Years with a source reader for table, limited to year (an int or a list; None = all)."""
+    years = [y for (t, y) in SOURCES if t == table]
+    if year is not None:
+        wanted = set(year) if isinstance(year, (list, tuple, set)) else {year}
+        years = [y for y in years if y in wanted]
+    return years
+
+def conform(df, table):
+    """Casts df to the table schema (counts are coerced, missing counts become 0)."""
+    schema = TABLES[table]
+    out = pd.DataFrame(index=df.index)
+    for col, dtype in schema.items():
+        if dtype == 'int64':
+            out[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(np.int64)
+        elif dtype == 'float64':
+            out[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+        else:
+            out[col] = df[col].astype(str)
+    return out.reset_index(drop=True)
+
+# --- Predicates ---
+
+def _normalize(filters, kwargs):
+    """[(column, op, value)] from positional tuples and column=value keywords (None = no filter)."""
+    preds = [tuple(f) for f in filters]
+    preds += [(col, 'in' if isinstance(v, (list, tuple, set)) else '==', v)
+              for col, v in kwargs.items() if v is not None]
+    for col, op, _ in preds:
+        if op not in OPS and op != 'in':
+            raise ValueError(f"Unsupported operator '{op}' on {col}")
+    return preds
+
+def _matches(op, value, target):
+    """Predicate on one scalar (partition value)."""
+    if op == 'in':
+        return value in target
+    return OPS[op](value, target)
+
+def _may_match(op, lo, hi, target):
+    """Whether any value in [lo, hi] can satisfy the predicate."""
+    if op == 'in':
+        return any(lo <= t <= hi for t in target)
+    if op == '==':
+        return lo <= target <= hi
+    if op == '!=':
+        return not (lo == hi == target)
+    if op in ('<', '<='):
+        return OPS[op](lo, target)
+    return OPS[op](hi, target)
+
+def _row_mask(df, preds):
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, target in preds:
+        values = df[col]
+        mask &= values.isin(list(target)).to_numpy() if op == 'in' else OPS[op](values, target).to_numpy()
+    return mask
+
+def _stat(value):
+    """JSON-safe scalar for the part statistics."""
+    return value.item() if isinstance(value, np.generic) else value
+
+# --- Warehouse ---
+
+class Warehouse:
+    """
+    Election data partitioned as <table>/year=<y>/ballot_code=<b>/part-NNNN.csv.
+    Each table's _manifest.json lists the parts with their row counts and
+    per-column min/max, so a scan decides which files to open from the
+    manifest alone. It also records the source file signatures each year
+    was built from (see stale_years).
+    """
+
+    def __init__(self, root=WAREHOUSE_DIR):
+        self.root = root
+
+    def _manifest_path(self, table):
+        return os.path.join(self.root, table, MANIFEST_FILE)
+
+    def manifest(self, table):
+        """The table manifest, or None if the table was never written."""
+        path = self._manifest_path(table)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def exists(self, table):
+        return self.manifest(table) is not None
+
+    def stale_years(self, table, data_dir='data', years=None):
+        """
+        Years of a table whose source files changed (or that were never
+        built) since the warehouse was written. Years whose sources are
+        missing are not reported; their stored rows are all there is.
+        """
+        built = (self.manifest(table) or {}).get('sources', {})
+        stale = []
+        for year in _source_years(table, years):
+            current = source_signature(table, year, data_dir)
+            if current is not None and built.get(str(year)) != current:
+                stale.append(year)
+        return stale
+
+    def write(self, table, df, sources=None):
+        """
+        Replaces the partitions present in df. Partitions not in df are
+        kept, so elections can be (re)loaded one at a time.
+        sources maps year -> source_signature of the files df was read from.
+        """
+        df = conform(df, table)
+        manifest = self.manifest(table) or {'table': table, 'columns': TABLES[table],
+                                            'partition_by': PARTITION_BY, 'parts': []}
+        replaced = set()
+        new_parts = []
+        for values, grp in df.groupby(PARTITION_BY, sort=True):
+            part_values = dict(zip(PARTITION_BY, (_stat(v) for v in values)))
+            replaced.add(tuple(part_values.values()))
+            rel_dir = os.path.join(*(f"{col}={v}" for col, v in part_values.items()))
+            abs_dir = os.path.join(self.root, table, rel_dir)
+            shutil.rmtree(abs_dir, ignore_errors=True)
+            os.makedirs(abs_dir)
+            grp = grp.sort_values(SORT_BY, kind='stable').drop(columns=PARTITION_BY)
+            for n, start in enumerate(range(0, len(grp), ROWS_PER_PART)):
+                chunk = grp.iloc[start:start + ROWS_PER_PART]
+                rel_path = os.path.join(rel_dir, f"part-{n:04d}.csv")
+                chunk.to_csv(os.path.join(self.root, table, rel_path), index=False, encoding='utf-8')
+                new_parts.append({
+                    'path': rel_path.replace(os.sep, '/'),
+                    'partition': part_values,
+                    'rows': len(chunk),
+                    'stats': {col: [_stat(chunk[col].min()), _stat(chunk[col].max())] for col in chunk.columns},
+                })
+        kept = [p for p in manifest['parts'] if tuple(p['partition'][c] for c in PARTITION_BY) not in replaced]
+        manifest['parts'] = sorted(kept + new_parts, key=lambda p: p['path'])
+        manifest.setdefault('sources', {}).update({str(y): sig for y, sig in (sources or {}).items()})
+        tmp = self._manifest_path(table) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self._manifest_path(table))
+        return manifest
+
+    def scan(self, table):
+        """A lazy Scan of a table; nothing is read until collect()."""
+        manifest = self.manifest(table)
+        if manifest is None:
+            raise FileNotFoundError(f"No table '{table}' in {self.root} (run scripts/warehouse.py)")
+        return Scan(self, manifest)
+
+class Scan:
+    """
+    Lazy query over one warehouse table. where() and select() only record
+    the plan; collect() prunes partitions by their path values and parts by
+    their min/max statistics before any file is opened, then reads just the
+    selected columns of the surviving parts and applies the row filters.
+    """
+
+    def __init__(self, warehouse, manifest, preds=(), columns=None):
+        self.warehouse = warehouse
+        self.manifest = manifest
+        self.preds = list(preds)
+        self.columns = columns
+
+    def where(self, *filters, **equals):
+        """
+        Adds predicates: tuples (column, op, value) with op in
+        ==, !=, <, <=, >, >=, in, or column=value keywords (a list means
+        'in', None is ignored). Returns a new Scan.
+        """
+        return Scan(self.warehouse, self.manifest, self.preds + _normalize(filters, equals), self.columns)
+
+    def select(self, *columns):
+        return Scan(self.warehouse, self.manifest, self.preds, list(columns))
+
+    def parts(self):
+        """Manifest entries of the parts the predicates cannot rule out."""
+        kept = []
+        for part in self.manifest['parts']:
+            ok = True
+            for col, op, target in self.preds:
+                if col in part['partition']:
+                    ok = _matches(op, part['partition'][col], target)
+                elif col in part['stats']:
+                    lo, hi = part['stats'][col]
+                    ok = _may_match(op, lo, hi, target)
+                if not ok:
+                    break
+            if ok:
+                kept.append(part)
+        return kept
+
+    def explain(self):
+        """Pruning summary: parts and rows kept out of the table total."""
+        kept = self.parts()
+        return {'parts': len(kept), 'total_parts': len(self.manifest['parts']),
+                'rows': sum(p['rows'] for p in kept),
+                'total_rows': sum(p['rows'] for p in self.manifest['parts'])}
+
+    def collect(self):
+        """Runs the scan. Returns a DataFrame in the table schema order."""
+        schema = self.manifest['columns']
+        columns = self.columns or list(schema)
+        needed = set(columns) | {col for col, _, _ in self.preds}
+        file_cols = [c for c in schema if c in needed and c not in PARTITION_BY]
+        dtypes = {c: schema[c] for c in file_cols}
+        frames = []
+        for part in self.parts():
+            path = os.path.join(self.warehouse.root, self.manifest['table'], part['path'])
+            df = pd.read_csv(path, encoding='utf-8', usecols=file_cols, dtype=dtypes)
+            for col in PARTITION_BY:
+                if col in needed:
+                    df[col] = part['partition'][col]
+            frames.append(df[_row_mask(df, self.preds)] if self.preds else df)
+        if not frames:
+            return pd.DataFrame({c: pd.Series(dtype=schema[c]) for c in columns})
+        df = pd.concat(frames, ignore_index=True)
+        return df[[c for c in schema if c in columns]].astype({c: schema[c] for c in PARTITION_BY if c in columns})
+
+def load_table(table, year=None, ballot_code=None, root=WAREHOUSE_DIR, data_dir='data'):
+    """
+    Rows of a table for the given year(s)/ballot(s) (None = all), from the
+    warehouse when it has been built; requested years whose source files
+    changed since are rebuilt first. Otherwise only the source readers of
+    the requested years are run, so e.g. a 2569 query never opens the 2566
+    workbook. Both paths return rows in the warehouse order (partition,
+    then SORT_BY), so results do not depend on whether it was built.
+    """
+    wh = Warehouse(root)
+    if wh.exists(table):
+        stale = wh.stale_years(table, data_dir, year)
+        if stale:
+            print(f"Warehouse {table} out of date for {stale}, rebuilding from {data_dir}")
+            build(root, data_dir, tables=[table], years=stale)
+        return wh.scan(table).where(year=year, ballot_code=ballot_code).collect()
+    years = _source_years(table, year)
+    frames = [conform(SOURCES[(table, y)](data_dir), table) for y in years]
+    df = pd.concat(frames, ignore_index=True) if frames else conform(pd.DataFrame(columns=list(TABLES[table])), table)
+    preds = _normalize([], {'ballot_code': ballot_code})
+    if preds:
+        df = df[_row_mask(df, preds)]
+    return df.sort_values(PARTITION_BY + SORT_BY, kind='stable').reset_index(drop=True)
+
+def build(root=WAREHOUSE_DIR, data_dir='data', tables=None, years=None):
+    """Imports the source readers into the warehouse (all, or the given tables/years)."""
+    wh = Warehouse(root)
+    for (table, year), reader in SOURCES.items():
+        if (tables and table not in tables) or (years and year not in years):
+            continue
+        start = time.perf_counter()
+        # Signed before reading, so a file changed mid-read is picked up next time
+        signature = source_signature(table, year, data_dir)
+        manifest = wh.write(table, reader(data_dir), {year: signature})
+        parts = [p for p in manifest['parts'] if p['partition']['year'] == year]
+        print(f"{table} {year}: {sum(p['rows'] for p in parts)} rows in {len(parts)} parts "
+              f"({time.perf_counter() - start:.2f} s)")
+    return wh
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the partitioned election warehouse or query it.")
+    parser.add_argument('--tables', nargs='*', choices=list(TABLES))
+    parser.add_argument('--years', nargs='*', type=int)
+    parser.add_argument('--query', help="Table to query instead of building, e.g. votes")
+    parser.add_argument('--where', nargs='*', default=[], metavar='COL=VALUE',
+                        help="Equality filters for --query, e.g. year=2569 ballot_code=CONS")
+    args = parser.parse_args()
+
+    if not args.query:
+        build(tables=args.tables, years=args.years)
+        return
+    schema = TABLES[args.query]
+    equals = {}
+    for item in args.where:
+        col, value = item.split('=', 1)
+        equals[col] = int(value) if schema.get(col) == 'int64' else value
+    scan = Warehouse().scan(args.query).where(**equals)
+    start = time.perf_counter()
+    df = scan.collect()
+    plan = scan.explain()
+    print(f"{len(df)} rows from {plan['parts']}/{plan['total_parts']} parts "
+          f"({plan['rows']}/{plan['total_rows']} rows read) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(df.head(20).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
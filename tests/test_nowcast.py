@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from scripts import nowcast as nc
+
+N_CONS = 400
+PARTY_IDS = {group: i for i, group in enumerate(nc.GROUPS[:7], 1)}
+
+def _fixture(seed=0):
+    rng = np.random.default_rng(seed)
+    cons_ids = [f"C{i}" for i in range(N_CONS)]
+    info = pd.DataFrame({
+        'key': [f"P_{i}" for i in range(N_CONS)],
+        'province': 'P',
+        'district_number': np.arange(N_CONS),
+        'registered': rng.integers(80_000, 200_000, N_CONS).astype(float),
+        'total_stations': rng.integers(150, 400, N_CONS).astype(float),
+    }, index=cons_ids)
+    prior_shares = rng.dirichlet(np.ones(len(nc.GROUPS)) * 5, N_CONS)
+    prior = pd.DataFrame(prior_shares, columns=nc.GROUPS, index=info['key'])
+    prior['turnout_rate'] = rng.uniform(0.6, 0.8, N_CONS)
+    # The final result differs from the prior by a national swing and noise
+    swing = rng.normal(0, 0.03, len(nc.GROUPS))
+    truth = np.clip(prior_shares + swing + rng.normal(0, 0.02, prior_shares.shape), 0.001, None)
+    truth /= truth.sum(axis=1, keepdims=True)
+    voters = info['registered'].to_numpy() * rng.uniform(0.6, 0.8, N_CONS)
+    groups = {pid: group for group, pid in PARTY_IDS.items()}
+    return info, prior, groups, truth, voters, rng
+
+def _inputs(info, truth, voters, counted, rng):
+    """Nowcaster inputs with each constituency counted to the given fraction."""
+    inputs = {}
+    for i, cons_id in enumerate(info.index):
+        p = counted[i]
+        noise = 1 + rng.normal(0, 0.02, len(nc.GROUPS)) * (p < 1)
+        votes = np.round(truth[i] * voters[i] * p * noise)
+        inputs[cons_id] = (p, float(votes.sum()), votes)
+    return inputs
+
+def test_update_sequence_to_full_count_has_finite_intervals():
+    info, prior, groups, truth, voters, rng = _fixture()
+    now = nc.Nowcaster(info, prior, groups)
+    counted = np.zeros(N_CONS)
+    for fraction in (0.3, 0.6, 1.0):
+        # Constituencies report unevenly; every one is complete at the end
+        counted = np.maximum(counted, np.minimum(1.0, rng.uniform(0, 2 * fraction, N_CONS)))
+        if fraction == 1.0:
+            counted[:] = 1.0
+        now.update(_inputs(info, truth, voters, counted, rng))
+
+    national = now.national()
+    bounds = national[['votes_lo', 'votes_hi', 'share', 'share_lo', 'share_hi']]
+    assert np.isfinite(bounds.to_numpy()).all()
+    assert (national['share_lo'] <= national['share'] + 1e-9).all()
+    assert (national['share_hi'] >= national['share'] - 1e-9).all()
+    # Everything is counted: the intervals collapse onto the count
+    assert np.allclose(national['share_hi'] - national['share_lo'], 0, atol=1e-6)
+
+    turnout = now.turnout()
+    assert np.isfinite([turnout['turnout_lo'], turnout['turnout_hi']]).all()
+    assert turnout['turnout_lo'] <= turnout['turnout_rate'] <= turnout['turnout_hi']
+
+    cons = now.constituencies()
+    assert np.isfinite(cons.filter(regex='_(lo|hi)$').to_numpy(dtype=float)).all()